@@ -0,0 +1,330 @@
+"""Engine hot paths on synthetic worlds: median/p99 latency and peak memory, written as JSON.
+
+    python bench/bench_engine.py [--scales 1 10 100] [--cells 10000 100000 1000000] [--matrix]
+                                 [--samples N] [--slow-samples N] [--format 1|2]
+                                 [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+
+Every world is built on disk in a temporary directory and loaded through
+AlbinaEngine with a HeadlessUI, so the numbers include the journal, the
+region store and the world file exactly as the game uses them. By default
+each item/mob scale is run with the smallest discovered-cell count and each
+cell count with the smallest scale; --matrix runs every combination. A
+procedural world is timed on its own: generating one region, and paging
+in the regions around a point nobody has been to.
+
+With --baseline the run is compared against an earlier --output file and
+the script exits with status 1 if any median, or any p99 of a path timed
+at least P99_MIN_SAMPLES times, got slower than the tolerance allows.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import world_format  # noqa: E402
+import worldgen  # noqa: E402
+from engine import AlbinaEngine, HeadlessUI  # noqa: E402
+from fixtures import temp_world  # noqa: E402
+from regions import REGION_SIZE  # noqa: E402
+from wall_gen import SPLITMIX64, WallGenerator, seed_key  # noqa: E402
+from wall_map import BITSET_BYTES, CHUNK_CELLS, CHUNK_SIZE, WallMap  # noqa: E402
+from worldgen import ITEM_ATTEMPTS, MOB_ATTEMPTS, WORLD_RADIUS  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+WORLD_NAME = "bench"
+PROCEDURAL_NAME = "procedural"
+MEMORY_SAMPLES = 3
+P99_MIN_SAMPLES = 100
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(call, samples: int, setup=None) -> dict:
+    """Time call() samples times, then run it a few more times under tracemalloc for its peak allocation."""
+    times = []
+    for _ in range(samples):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(min(MEMORY_SAMPLES, samples)):
+        if setup:
+            setup()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        call()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        "samples": samples,
+        "median_us": statistics.median(times) * 1e6,
+        "p99_us": percentile(times, 0.99) * 1e6,
+        "peak_kb": peak / 1024
+    }
+
+
+def known_cells(cells: int, seed: str) -> tuple[WallMap, int]:
+    """A WallMap with at least `cells` discovered cells in whole chunks around the origin; returns it and its side."""
+    chunks = -(-cells // CHUNK_CELLS)
+    side = math.isqrt(chunks - 1) + 1
+    walls = WallGenerator(seed)
+    known = b"\xff" * BITSET_BYTES
+
+    discovered = WallMap()
+    for index in range(chunks):
+        cx, cy = index % side - side // 2, index // side - side // 2
+        discovered.load_chunk(cx, cy, known + walls.chunk_bits(cx, cy))
+
+    return discovered, side * CHUNK_SIZE
+
+
+def build_world(root: str, engine: AlbinaEngine, scale: int, cells: int, version: int) -> dict:
+    """Write world/<WORLD_NAME> with scale x the generated items and mobs and `cells` discovered cells."""
+    rng = random.Random(scale * 1000003 + cells)
+    world = engine.generate_world()
+    # Stored items and mobs on per-cell walls, as worlds had before procedural regions and mazes.
+    del world["entities"]
+    world["wall_generator"] = SPLITMIX64
+    key, side = seed_key(world["seed"]), 2 * WORLD_RADIUS + 1
+    item_scatter = worldgen.scatter(key ^ 1, ITEM_ATTEMPTS, engine.samplers.table("world_items"),
+                                    -WORLD_RADIUS, -WORLD_RADIUS, side, side)
+    mob_scatter = worldgen.scatter(key ^ 2, MOB_ATTEMPTS, engine.samplers.table("world_mobs"),
+                                   -WORLD_RADIUS, -WORLD_RADIUS, side, side)
+    base_items, base_mobs = worldgen.item_entries(item_scatter), worldgen.mob_entries(mob_scatter, engine.mob_types)
+
+    radius = round(WORLD_RADIUS * math.sqrt(scale))
+    items, mobs = [], []
+    for _ in range(scale):
+        items.extend({**item, "x": rng.randint(-radius, radius), "y": rng.randint(-radius, radius)}
+                     for item in base_items)
+        mobs.extend({**mob, "x": rng.randint(-radius, radius), "y": rng.randint(-radius, radius)}
+                    for mob in base_mobs)
+
+    world["items"], world["mobs"] = items, mobs
+    world["discovered"], span = known_cells(cells, world["seed"])
+    world["format"] = version
+
+    world_path = os.path.join(root, "world", WORLD_NAME)
+    shutil.rmtree(world_path, ignore_errors=True)
+    os.makedirs(world_path)
+
+    player = dict(engine.player, start_time=time.time())
+    with open(os.path.join(world_path, "stat.alb"), "w", encoding="utf-8") as f:
+        json.dump(player, f)
+    world_format.write_world(os.path.join(world_path, "server.alb"), world)
+
+    return {
+        "items": [(item["x"], item["y"]) for item in items],
+        "mobs": [(mob["x"], mob["y"]) for mob in mobs],
+        "known": len(world["discovered"]),
+        "span": span,
+        "file_bytes": os.path.getsize(os.path.join(world_path, "server.alb"))
+    }
+
+
+def load_engine() -> tuple[AlbinaEngine, HeadlessUI]:
+    ui = HeadlessUI()
+    engine = AlbinaEngine(ui)
+    engine.load_specific_world(WORLD_NAME)
+    if not engine.game_loaded:
+        raise RuntimeError("\n".join(ui.lines))
+    return engine, ui
+
+
+def run_world(root: str, scale: int, cells: int, args) -> dict[str, dict]:
+    engine = AlbinaEngine(HeadlessUI())
+    info = build_world(root, engine, scale, cells, args.format)
+    rng = random.Random(scale + cells)
+    results = {}
+
+    def fresh_engine():
+        nonlocal engine
+        engine.close_journal()
+        engine = AlbinaEngine(HeadlessUI())
+
+    results["load_specific_world"] = measure(lambda: engine.load_specific_world(WORLD_NAME),
+                                             args.slow_samples, fresh_engine)
+    engine.close_journal()
+
+    engine, ui = load_engine()
+    player = engine.player
+    half = info["span"] // 2
+
+    def at_known():
+        ui.drain()
+        player["x"], player["y"] = rng.randrange(-half, half), rng.randrange(-half, half)
+
+    results["check_wall_collision.known"] = measure(engine.check_wall_collision, args.samples, at_known)
+
+    fresh = iter(range(10 ** 9))
+
+    def at_new():
+        ui.drain()
+        player["x"], player["y"] = info["span"] + next(fresh), 0
+
+    results["check_wall_collision.new"] = measure(engine.check_wall_collision, args.samples, at_new)
+
+    def on_item():
+        ui.drain()
+        player["x"], player["y"] = rng.choice(info["items"])
+        player["inventory"] = []
+
+    results["check_position"] = measure(lambda: engine.check_position("N"), args.samples, on_item)
+
+    def on_mob():
+        ui.drain()
+        player["x"], player["y"] = rng.choice(info["mobs"])
+        player["hp"] = 100
+        player["inventory"] = []
+
+    results["kick"] = measure(lambda: engine.kick(None), args.samples, on_mob)
+
+    def after_moves():
+        ui.drain()
+        for _ in range(8):
+            at_new()
+            engine.check_wall_collision()
+        player["x"], player["y"] = 0, 0
+
+    results["save_game"] = measure(lambda: engine.save_game(None), args.samples, after_moves)
+
+    world_path = os.path.join("world", WORLD_NAME)
+    results["snapshot"] = measure(lambda: engine.compact_world(world_path), args.slow_samples, after_moves)
+
+    engine.close_journal()
+
+    for result in results.values():
+        result.update(scale=scale, cells=info["known"], items=len(info["items"]), mobs=len(info["mobs"]),
+                      file_bytes=info["file_bytes"])
+    return results
+
+
+def run_procedural(args) -> dict[str, dict]:
+    """generate_region and RegionStore.focus on a new procedural world, always on regions not seen before."""
+    engine = AlbinaEngine(HeadlessUI())
+    engine.new_world([PROCEDURAL_NAME])
+    engine.load_specific_world(PROCEDURAL_NAME)
+    if not engine.game_loaded:
+        raise RuntimeError("\n".join(engine.ui.lines))
+
+    fresh = iter(range(1, 10 ** 9))
+    results = {"generate_region": measure(lambda: engine.generate_region((next(fresh) * 3, 0)), args.samples)}
+
+    # Three regions apart, so every focus loads the full square around it.
+    span = 3 * (2 * engine.regions.radius + 1) * REGION_SIZE
+    results["region_paging"] = measure(lambda: engine.regions.focus(next(fresh) * span, span), args.slow_samples)
+
+    engine.close_journal()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"\n{'benchmark':<48} {'median':>9} {'p99':>9}")
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+
+        ratios = {metric: result[metric] / old[metric] if old[metric] else 1.0 for metric in ("median_us", "p99_us")}
+        print(f"{key:<48} {ratios['median_us']:>8.2f}x {ratios['p99_us']:>8.2f}x")
+        for metric, ratio in ratios.items():
+            # With a handful of samples p99 is just the slowest run; only the median is stable enough to gate on.
+            if metric == "p99_us" and min(result["samples"], old["samples"]) < P99_MIN_SAMPLES:
+                continue
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key} {metric}: {old[metric]:.1f} -> {result[metric]:.1f} us ({ratio:.2f}x)")
+    return regressions
+
+
+def worlds(args) -> list[tuple[int, int]]:
+    if args.matrix:
+        return [(scale, cells) for scale in args.scales for cells in args.cells]
+
+    combos = [(scale, min(args.cells)) for scale in args.scales]
+    combos += [(min(args.scales), cells) for cells in args.cells if (min(args.scales), cells) not in combos]
+    return combos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="item/mob count multipliers")
+    parser.add_argument("--cells", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6], help="discovered cells")
+    parser.add_argument("--matrix", action="store_true", help="run every scale with every cell count")
+    parser.add_argument("--samples", type=int, default=1000, help="samples for per-move paths")
+    parser.add_argument("--slow-samples", type=int, default=10, help="samples for load, snapshot and region paging")
+    parser.add_argument("--format", type=int, choices=(1, world_format.VERSION), default=world_format.VERSION)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args()
+
+    results = {}
+
+    with temp_world("bench"):
+        print(f"{'benchmark':<48} {'median us':>12} {'p99 us':>12} {'peak KiB':>10}")
+        for key, result in run_procedural(args).items():
+            results[key] = result
+            print(f"{key:<48} {result['median_us']:>12.1f} {result['p99_us']:>12.1f} {result['peak_kb']:>10.0f}")
+
+        for scale, cells in worlds(args):
+            for name, result in run_world(os.getcwd(), scale, cells, args).items():
+                key = f"{name}@{scale}x/{cells}"
+                results[key] = result
+                print(f"{key:<48} {result['median_us']:>12.1f} {result['p99_us']:>12.1f} {result['peak_kb']:>10.0f}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": worldgen.np is not None,
+            "format": args.format,
+            "samples": args.samples,
+            "slow_samples": args.slow_samples,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""goto route planning: routes are legal and shortest, and how long planning takes.
+
+    python bench/bench_goto.py [--cases N] [--walls maze|splitmix64] [--seed S]
+
+Random start and goal cells on fresh walls of the given generator. Every
+route must step between adjacent open cells; a complete route must be as
+short as a breadth-first search finds, and a partial one must end closer
+to the goal than it started. Asking again from a cell on a route must return the rest
+of it from the cache, and planning a slice at a time must find the same
+route as planning in one go. Exits with status 1 otherwise. Then planning
+is timed, in the slices goto uses, at several distances with the
+generator's default budgets, and at least 18 of 20 routes to a goal 50
+cells away must complete within them.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pathfinding import FOUND, NO_ROUTE, PARTIAL, PLAN_SLICE_SECONDS, STEPS, Planner, WallCache, plan_budget  # noqa: E402
+from wall_gen import MAZE, SPLITMIX64, WallGenerator  # noqa: E402
+from wall_map import WallMap  # noqa: E402
+
+
+def planner(seed: str, algorithm: str, **budget) -> Planner:
+    return Planner(WallCache(WallMap(), WallGenerator(seed, algorithm)), **budget)
+
+
+def shortest(is_wall, start: tuple[int, int], goal: tuple[int, int], limit: int) -> int | None:
+    """Breadth-first distance, searching no further than limit cells from start."""
+    seen = {start: 0}
+    todo = deque([start])
+    while todo:
+        cell = todo.popleft()
+        if cell == goal:
+            return seen[cell]
+        if seen[cell] >= limit:
+            continue
+        for dx, dy in STEPS:
+            nxt = (cell[0] + dx, cell[1] + dy)
+            if nxt not in seen and not is_wall(*nxt):
+                seen[nxt] = seen[cell] + 1
+                todo.append(nxt)
+    return None
+
+
+def distance(a: tuple[int, int], b: tuple[int, int]) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def check(rng: random.Random, cases: int, algorithm: str) -> str | None:
+    for case in range(cases):
+        seed = str(rng.randrange(2 ** 32))
+        start = (rng.randint(-500, 500), rng.randint(-500, 500))
+        span = rng.choice([3, 20, 60])
+        goal = (start[0] + rng.randint(-span, span), start[1] + rng.randint(-span, span))
+        nodes = rng.choice([50, 500, 100000])
+
+        routes = planner(seed, algorithm, max_nodes=nodes, max_seconds=60)
+        is_wall = routes.walls.is_wall
+        plan = routes.plan(start, goal)
+        where = f"case {case}: seed {seed} {start} -> {goal}, {nodes} nodes"
+
+        cell = start
+        for step in plan.path:
+            if distance(cell, step) != 1 or is_wall(*step):
+                return f"{where}: illegal step {cell} -> {step}"
+            cell = step
+
+        best = shortest(is_wall, start, goal, 4 * span + 40) if not is_wall(*goal) else None
+        if plan.status == FOUND:
+            if cell != goal or (best is not None and len(plan.path) != best):
+                return f"{where}: route of {len(plan.path)} cells, shortest is {best}"
+        elif plan.status == PARTIAL:
+            if plan.path and distance(cell, goal) >= distance(start, goal):
+                return f"{where}: partial route does not get closer"
+        elif plan.status == NO_ROUTE and best is not None and start != goal:
+            return f"{where}: no route, but one of {best} cells exists"
+
+        search = planner(seed, algorithm, max_nodes=nodes, max_seconds=60).begin(start, goal)
+        sliced = search.run(rng.choice([1e-5, 1e-3]))
+        while sliced is None:
+            sliced = search.run(rng.choice([1e-5, 1e-3]))
+        if (sliced.status, sliced.path) != (plan.status, plan.path):
+            return f"{where}: planned in {search.slices} slices, the route differs"
+
+        if len(plan.path) > 1:
+            middle = rng.randrange(len(plan.path) - 1)
+            again = routes.plan(plan.path[middle], goal)
+            if not again.cached or again.path != plan.path[middle + 1:]:
+                return f"{where}: cached route from {plan.path[middle]} differs"
+    return None
+
+
+def bench(rng: random.Random, algorithm: str, runs: int = 20) -> dict[int, tuple[list[float], list[float], int]]:
+    """Per distance: planning time over all slices, the longest slice, and how many routes completed."""
+    nodes, seconds = plan_budget({}, algorithm)
+    results = {}
+    for reach in (50, 200, 1000):
+        samples, longest, complete = [], [], 0
+        for _ in range(runs):
+            routes = planner(str(rng.randrange(2 ** 32)), algorithm, max_nodes=nodes, max_seconds=seconds)
+            goal = (reach // 2, reach - reach // 2)
+            while routes.walls.is_wall(*goal):
+                goal = (goal[0] + 1, goal[1])
+
+            search, plan, slowest = routes.begin((0, 0), goal), None, 0.0
+            while plan is None:
+                start = time.perf_counter()
+                plan = search.run(PLAN_SLICE_SECONDS)
+                slowest = max(slowest, time.perf_counter() - start)
+            samples.append(search.elapsed)
+            longest.append(slowest)
+            complete += plan.status == FOUND
+        results[reach] = samples, longest, complete
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--walls", choices=(MAZE, SPLITMIX64), default=MAZE)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    failure = check(rng, args.cases, args.walls)
+    if failure:
+        print(f"FAIL (seed {seed}) {failure}")
+        sys.exit(1)
+    print(f"seed {seed}: {args.cases} routes ok")
+
+    nodes, seconds = plan_budget({}, args.walls)
+    print(f"\nplanning from (0, 0), default budgets ({nodes} nodes, {seconds * 1000:g} ms):")
+    results = bench(rng, args.walls)
+    for reach, (samples, longest, complete) in results.items():
+        print(f"{reach:>5} cells away  median {statistics.median(samples) * 1e3:7.2f} ms"
+              f"  max {max(samples) * 1e3:7.2f} ms  longest slice {max(longest) * 1e3:6.2f} ms"
+              f"  complete {complete}/{len(samples)}")
+
+    samples, _, complete = results[50]
+    if complete < len(samples) * 0.9:
+        print(f"FAIL (seed {seed}) only {complete} of {len(samples)} routes 50 cells away complete within the budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Sandboxed plugins: a hung plugin cannot hold up ticks, and what a tick costs with plugins in and out of process.
+
+    python bench/bench_plugin_sandbox.py [--ticks N] [--budget MS] [--seed S]
+
+Loads a world with plugin_sandbox on and three plugins, each in its own
+worker process: one counts the events it hears and answers commands,
+one sleeps far past the budget on every tick, and one takes one and a
+half budgets on its first tick only. Ticks are run a quarter budget
+apart. No tick may wait much longer than the budget. The sleeper must
+be disabled once its answer has been missing for plugin_overruns
+budgets, not sooner, with every tick up to then counted as skipped.
+The one slow tick must not disable the other plugin, and the counter
+must keep hearing moves and ticks and answering commands. Turning the
+sleeper back on must start a new worker. Exits with status 1
+otherwise. Then --ticks ticks are timed with no plugin, with the
+counter in process and with the counter sandboxed.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import AlbinaEngine, HeadlessUI  # noqa: E402
+from fixtures import temp_world  # noqa: E402
+
+COUNTER = '''
+from plugin_manager import AlbinaEvent, AlbinaPlugin
+
+
+class Counter(AlbinaPlugin):
+    name = "counter"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.heard = {}
+
+    def commands(self):
+        return {"echo": lambda args: self.engine.print_to_console("echo " + " ".join(args)),
+                "heard": lambda args: self.engine.print_to_console(
+                    " ".join(f"{event}={count}" for event, count in sorted(self.heard.items())))}
+
+    def listeners(self):
+        return {event: self.hear for event in AlbinaEvent}
+
+    def hear(self, event, data):
+        self.heard[event.value] = self.heard.get(event.value, 0) + 1
+'''
+
+SLEEPER = '''
+import time
+
+from plugin_manager import AlbinaEvent, AlbinaPlugin
+
+
+class Sleeper(AlbinaPlugin):
+    name = "sleeper"
+
+    def listeners(self):
+        return {AlbinaEvent.TICK: lambda event, data: time.sleep(10)}
+'''
+
+HICCUP = '''
+import time
+
+from plugin_manager import AlbinaEvent, AlbinaPlugin
+
+
+class Hiccup(AlbinaPlugin):
+    name = "hiccup"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.ticks = 0
+
+    def listeners(self):
+        return {AlbinaEvent.TICK: self.tick}
+
+    def tick(self, event, data):
+        self.ticks += 1
+        if self.ticks == 1:
+            time.sleep(1.5 * self.engine.config["plugin_budget_ms"] / 1000)
+'''
+
+
+def start(config: dict, plugins: dict[str, str]) -> AlbinaEngine:
+    shutil.rmtree("plugins", ignore_errors=True)
+    os.makedirs("plugins")
+    for name, source in plugins.items():
+        with open(os.path.join("plugins", name), "w", encoding="utf-8") as f:
+            f.write(source)
+    os.makedirs("server", exist_ok=True)
+    with open(os.path.join("server", "config.cfg"), "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    engine = AlbinaEngine(HeadlessUI())
+    engine.check_server()
+    engine.load_plugins()
+    engine.load_specific_world("bench")
+    engine.ui.drain()
+    return engine
+
+
+def timed_ticks(engine: AlbinaEngine, count: int) -> list[float]:
+    times = []
+    for _ in range(count):
+        # Fed and rested, so the player outlives the run.
+        engine.player["hunger"] = engine.player["sleep"] = 0
+        start = time.perf_counter()
+        engine.tick()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def paced_ticks(engine: AlbinaEngine, budget: float, until) -> list[float]:
+    """Tick a quarter budget apart, as the game leaves the workers time between ticks, until until(times) holds."""
+    times = []
+    while not until(times):
+        times += timed_ticks(engine, 1)
+        time.sleep(budget / 4)
+    return times
+
+
+def check(engine: AlbinaEngine, budget: float, overruns: int, rng: random.Random) -> str | None:
+    manager = engine.plugin_manager
+    plugins = {loaded.name: loaded for loaded in manager.plugins}
+    if sorted(plugins) != ["counter", "hiccup", "sleeper"] or any(loaded.worker is None for loaded in manager.plugins):
+        return f"plugins loaded as {[(loaded.name, loaded.worker) for loaded in manager.plugins]}"
+    counter, hiccup, sleeper = plugins["counter"], plugins["hiccup"], plugins["sleeper"]
+
+    word = str(rng.randrange(1000))
+    engine.handle_command(f"echo {word}")
+    if f"echo {word}" not in engine.ui.drain():
+        return "sandboxed command did not answer"
+
+    start = time.perf_counter()
+    give_up = start + overruns * budget * 4 + 1
+    times = paced_ticks(engine, budget, lambda done: not sleeper.enabled or time.perf_counter() > give_up)
+    waited = time.perf_counter() - start
+    until_disabled = len(times)
+    extra = rng.randint(2, 5) + 8
+    times += paced_ticks(engine, budget, lambda done: len(done) >= extra)
+    ticks = len(times)
+
+    worst = max(times)
+    if worst > budget * 2 + 0.05:
+        return f"a tick took {worst * 1000:.0f} ms with a {budget * 1000:g} ms budget"
+    if sleeper.enabled or sleeper.worker.running:
+        return "sleeper is still running"
+    if waited < overruns * budget:
+        return f"sleeper was disabled after {waited * 1000:.0f} ms, before {overruns} budgets had passed"
+    if not any("Plugin sleeper disabled" in line for line in engine.ui.drain()):
+        return "disabling the sleeper was not reported"
+    if sleeper.skipped != until_disabled:
+        return f"sleeper skipped {sleeper.skipped} calls, expected {until_disabled}"
+    if not hiccup.enabled or hiccup.overruns or not hiccup.skipped:
+        return (f"one slow call left hiccup enabled {hiccup.enabled}, {hiccup.overruns} overruns, "
+                f"{hiccup.skipped} skipped")
+
+    for direction in ("right", "up", "left", "down"):
+        engine.handle_command(direction)
+    engine.ui.drain()
+    engine.handle_command("heard")
+    heard = dict(item.split("=") for item in engine.ui.drain()[-1].split())
+    if int(heard.get("tick", 0)) != ticks or "move" not in heard or "command" not in heard:
+        return f"counter heard {heard} after {ticks} ticks"
+    if counter.skipped or not counter.enabled or counter.latency.count == 0:
+        return f"counter skipped {counter.skipped}, enabled {counter.enabled}"
+
+    engine.handle_command("plugin")
+    listing = engine.ui.drain()
+    if not any("sleeper" in line and f"{until_disabled} skipped" in line and "stopped" in line for line in listing):
+        return f"plugin list does not show the sleeper stopped: {listing}"
+
+    number = next(i for i, loaded in enumerate(manager.plugins, len(engine.plugins) + 1) if loaded is sleeper)
+    engine.handle_command(f"plugin {number} on")
+    if not sleeper.enabled or not sleeper.worker.running:
+        return "turning the sleeper on did not restart it"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--budget", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    overruns = 3
+    sandbox = {"autosave": False, "plugin_sandbox": True, "plugin_budget_ms": args.budget, "plugin_overruns": overruns}
+    with temp_world("sandbox", "bench"):
+        engine = start(sandbox, {"counter.py": COUNTER, "sleeper.py": SLEEPER, "hiccup.py": HICCUP})
+        failure = check(engine, args.budget / 1000, overruns, rng)
+        engine.exit_command(None)
+        if failure:
+            print(f"FAIL (seed {seed}) {failure}")
+            sys.exit(1)
+        print(f"seed {seed}: sandbox ok")
+
+        print(f"\n{args.ticks} ticks:")
+        for label, config, plugins in (("no plugin", {"autosave": False}, {}),
+                                       ("in process", {"autosave": False}, {"counter.py": COUNTER}),
+                                       ("sandboxed", sandbox, {"counter.py": COUNTER})):
+            engine = start(config, plugins)
+            times = sorted(timed_ticks(engine, args.ticks))
+            engine.exit_command(None)
+            p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+            print(f"  {label:<11} median {statistics.median(times) * 1e6:7.1f} us  p99 {p99 * 1e6:7.1f} us  "
+                  f"max {times[-1] * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
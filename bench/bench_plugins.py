@@ -0,0 +1,149 @@
+"""Python plugins: commands and listeners are wired up, and what emitting an event costs with and without them.
+
+    python bench/bench_plugins.py [--events N] [--seed S]
+
+Loads a world with a plugin that adds a command and counts every event
+it hears, next to one whose move listener always raises. The command
+must run, each kind of event must reach the counter with its data, the
+broken plugin must be counted as failing without stopping the counter,
+and a disabled plugin must hear nothing and lose its command. Exits
+with status 1 otherwise. Then emit() is timed with no listener, with
+one, and with the broken one.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import AlbinaEngine  # noqa: E402
+from fixtures import temp_world  # noqa: E402
+from plugin_manager import AlbinaEvent  # noqa: E402
+
+COUNTER = '''
+from plugin_manager import AlbinaEvent, AlbinaPlugin
+
+
+class Counter(AlbinaPlugin):
+    name = "counter"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.heard = []
+
+    def commands(self):
+        return {"echo": lambda args: self.engine.print_to_console("echo " + " ".join(args))}
+
+    def listeners(self):
+        return {event: self.hear for event in AlbinaEvent}
+
+    def hear(self, event, data):
+        self.heard.append((event, data))
+'''
+
+BROKEN = '''
+from plugin_manager import AlbinaEvent, AlbinaPlugin
+
+
+class Broken(AlbinaPlugin):
+    def listeners(self):
+        return {AlbinaEvent.MOVE: self.fail}
+
+    def fail(self, event, data):
+        raise RuntimeError("broken on purpose")
+'''
+
+
+def check(engine: AlbinaEngine, rng: random.Random) -> str | None:
+    manager = engine.plugin_manager
+    names = [loaded.name for loaded in manager.plugins]
+    if names != ["broken", "counter"]:
+        return f"plugins loaded as {names}"
+    broken, counter = manager.plugins
+    heard = counter.plugin.heard
+
+    word = str(rng.randrange(1000))
+    engine.handle_command(f"echo {word}")
+    if f"echo {word}" not in engine.ui.drain():
+        return "plugin command did not run"
+
+    for direction in ("right", "up", "left", "down"):
+        engine.handle_command(direction)
+    engine.handle_command("give")
+    engine.handle_command("save")
+    for _ in range(rng.randint(1, 5)):
+        engine.tick()
+
+    kinds = {event for event, _ in heard}
+    for event in (AlbinaEvent.COMMAND, AlbinaEvent.MOVE, AlbinaEvent.SAVE, AlbinaEvent.TICK):
+        if event not in kinds:
+            return f"counter never heard {event.value}"
+    moves = [data for event, data in heard if event is AlbinaEvent.MOVE]
+    if moves[-1]["x"] != engine.player["x"] or moves[-1]["y"] != engine.player["y"]:
+        return f"move data {moves[-1]} does not match the player"
+    if broken.errors != len(moves):
+        return f"broken plugin has {broken.errors} errors for {len(moves)} moves"
+    if counter.errors or counter.timing.count != len(heard) + 1:
+        return f"counter timed {counter.timing.count} calls for {len(heard)} events and one command"
+
+    engine.handle_command(f"plugin {len(engine.plugins) + 2} off")
+    heard.clear()
+    engine.handle_command("echo")
+    engine.tick()
+    if heard:
+        return f"disabled plugin still heard {[event.value for event, _ in heard]}"
+    if not any("Unknown command" in line or "Invalid command" in line for line in engine.ui.drain()):
+        return "disabled plugin's command still runs"
+    engine.handle_command(f"plugin {len(engine.plugins) + 2} on")
+    return None
+
+
+def time_emit(engine: AlbinaEngine, event: AlbinaEvent, count: int) -> float:
+    data = {"tick": 0, "time": 0}
+    emit = engine.plugin_manager.emit
+    start = time.perf_counter()
+    for _ in range(count):
+        emit(event, data)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    with temp_world("plugins", "bench") as engine:
+        for name, source in (("counter.py", COUNTER), ("broken.py", BROKEN)):
+            with open(os.path.join("plugins", name), "w", encoding="utf-8") as f:
+                f.write(source)
+
+        engine.load_plugins()
+        engine.load_specific_world("bench")
+        engine.ui.drain()
+
+        failure = check(engine, rng)
+        if failure:
+            print(f"FAIL (seed {seed}) {failure}")
+            sys.exit(1)
+        print(f"seed {seed}: plugins ok")
+
+        manager = engine.plugin_manager
+        broken, counter = manager.plugins
+        engine.print_to_console = lambda text: None
+        print(f"\nemit() over {args.events} events:")
+        for label, on, event in (("no listener", [], AlbinaEvent.TICK), ("one listener", [counter], AlbinaEvent.TICK),
+                                 ("raising listener", [broken], AlbinaEvent.MOVE)):
+            for loaded in manager.plugins:
+                manager.set_enabled(loaded, loaded in on)
+            counter.plugin.heard.clear()
+            print(f"  {label:<17} {time_emit(engine, event, args.events) * 1e9:8.0f} ns/event")
+        engine.exit_command(None)
+
+
+if __name__ == "__main__":
+    main()
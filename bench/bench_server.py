@@ -0,0 +1,203 @@
+"""TCP server: players are kept apart, and how many commands a second it serves to 1, 10 and 100 clients.
+
+    python bench/bench_server.py [--clients 1,10,100] [--seconds S] [--seed S]
+
+Starts src/server.py on a fresh world on a free localhost port. Two
+clients check the protocol first: a taken name is refused, each player
+has its own inventory, `who` sees both, a plugin command that raises
+answers its sender with an error line and is logged on the server while
+both players stay connected, and a player who quits and comes back
+finds their inventory again. Exits with status 1 otherwise. Then
+each client count runs for the given seconds, every client sending a
+random mix of moves, give, inventory and status and waiting for each
+answer before the next; commands/sec counts all clients together and
+latency is from sending a line to reading its closing ".".
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fixtures import temp_world  # noqa: E402
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "server.py")
+MIX = ["up", "down", "left", "right", "up 5", "right 5", "give", "inventory", "status"]
+
+# Registered straight on the command handler, so the plugin manager's own error handling is not in the way.
+BROKEN = '''
+from engine import State
+from plugin_manager import AlbinaPlugin
+
+
+class Broken(AlbinaPlugin):
+    def __init__(self, engine):
+        super().__init__(engine)
+        engine.command_handler.register("boom", State.GAME, self.boom)
+
+    def boom(self, args):
+        raise RuntimeError("boom on purpose")
+'''
+
+
+class Client:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port: int, name: str, world: str | None = None) -> tuple["Client", list[str]]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        client = cls(reader, writer)
+        await reader.readline()
+        await reader.readline()
+        return client, await client.send(f"hello {name} {world or ''}")
+
+    async def send(self, command: str) -> list[str]:
+        self.writer.write(command.encode() + b"\n")
+        lines = []
+        while True:
+            line = (await self.reader.readline()).decode()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            line = line.rstrip("\n")
+            if line == ".":
+                return lines
+            if not line.startswith("! "):
+                lines.append(line[1:] if line.startswith(".") else line)
+
+    async def close(self):
+        self.writer.write(b"quit\n")
+        await self.reader.read()
+        self.writer.close()
+
+
+async def check(port: int, rng: random.Random, log: list[str]) -> str | None:
+    a, welcome = await Client.connect(port, "alice")
+    if welcome != ["Welcome, alice"]:
+        return f"unexpected welcome {welcome}"
+
+    taken, refused = await Client.connect(port, "alice")
+    if refused != ["alice is already playing"]:
+        return f"second alice was not refused: {refused}"
+    taken.writer.close()
+
+    b, _ = await Client.connect(port, "bob")
+    gifts = rng.randint(1, 3)
+    for _ in range(gifts):
+        await a.send("give")
+
+    if len(await a.send("inventory")) != gifts + 2:
+        return "alice's gifts are missing from her inventory"
+    if await b.send("inventory") != ["Inventory is empty"]:
+        return "bob sees alice's inventory"
+    if await b.send("who") != ["2 online: alice, bob"]:
+        return "who does not list both players"
+    for verb in ("stats", "save"):
+        if await b.send(verb) != [f"'{verb}' is not available over the network"]:
+            return f"{verb} should be refused over the network"
+
+    if await b.send("boom") != ["Error in 'boom': boom on purpose"]:
+        return "a raising command did not answer with an error line"
+    if await a.send("who") != ["2 online: alice, bob"] or await b.send("who") != ["2 online: alice, bob"]:
+        return "a raising command disturbed the sessions"
+    if not any("RuntimeError: boom on purpose" in line for line in log):
+        return "a raising command was not logged on the server"
+
+    before = await a.send("inventory")
+    await a.close()
+    a, _ = await Client.connect(port, "alice")
+    if await a.send("inventory") != before:
+        return "alice's inventory changed across a reconnect"
+
+    await a.close()
+    await b.close()
+    return None
+
+
+async def bot(port: int, name: str, world: str | None, seconds: float, rng: random.Random, latencies: list[float]):
+    client, _ = await Client.connect(port, name, world)
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        command = rng.choice(MIX)
+        start = time.perf_counter()
+        await client.send(command)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+
+
+async def load(port: int, clients: int, seconds: float, rng: random.Random,
+               worlds: list[str | None] = (None,)) -> tuple[float, list[float]]:
+    """Run clients bots spread over worlds; returns commands/sec and every command's latency."""
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(bot(port, f"bot{clients}_{i}", worlds[i % len(worlds)], seconds,
+                               random.Random(rng.random()), latencies) for i in range(clients)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def report(label: str, rate: float, latencies: list[float]):
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}  {rate:8.0f} commands/s  median {statistics.median(latencies) * 1e3:6.2f} ms"
+          f"  p99 {p99 * 1e3:6.2f} ms")
+
+
+def start_server(*args: str) -> tuple[subprocess.Popen, int, list[str]]:
+    """Run a server script with args on a free port.
+
+    Returns the process, its port once it listens, and a list that keeps
+    filling with what it prints.
+    """
+    server = subprocess.Popen([sys.executable, *args, "--port", "0"],
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    log = []
+    for line in server.stdout:
+        log.append(line.rstrip("\n"))
+        if line.startswith("Listening on"):
+            threading.Thread(target=lambda: log.extend(line.rstrip("\n") for line in server.stdout), daemon=True).start()
+            return server, int(line.rsplit(":", 1)[1]), log
+    raise RuntimeError(f"server did not start (exit status {server.wait()}): {log[-5:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", default="1,10,100")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    server = None
+
+    with temp_world("server", "bench"):
+        try:
+            with open(os.path.join("plugins", "broken.py"), "w", encoding="utf-8") as f:
+                f.write(BROKEN)
+            server, port, log = start_server(SERVER, "bench")
+
+            failure = asyncio.run(check(port, rng, log))
+            if failure:
+                print(f"FAIL (seed {seed}) {failure}")
+                sys.exit(1)
+            print(f"seed {seed}: sessions ok")
+
+            print(f"\n{args.seconds:g}s per run on 127.0.0.1:{port}:")
+            for clients in (int(n) for n in args.clients.split(",")):
+                report(f"{clients:>4} clients", *asyncio.run(load(port, clients, args.seconds, rng)))
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGINT)
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
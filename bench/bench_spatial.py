@@ -0,0 +1,86 @@
+"""Move lookup latency: linear scans vs SpatialIndex, at 1x and 10x item counts.
+
+    python bench/bench_spatial.py [--moves N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from spatial import SpatialIndex  # noqa: E402
+
+BASE_ITEMS = 12500
+BASE_MOBS = 7500
+
+
+def make_entries(count: int, rng: random.Random) -> list[dict]:
+    return [{"type": "food", "subtype": "bread", "x": rng.randint(-100, 100), "y": rng.randint(-100, 100)}
+            for _ in range(count)]
+
+
+def walk(moves: int, rng: random.Random) -> list[tuple[int, int]]:
+    x, y = 0, 0
+    path = []
+    for _ in range(moves):
+        dx, dy = rng.choice(((0, 1), (0, -1), (1, 0), (-1, 0)))
+        x = max(-100, min(100, x + dx))
+        y = max(-100, min(100, y + dy))
+        path.append((x, y))
+    return path
+
+
+def linear_move(items: list[dict], mobs: list[dict], x: int, y: int):
+    pos_items = [item for item in items if item["x"] == x and item["y"] == y]
+    for item in pos_items:
+        items.remove(item)
+    [mob for mob in mobs if mob["x"] == x and mob["y"] == y]
+
+
+def indexed_move(items: SpatialIndex, mobs: SpatialIndex, x: int, y: int):
+    for item in items.at(x, y):
+        items.remove(item)
+    mobs.at(x, y)
+
+
+def run(scale: int, moves: int) -> dict[str, float]:
+    rng = random.Random(scale)
+    path = walk(moves, rng)
+    results = {}
+
+    for name in ("linear", "indexed"):
+        items = make_entries(BASE_ITEMS * scale, random.Random(1))
+        mobs = make_entries(BASE_MOBS * scale, random.Random(2))
+        if name == "indexed":
+            items, mobs = SpatialIndex(items), SpatialIndex(mobs)
+            step = indexed_move
+        else:
+            step = linear_move
+
+        samples = []
+        for x, y in path:
+            start = time.perf_counter()
+            step(items, mobs, x, y)
+            samples.append(time.perf_counter() - start)
+
+        results[name] = statistics.median(samples) * 1e6
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--moves", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'items':>8} {'linear us':>12} {'indexed us':>12}")
+    for scale in (1, 10):
+        result = run(scale, args.moves)
+        print(f"{scale:>5}x {BASE_ITEMS * scale:>8} {result['linear']:>12.1f} {result['indexed']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Bulk moves ('up 500') against the same number of single moves: equal outcome, and how much faster.
+
+    python bench/bench_walk.py [--cases N] [--steps N] [--seed S]
+
+Two engines load copies of one world. One walks with engine.walk, the
+other repeats move_player for exactly the cells the walk consumed. Player
+state, difficulty and every journal record (discovered cells, picked-up
+items) must come out identical; exits with status 1 otherwise. Then both
+ways are timed along an open corridor.
+"""
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import DIRECTIONS, AlbinaEngine  # noqa: E402
+from fixtures import clone_world, load_world, temp_world  # noqa: E402
+from journal import read_journal  # noqa: E402
+
+
+def fresh_pair() -> tuple[AlbinaEngine, AlbinaEngine]:
+    for name in ("bulk", "single"):
+        clone_world("template", name)
+    return load_world("bulk"), load_world("single")
+
+
+def open_corridor(engines, x: int, y: int, dx: int, dy: int, length: int):
+    for engine in engines:
+        for i in range(1, length + 1):
+            engine.world["discovered"].set(x + dx * i, y + dy * i, False)
+
+
+def state(engine: AlbinaEngine) -> tuple:
+    engine.journal.flush()
+    records = [{key: value for key, value in record.items() if key != "seq"}
+               for record in read_journal(engine.journal.world_path)]
+    return copy.deepcopy(engine.player), engine.mob_difficulty, len(engine.world["discovered"]), records
+
+
+def check(rng: random.Random, cases: int) -> str | None:
+    for case in range(cases):
+        bulk, single = fresh_pair()
+
+        start = rng.choice([(0, 0), (rng.randint(-120, 120), rng.randint(-120, 120)), (95, 0), (0, -98), (195, 30)])
+        for engine in (bulk, single):
+            engine.player["x"], engine.player["y"] = start
+
+        for _ in range(rng.randint(1, 6)):
+            direction = rng.choice(list(DIRECTIONS))
+            dx, dy, _ = DIRECTIONS[direction]
+            steps = rng.randint(1, 400)
+            if rng.random() < 0.7:
+                open_corridor((bulk, single), bulk.player["x"], bulk.player["y"], dx, dy, rng.randint(0, steps))
+
+            before = bulk.player["x"], bulk.player["y"]
+            bulk.walk(direction, steps)
+            moved = abs(bulk.player["x"] - before[0]) + abs(bulk.player["y"] - before[1])
+            blocked = "Dead end" in bulk.ui.drain()
+            for _ in range(moved + blocked):
+                single.move_player(direction)
+            single.ui.drain()
+
+        if state(bulk) != state(single):
+            return f"case {case}: start {start}: bulk and single moves differ"
+
+        for engine in (bulk, single):
+            engine.close_journal()
+    return None
+
+
+def timed(engine: AlbinaEngine, command: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.handle_command(command)
+    elapsed = time.perf_counter() - start
+    engine.ui.drain()
+    return elapsed
+
+
+def bench(steps: int, runs: int = 5) -> dict[str, list[float]]:
+    results = {"bulk": [], "single": []}
+
+    for run in range(runs):
+        bulk, single = fresh_pair()
+        start = (1000 + run * 10, 1000)
+        open_corridor((bulk, single), *start, 0, 1, steps)
+        for engine in (bulk, single):
+            engine.player["x"], engine.player["y"] = start
+            # The difficulty a player who walked there would have; the corridor still crosses into deeper ones.
+            engine.mob_difficulty = (max(map(abs, start)) - 1) // 100
+            # No mob on the corridor to stop the walk, and its regions paged in before timing.
+            for i in range(1, steps + 1):
+                engine.regions.focus(start[0], start[1] + i)
+                for entry in engine.mobs.at(start[0], start[1] + i):
+                    engine.mobs.remove(entry)
+
+        results["bulk"].append(timed(bulk, f"up {steps}", 1))
+        results["single"].append(timed(single, "up", steps))
+
+        for engine in (bulk, single):
+            engine.close_journal()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    with temp_world("walk", "template"):
+        failure = check(random.Random(seed), args.cases)
+        if failure:
+            print(f"FAIL (seed {seed}) {failure}")
+            sys.exit(1)
+        print(f"seed {seed}: {args.cases} walks equal to single moves")
+
+        print(f"\n{args.steps} cells along an open corridor, through handle_command:")
+        for name, samples in bench(args.steps).items():
+            print(f"{name:<8} {statistics.median(samples) * 1e6:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
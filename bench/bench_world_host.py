@@ -0,0 +1,128 @@
+"""World host: worlds are kept apart, unload when idle, and how commands/sec scales with worlds.
+
+    python bench/bench_world_host.py [--worlds N] [--clients N] [--seconds S] [--seed S]
+
+Starts src/world_host.py on --worlds fresh worlds with a one-second
+idle timeout. One player name in two worlds must be two players, an
+unknown world must be refused, a world must unload once its players
+have left, and a player must find their inventory again when the world
+is loaded back. Exits with status 1 otherwise. Then the same number of
+clients runs the way bench_server.py runs them, spread over 1, 2, 4, ...
+worlds up to --worlds. Each world is a process of its own, so the
+commands/sec can only grow with the worlds while there are cores left
+for them; the core count is printed with the results.
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_server import Client, load, report, start_server  # noqa: E402
+from fixtures import temp_world  # noqa: E402
+
+HOST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "world_host.py")
+
+
+async def wait_for(log: list[str], text: str, seconds: float) -> bool:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if any(text in line for line in log):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def check(port: int, log: list[str], rng: random.Random) -> str | None:
+    a, _ = await Client.connect(port, "alice", "w0")
+    b, welcome = await Client.connect(port, "alice", "w1")
+    if welcome != ["Welcome, alice"]:
+        return f"alice could not join a second world: {welcome}"
+
+    gifts = rng.randint(1, 3)
+    for _ in range(gifts):
+        await a.send("give")
+    if await b.send("inventory") != ["Inventory is empty"]:
+        return "alice in w1 sees her inventory from w0"
+    before = await a.send("inventory")
+
+    c, refused = await Client.connect(port, "carol", "nowhere")
+    if refused != ["No world called nowhere"]:
+        return f"unknown world was not refused: {refused}"
+    c.writer.close()
+
+    os.makedirs(os.path.join("world", "w1", "players"), exist_ok=True)
+    with open(os.path.join("world", "w1", "players", "dave.json"), "w", encoding="utf-8") as f:
+        f.write("{not json")
+    d, refused = await Client.connect(port, "dave", "w1")
+    d.writer.close()
+    if refused == ["Welcome, dave"]:
+        return "dave joined with a corrupt player file"
+    if not any("dave: 'join' failed" in line for line in log):
+        return "the failed join is not in the host log"
+    if await b.send("inventory") != ["Inventory is empty"]:
+        return "a failed join disturbed w1"
+
+    await a.close()
+    await b.close()
+    if not await wait_for(log, "Unloaded w0", 10):
+        return "w0 was not unloaded after its players left"
+
+    a, _ = await Client.connect(port, "alice", "w0")
+    if await a.send("inventory") != before:
+        return "alice's inventory changed across unloading w0"
+    await a.close()
+    return None
+
+
+async def loaded_load(port: int, clients: int, seconds: float, rng: random.Random,
+                      worlds: list[str]) -> tuple[float, list[float]]:
+    """load() with a player kept in every world throughout, so no world is started or unloaded while timed."""
+    keepers = [(await Client.connect(port, f"keeper{i}", world))[0] for i, world in enumerate(worlds)]
+    try:
+        return await load(port, clients, seconds, rng, worlds)
+    finally:
+        for keeper in keepers:
+            await keeper.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--worlds", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    worlds = [f"w{i}" for i in range(max(2, args.worlds))]
+    server = None
+
+    with temp_world("host", *worlds):
+        try:
+            server, port, log = start_server(HOST, "--idle", "1")
+
+            failure = asyncio.run(check(port, log, rng))
+            if failure:
+                print(f"FAIL (seed {seed}) {failure}")
+                sys.exit(1)
+            print(f"seed {seed}: worlds ok")
+
+            print(f"\n{args.clients} clients, {args.seconds:g}s per run, {os.cpu_count()} cores:")
+            counts = sorted({min(2 ** i, len(worlds)) for i in range(len(worlds).bit_length() + 1)})
+            for count in counts:
+                rate, latencies = asyncio.run(loaded_load(port, args.clients, args.seconds, rng, worlds[:count]))
+                report(f"{count:>3} {'world ' if count == 1 else 'worlds'}", rate, latencies)
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGINT)
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
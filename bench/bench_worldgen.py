@@ -0,0 +1,157 @@
+"""World generation: the original per-attempt loop vs worldgen.scatter, and what a region costs.
+
+    python bench/bench_worldgen.py [--runs N]
+
+Checks first that the NumPy and the plain-Python scatter give the same
+entities for a few seeds over the old -100..100 square with the old
+attempt counts, that they keep as many attempts as the rarities say and
+that the outcome shares match the old loop's within sampling noise, and
+that a region is the same whenever it is generated; exits with status 1
+otherwise. Then times the old loop, which builds every entry as a dict,
+against scatter, which returns columns, and against columns turned into
+dicts the same way, and times worldgen.region_entities.
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import worldgen  # noqa: E402
+from engine import ITEM_TYPES, MOB_TYPES  # noqa: E402
+from sampling import AliasTable, nested_uniform_weights, uniform_weights  # noqa: E402
+from wall_gen import seed_key  # noqa: E402
+from worldgen import ITEM_ATTEMPTS, MOB_ATTEMPTS, WORLD_RADIUS as RADIUS  # noqa: E402
+
+ITEM_TABLE = AliasTable(*nested_uniform_weights(ITEM_TYPES, rarity=True))
+MOB_TABLE = AliasTable(*uniform_weights(MOB_TYPES, rarity=True))
+
+
+def legacy_generate(seed: str) -> tuple[list[dict], list[dict]]:
+    random.seed(hashlib.sha256(seed.encode()).hexdigest())
+    items, mobs = [], []
+
+    for _ in range(random.randint(*ITEM_ATTEMPTS)):
+        item_type = random.choice(list(ITEM_TYPES.keys()))
+        item_subtype = random.choice(list(ITEM_TYPES[item_type].keys()))
+        if random.random() < ITEM_TYPES[item_type][item_subtype]["rarity"]:
+            items.append({
+                "type": item_type,
+                "subtype": item_subtype,
+                "x": random.randint(-RADIUS, RADIUS),
+                "y": random.randint(-RADIUS, RADIUS)
+            })
+
+    for _ in range(random.randint(*MOB_ATTEMPTS)):
+        mob_type = random.choice(list(MOB_TYPES.keys()))
+        if random.random() < MOB_TYPES[mob_type]["rarity"]:
+            mobs.append({
+                "type": mob_type,
+                "x": random.randint(-RADIUS, RADIUS),
+                "y": random.randint(-RADIUS, RADIUS),
+                "hp": MOB_TYPES[mob_type]["hp"]
+            })
+
+    return items, mobs
+
+
+def generate(seed: str, numpy: bool) -> tuple[worldgen.Scatter, worldgen.Scatter]:
+    np, worldgen.np = worldgen.np, worldgen.np if numpy else None
+    key, side = seed_key(seed), 2 * RADIUS + 1
+    try:
+        return (worldgen.scatter(key ^ 1, ITEM_ATTEMPTS, ITEM_TABLE, -RADIUS, -RADIUS, side, side),
+                worldgen.scatter(key ^ 2, MOB_ATTEMPTS, MOB_TABLE, -RADIUS, -RADIUS, side, side))
+    finally:
+        worldgen.np = np
+
+
+def entries(seed: str, numpy: bool) -> tuple[list[dict], list[dict]]:
+    items, mobs = generate(seed, numpy)
+    return worldgen.item_entries(items), worldgen.mob_entries(mobs, MOB_TYPES)
+
+
+def check(seeds: int) -> str | None:
+    new_items, new_mobs, old_items, old_mobs = Counter(), Counter(), Counter(), Counter()
+    for run in range(seeds):
+        seed = f"check{run}"
+        generated = entries(seed, numpy=False)
+        if worldgen.np is not None and entries(seed, numpy=True) != generated:
+            return f"NumPy and plain Python generate different entities for {seed}"
+        legacy = legacy_generate(seed)
+
+        for counter, found in ((new_items, generated[0]), (old_items, legacy[0])):
+            counter.update((item["type"], item["subtype"]) for item in found)
+        for counter, found in ((new_mobs, generated[1]), (old_mobs, legacy[1])):
+            counter.update(mob["type"] for mob in found)
+
+    for name, new, old, attempts, table in (("items", new_items, old_items, ITEM_ATTEMPTS, ITEM_TABLE),
+                                            ("mobs", new_mobs, old_mobs, MOB_ATTEMPTS, MOB_TABLE)):
+        new_total, old_total = sum(new.values()), sum(old.values())
+        expected = seeds * sum(attempts) / 2 * table.total
+        if abs(new_total - expected) > 0.08 * expected:
+            return f"{new_total} {name} generated, {expected:.0f} expected"
+        for outcome in old:
+            share, expected = new[outcome] / new_total, old[outcome] / old_total
+            if abs(share - expected) > 0.02:
+                return f"{outcome} is {share:.1%} of {name}, {expected:.1%} with the old loop"
+
+    for run in range(seeds):
+        key = (run - seeds // 2, 3 * run)
+        first = region(f"check{run}", key)
+        if region(f"check{run}", key) != first:
+            return f"region {key} of check{run} differs between two generations"
+    return None
+
+
+def region(seed: str, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+    return worldgen.region_entities(seed, key, ITEM_TABLE, MOB_TABLE, MOB_TYPES)
+
+
+def time_runs(func, runs: int) -> float:
+    samples = []
+    for run in range(runs):
+        seed = f"bench{run:07d}"
+        start = time.perf_counter()
+        func(seed)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    failure = check(30)
+    if failure:
+        print(f"FAIL {failure}")
+        sys.exit(1)
+    print("generators agree\n")
+
+    legacy = time_runs(legacy_generate, args.runs)
+    print(f"legacy loop:           {legacy:8.2f} ms")
+
+    results = {}
+    if worldgen.np is not None:
+        results["numpy"] = time_runs(lambda seed: generate(seed, numpy=True), args.runs)
+        results["numpy + dicts"] = time_runs(lambda seed: entries(seed, numpy=True), args.runs)
+    results["python"] = time_runs(lambda seed: generate(seed, numpy=False), args.runs)
+    results["python + dicts"] = time_runs(lambda seed: entries(seed, numpy=False), args.runs)
+
+    for name, median in results.items():
+        print(f"{name + ':':<22} {median:8.2f} ms  ({legacy / median:.1f}x)")
+
+    keys = [(run % 7 - 3, run // 7) for run in range(args.runs * 10)]
+    start = time.perf_counter()
+    for key in keys:
+        region("bench", key)
+    print(f"\nregion_entities:       {(time.perf_counter() - start) / len(keys) * 1e6:8.1f} us per region")
+
+
+if __name__ == "__main__":
+    main()
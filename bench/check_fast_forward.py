@@ -0,0 +1,143 @@
+"""Property check: fast-forwarding N ticks ends in the same state as running N ticks.
+
+    python bench/check_fast_forward.py [--cases N] [--seed S]
+
+Random players (hunger, sleep and HP anywhere from healthy to dying,
+including values the game never produces) and random world clocks are
+advanced both ways and compared exactly: values, their types and the tick
+on which the player died. A smaller number of cases runs through
+AlbinaEngine on a real world, comparing tick() against fast_forward().
+Exits with status 1 on the first mismatch.
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import simulation  # noqa: E402
+from fixtures import clone_world, load_world, temp_world  # noqa: E402
+
+
+def random_player(rng: random.Random) -> dict:
+    hunger = rng.choice([
+        rng.randint(0, 800) / 8,
+        rng.randint(0, 100),
+        round(rng.uniform(0, 100), rng.randint(0, 6)),
+        100,
+        100.0
+    ])
+    sleep = rng.choice([
+        rng.randint(0, 10000) / 100,
+        rng.randint(0, 100),
+        rng.uniform(0, 100),
+        99.95,
+        100
+    ])
+    return {"hunger": hunger, "sleep": sleep, "hp": rng.choice([rng.randint(-3, 100), 100, 1])}
+
+
+def random_ticks(rng: random.Random) -> int:
+    return rng.choice([0, 1, 2, rng.randint(1, 50), rng.randint(1, 2000), rng.randint(1, 100000)])
+
+
+def stepped(player: dict, ticks: int) -> tuple[dict, int, int, int, bool]:
+    player = dict(player)
+    starving = exhausted = 0
+    for tick in range(1, ticks + 1):
+        hungry, tired = simulation.step(player)
+        starving += hungry
+        exhausted += tired
+        if player["hp"] <= 0:
+            return player, tick, starving, exhausted, True
+    return player, ticks, starving, exhausted, False
+
+
+def same(a, b) -> bool:
+    return type(a) is type(b) and a == b
+
+
+def check_needs(rng: random.Random, cases: int) -> str | None:
+    for _ in range(cases):
+        player, ticks = random_player(rng), random_ticks(rng)
+        expected, last, starving, exhausted, died = stepped(player, ticks)
+
+        actual = dict(player)
+        result = simulation.fast_forward(actual, ticks)
+
+        if (result.ticks, result.starving, result.exhausted, result.died) != (last, starving, exhausted, died) \
+                or any(not same(actual[key], expected[key]) for key in expected):
+            return f"needs: {player} + {ticks} ticks: expected {expected} ({last}, {died}), got {actual} ({result})"
+    return None
+
+
+def check_clock(rng: random.Random, cases: int) -> str | None:
+    for _ in range(cases):
+        value = rng.choice([0.0, float(rng.randint(0, 10 ** 6)), rng.uniform(0, 10 ** 6), rng.uniform(0, 3),
+                            rng.uniform(2 ** 52, 2 ** 54)])
+        step = rng.choice([1.0, 0.5, 2.0, 0.1])
+        count = rng.randint(0, 20000)
+
+        expected = value
+        for _ in range(count):
+            expected += step
+
+        actual = simulation.repeat_add(value, step, count)
+        if not same(actual, expected):
+            return f"clock: {value!r} + {step} x {count}: expected {expected!r}, got {actual!r}"
+    return None
+
+
+def check_engine(rng: random.Random, cases: int) -> str | None:
+    with temp_world("ff", "template"):
+        for case in range(cases):
+            for name in ("stepped", "forwarded"):
+                clone_world("template", name)
+
+            a, b = load_world("stepped"), load_world("forwarded")
+            start = random_player(rng)
+            world_time = rng.choice([0.0, rng.uniform(0, 10 ** 5)])
+            for engine in (a, b):
+                engine.player.update(start)
+                engine.world["time"] = world_time
+
+            ticks = random_ticks(rng) % 5000
+            for _ in range(ticks):
+                a.tick()
+            b.fast_forward(ticks)
+
+            state_a = (copy.deepcopy(a.player), a.world["time"], a.game_loaded)
+            state_b = (copy.deepcopy(b.player), b.world["time"], b.game_loaded)
+            if state_a != state_b or not same(state_a[1], state_b[1]):
+                return f"engine case {case}: {start} + {ticks} ticks: {state_a} != {state_b}"
+
+            for engine in (a, b):
+                engine.close_journal()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    checks = (("needs", check_needs, args.cases), ("clock", check_clock, args.cases),
+              ("engine", check_engine, max(1, args.cases // 40)))
+    for name, check, cases in checks:
+        failure = check(rng, cases)
+        if failure:
+            print(f"FAIL (seed {seed}) {failure}")
+            sys.exit(1)
+        print(f"{name}: {cases} cases ok")
+
+    print(f"seed {seed}: all equal")
+
+
+if __name__ == "__main__":
+    main()
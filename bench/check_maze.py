@@ -0,0 +1,133 @@
+"""Maze walls: chunks join into one connected maze, are reproducible, and how fast they generate.
+
+    python bench/check_maze.py [--worlds N] [--span N] [--seed S]
+
+For random world seeds, a span x span block of chunks around a random
+corner (and one around spawn) is searched breadth-first from the spawn
+side: every open cell of the block must be reachable without leaving it.
+Each chunk must come out the same whether generated first, last or after
+being evicted from the cache. Exits with status 1 otherwise. Then
+chunk generation is timed against the old 100x100 generate_complex_maze.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from maze import MazeChunks  # noqa: E402
+from wall_gen import MAZE, WallGenerator  # noqa: E402
+from wall_map import CHUNK_SIZE  # noqa: E402
+
+
+def legacy_maze(rng: random.Random) -> list[list[int]]:
+    """generate_complex_maze as it was, minus writing the cells into discovered."""
+    width, height = 100, 100
+    maze = [[1 for _ in range(width)] for _ in range(height)]
+
+    x, y = rng.randint(0, width - 1), rng.randint(0, height - 1)
+    maze[y][x] = 0
+    stack = [(x, y)]
+
+    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+    while stack:
+        x, y = stack[-1]
+        rng.shuffle(directions)
+
+        for dx, dy in directions:
+            nx, ny = x + dx * 2, y + dy * 2
+
+            if 0 <= nx < width and 0 <= ny < height and maze[ny][nx] == 1:
+                maze[y + dy][x + dx] = 0
+                maze[ny][nx] = 0
+                stack.append((nx, ny))
+                break
+        else:
+            stack.pop()
+
+    return maze
+
+
+def check_block(walls: WallGenerator, cx0: int, cy0: int, span: int) -> str | None:
+    x0, y0 = cx0 * CHUNK_SIZE, cy0 * CHUNK_SIZE
+    x1, y1 = x0 + span * CHUNK_SIZE, y0 + span * CHUNK_SIZE
+
+    start = (x0, y0)
+    if walls.is_wall(*start):
+        return f"room {start} is a wall"
+
+    seen = {start}
+    todo = deque([start])
+    while todo:
+        x, y = todo.popleft()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if x0 <= nx < x1 and y0 <= ny < y1 and (nx, ny) not in seen and not walls.is_wall(nx, ny):
+                seen.add((nx, ny))
+                todo.append((nx, ny))
+
+    open_cells = sum(1 for x in range(x0, x1) for y in range(y0, y1) if not walls.is_wall(x, y))
+    if open_cells != len(seen):
+        return f"block at chunk {cx0},{cy0}: {open_cells - len(seen)} of {open_cells} open cells unreachable"
+    return None
+
+
+def check(rng: random.Random, worlds: int, span: int) -> str | None:
+    for _ in range(worlds):
+        seed = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=12))
+        walls = WallGenerator(seed, MAZE)
+
+        corner = (rng.randint(-800, 800), rng.randint(-800, 800))
+        for cx0, cy0 in ((-(span // 2), -(span // 2)), corner):
+            failure = check_block(walls, cx0, cy0, span)
+            if failure:
+                return f"world {seed}: {failure}"
+
+        keys = [(cx, cy) for cx in range(corner[0], corner[0] + span) for cy in range(corner[1], corner[1] + span)]
+        first = {key: bytes(walls.maze.get(*key)) for key in keys}
+        small = MazeChunks(walls.maze.seed_of, capacity=2)
+        for key in reversed(keys + keys):
+            if bytes(small.get(*key)) != first[key]:
+                return f"world {seed}: chunk {key} differs when generated in another order"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--worlds", type=int, default=10)
+    parser.add_argument("--span", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    failure = check(rng, args.worlds, args.span)
+    if failure:
+        print(f"FAIL (seed {seed}) {failure}")
+        sys.exit(1)
+    print(f"seed {seed}: {args.worlds} worlds connected and reproducible")
+
+    chunks = []
+    walls = WallGenerator("bench", MAZE)
+    for cx in range(50):
+        start = time.perf_counter()
+        walls.maze.get(cx, 0)
+        chunks.append(time.perf_counter() - start)
+
+    legacy = []
+    for run in range(10):
+        start = time.perf_counter()
+        legacy_maze(random.Random(run))
+        legacy.append(time.perf_counter() - start)
+
+    for name, samples in ((f"maze chunk ({CHUNK_SIZE}x{CHUNK_SIZE})", chunks), ("generate_complex_maze (100x100)", legacy)):
+        print(f"{name:<32} {statistics.median(samples) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
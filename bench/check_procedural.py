@@ -0,0 +1,167 @@
+"""Procedural items and mobs: regions regenerate identically and only the changes are saved.
+
+    python bench/check_procedural.py [--cases N] [--regions N] [--seed S]
+
+Each case visits random regions anywhere in the world, removes some items
+and damages or kills some mobs the way the game's journal records them,
+then compares the visited regions after a journal replay, after a
+snapshot compaction, and after reloading that snapshot; half the cases
+keep only a few regions loaded, so changed regions are written out as
+overlays and read back in between. Exits with
+status 1 on any difference. Then reports how big server.alb gets after
+visiting many regions with and without changing them, and how long a
+region takes to generate.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import AlbinaEngine  # noqa: E402
+from fixtures import clone_world, load_world, temp_world  # noqa: E402
+from regions import REGION_SIZE  # noqa: E402
+
+WORLD_LIMIT = 50000
+
+
+def load(name: str, capacity: int | None = None) -> AlbinaEngine:
+    engine = load_world(name)
+    if capacity:
+        engine.regions.capacity = capacity
+    return engine
+
+
+def fresh(name: str, capacity: int | None = None) -> AlbinaEngine:
+    clone_world("template", name)
+    return load(name, capacity)
+
+
+def random_region(rng: random.Random) -> tuple[int, int]:
+    limit = WORLD_LIMIT // REGION_SIZE - 1
+    return rng.randint(-limit, limit), rng.randint(-limit, limit)
+
+
+def contents(engine: AlbinaEngine, keys: list[tuple[int, int]]) -> list:
+    found = []
+    for rx, ry in keys:
+        x0, y0 = rx * REGION_SIZE, ry * REGION_SIZE
+        x1, y1 = x0 + REGION_SIZE - 1, y0 + REGION_SIZE - 1
+        found.append((sorted((i["x"], i["y"], i["type"], i["subtype"]) for i in engine.items.in_range(x0, y0, x1, y1)),
+                      sorted((m["x"], m["y"], m["type"], m["hp"]) for m in engine.mobs.in_range(x0, y0, x1, y1))))
+    return found
+
+
+def change(engine: AlbinaEngine, rng: random.Random, key: tuple[int, int]):
+    """Pick up some items and hit some mobs in region key, recording them as the game does."""
+    x0, y0 = key[0] * REGION_SIZE, key[1] * REGION_SIZE
+    x1, y1 = x0 + REGION_SIZE - 1, y0 + REGION_SIZE - 1
+
+    items = engine.items.in_range(x0, y0, x1, y1)
+    for item in rng.sample(items, rng.choice([0, min(1, len(items)), len(items) // 2, len(items)])):
+        engine.items.remove(item)
+        engine.journal_record("item_del", x=item["x"], y=item["y"], type=item["type"], subtype=item["subtype"])
+
+    mobs = engine.mobs.in_range(x0, y0, x1, y1)
+    for mob in rng.sample(mobs, rng.choice([0, min(1, len(mobs)), len(mobs) // 2, len(mobs)])):
+        hp_from = mob["hp"]
+        mob["hp"] = rng.choice([hp_from - 1, 0])
+        if mob["hp"] <= 0:
+            engine.mobs.remove(mob)
+        else:
+            engine.mobs.changed(mob)
+        engine.journal_record("mob", x=mob["x"], y=mob["y"], type=mob["type"], hp_from=hp_from, hp=mob["hp"])
+
+
+def compact(engine: AlbinaEngine):
+    engine.save_world()
+    engine.compact_world(engine.journal.world_path)
+    if engine.autosaver:
+        while engine.autosaver.busy():
+            time.sleep(0.01)
+        engine.collect_autosaves()
+
+
+def check(rng: random.Random, cases: int, regions: int) -> str | None:
+    for case in range(cases):
+        capacity = rng.choice([None, 12])
+        engine = fresh("case", capacity)
+        other = load("template")
+        keys = [random_region(rng) for _ in range(regions)]
+        if contents(engine, keys) != contents(other, keys):
+            return f"case {case}: two loads of one world generate different regions"
+        other.close_journal()
+
+        for key in keys:
+            if rng.random() < 0.7:
+                change(engine, rng, key)
+        expected = contents(engine, keys)
+        engine.save_world()
+        engine.close_journal()
+
+        engine = load("case", capacity)
+        if contents(engine, keys) != expected:
+            return f"case {case}: regions differ after journal replay"
+
+        compact(engine)
+        if contents(engine, keys) != expected:
+            return f"case {case}: regions differ after compaction"
+        engine.close_journal()
+
+        engine = load("case", capacity)
+        if contents(engine, keys) != expected:
+            return f"case {case}: regions differ after reloading the snapshot"
+        engine.close_journal()
+    return None
+
+
+def footprint(rng: random.Random, regions: int) -> dict[str, int]:
+    sizes = {}
+    for changed in (False, True):
+        engine = fresh("footprint")
+        for _ in range(regions):
+            key = random_region(rng)
+            engine.regions.focus(key[0] * REGION_SIZE, key[1] * REGION_SIZE)
+            if changed:
+                change(engine, rng, key)
+        compact(engine)
+        engine.close_journal()
+        sizes["changed" if changed else "visited"] = os.path.getsize(os.path.join("world", "footprint", "server.alb"))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=10)
+    parser.add_argument("--regions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    with temp_world("procedural", "template"):
+        failure = check(rng, args.cases, args.regions)
+        if failure:
+            print(f"FAIL (seed {seed}) {failure}")
+            sys.exit(1)
+        print(f"seed {seed}: {args.cases} cases of {args.regions} regions equal after replay, compaction and reload")
+
+        template = load("template")
+        samples = []
+        for _ in range(50):
+            key = random_region(rng)
+            start = time.perf_counter()
+            template.generate_region(key)
+            samples.append(time.perf_counter() - start)
+        template.close_journal()
+
+        print(f"\nregion generation: median {statistics.median(samples) * 1e3:.2f} ms")
+        for name, size in footprint(rng, args.regions * 5).items():
+            print(f"server.alb after {args.regions * 5} regions {name}: {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Scratch worlds shared by the benches and checks.
+
+Each bench runs in a temporary directory of its own, laid out the way the
+game lays out its working directory; temp_world() makes one and removes
+it afterwards.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import AlbinaEngine, HeadlessUI  # noqa: E402
+
+
+@contextmanager
+def temp_world(prefix: str, *names: str) -> Iterator[AlbinaEngine]:
+    """Run the block in a new directory with the server set up and worlds `names` created.
+
+    Yields the headless engine that created them; the previous working
+    directory is restored on the way out, however the block ends.
+    """
+    root = tempfile.mkdtemp(prefix=f"albina-{prefix}-")
+    cwd = os.getcwd()
+    os.chdir(root)
+
+    try:
+        engine = AlbinaEngine(HeadlessUI())
+        engine.check_server()
+        for name in names:
+            engine.new_world([name])
+        yield engine
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def clone_world(source: str, name: str):
+    """Replace world `name` with a copy of world `source`, as saved on disk."""
+    shutil.rmtree(os.path.join("world", name), ignore_errors=True)
+    shutil.copytree(os.path.join("world", source), os.path.join("world", name))
+
+
+def load_world(name: str) -> AlbinaEngine:
+    """A new headless engine with world `name` loaded."""
+    engine = AlbinaEngine(HeadlessUI())
+    engine.load_specific_world(name)
+    return engine
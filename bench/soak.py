@@ -0,0 +1,280 @@
+"""Soak test: bots play for a long stretch of game time and the report flags memory or latency creep.
+
+    python bench/soak.py [--bots N] [--ticks N] [--policy random|script] [--samples N]
+                         [--report PATH] [--seed S]
+
+Each bot runs in its own process on its own copy of a fresh world,
+driving the headless engine with the game's commands: moves, give, eat,
+equip, kick, sleep and save, either as a random walk that reacts to
+hunger, sleep, mobs and a full inventory or as one fixed script played
+in a loop. A virtual tick is the bot's commands for that tick followed
+by one scheduler step, so a run covers --ticks seconds of game time as
+fast as the machine goes; a bot that dies loads its world again.
+
+--samples times per run every bot records its commands/sec, RSS, the
+size of its world directory, discovered cells, console lines kept,
+inventory and kills, and the 50th/99th percentile tick time since the
+last sample. The report lists these per sample, summed or averaged
+over bots, and fits a line through the second half of the run (the
+first half is warm-up) for RSS and p99 tick time: growth above
+--memory-growth or --latency-growth over that half is flagged. The
+report is printed, and also written to --report when given.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine import DIRECTIONS, AlbinaEngine, HeadlessUI, new_player  # noqa: E402
+from fixtures import clone_world, temp_world  # noqa: E402
+
+SCRIPT = ["right 10", "give", "select 1", "eat", "up 10", "give", "select 1", "equip", "kick",
+          "left 10", "give", "select 1", "use", "down 10", "sleep", "save"]
+SAVE_EVERY = 300
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process; the peak instead where only that is known."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class RandomBot:
+    """Walks in runs, kicks what it meets, eats when hungry, wears what it finds, sleeps when tired."""
+
+    def __init__(self, engine: AlbinaEngine, rng: random.Random):
+        self.engine = engine
+        self.rng = rng
+        self.heading = rng.choice(list(DIRECTIONS))
+
+    def commands(self, tick: int) -> list[str]:
+        engine, rng = self.engine, self.rng
+        player = engine.player
+        inventory = player["inventory"]
+
+        if tick % SAVE_EVERY == 0:
+            return ["save"]
+        if engine.mobs.first_at(player["x"], player["y"]):
+            return ["kick"]
+        if player["sleep"] > 80 and player["time"] != "night":
+            return ["sleep"]
+
+        food = [i for i, item in enumerate(inventory, 1) if item["type"] == "food"]
+        if food and player["hunger"] > 50:
+            return [f"select {food[0]}", "eat"]
+
+        worn = {item["subtype"] for item in player["equipped"].values() if item}
+        for i, item in enumerate(inventory, 1):
+            if item["type"] == "clothes" and item["subtype"] not in worn:
+                return [f"select {i}", "equip"]
+        if len(inventory) >= player["inventory_capacity"]:
+            # Eating is the only way to drop something; keep the food if there is anything else.
+            junk = [i for i, item in enumerate(inventory, 1) if item["type"] != "food"] or [1]
+            return [f"select {junk[0]}", "eat"]
+
+        if rng.random() < (0.3 if player["hunger"] > 50 else 0.1):
+            return ["give"]
+        x, y = player["x"], player["y"]
+        known = engine.world["discovered"]
+        ways = [name for name, (dx, dy, _) in DIRECTIONS.items() if known.get(x + dx, y + dy) is not True]
+        if self.heading not in ways or rng.random() < 0.3:
+            self.heading = rng.choice(ways or list(DIRECTIONS))
+        steps = rng.choice([1, 1, 1, 5, 20])
+        return [self.heading if steps == 1 else f"{self.heading} {steps}"]
+
+
+class ScriptBot:
+    """Plays SCRIPT in a loop, one command per tick."""
+
+    def __init__(self, engine: AlbinaEngine, rng: random.Random):
+        self.position = rng.randrange(len(SCRIPT))
+
+    def commands(self, tick: int) -> list[str]:
+        self.position = (self.position + 1) % len(SCRIPT)
+        return [SCRIPT[self.position]]
+
+
+POLICIES = {"random": RandomBot, "script": ScriptBot}
+
+
+def run_bot(job: tuple) -> list[dict]:
+    """One bot's whole run in this process; returns its samples."""
+    index, policy, ticks, every, seed = job
+    name = f"bot{index}"
+    ui = HeadlessUI()
+    engine = AlbinaEngine(ui)
+    engine.check_server()
+    engine.load_specific_world(name)
+    bot = POLICIES[policy](engine, random.Random(seed))
+
+    samples = []
+    tick_times: list[float] = []
+    commands = deaths = 0
+    last_commands, last_time = 0, time.perf_counter()
+
+    for tick in range(1, ticks + 1):
+        start = time.perf_counter()
+        for command in bot.commands(tick):
+            engine.handle_command(command)
+            commands += 1
+        if not engine.game_loaded:
+            # The dead player is what got saved; come back as a new one in the same world.
+            deaths += 1
+            engine.load_specific_world(name)
+            engine.player.update(new_player())
+        engine.scheduler.step()
+        tick_times.append(time.perf_counter() - start)
+
+        if tick % every == 0 or tick == ticks:
+            now = time.perf_counter()
+            player = engine.player
+            samples.append({
+                "tick": tick,
+                "commands_per_s": (commands - last_commands) / (now - last_time),
+                "rss": rss_bytes(),
+                "save_bytes": directory_size(os.path.join("world", name)),
+                "discovered": len(engine.world["discovered"]),
+                "console_lines": len(ui.lines),
+                "inventory": len(player["inventory"]),
+                "kills": sum(player["killed_mobs"].values()),
+                "deaths": deaths,
+                "p50_ms": percentile(tick_times, 0.5) * 1000,
+                "p99_ms": percentile(tick_times, 0.99) * 1000,
+                "max_ms": max(tick_times) * 1000
+            })
+            tick_times = []
+            last_commands, last_time = commands, now
+
+    engine.exit_command(None)
+    return samples
+
+
+def growth(ticks: list[int], values: list[float]) -> float | None:
+    """Relative change a least-squares line predicts over the second half of the run."""
+    half = len(values) // 2
+    xs, ys = ticks[half:], values[half:]
+    if len(xs) < 2 or None in ys:
+        return None
+    slope = statistics.linear_regression(xs, ys).slope
+    mean = statistics.fmean(ys)
+    return slope * (xs[-1] - xs[0]) / mean if mean else None
+
+
+def report(runs: list[list[dict]], args) -> tuple[list[str], bool]:
+    lines = [f"{args.bots} {args.policy} bots, {args.ticks} ticks each", "",
+             f"{'tick':>8} {'cmd/s':>8} {'RSS MB':>8} {'save KB':>9} {'cells':>8} {'console':>8} "
+             f"{'kills':>6} {'deaths':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}"]
+    rows = []
+    for samples in zip(*runs):
+        rss = [s["rss"] for s in samples]
+        rows.append({
+            "tick": samples[0]["tick"],
+            "commands_per_s": sum(s["commands_per_s"] for s in samples),
+            "rss": statistics.fmean(rss) if None not in rss else None,
+            "save_bytes": statistics.fmean(s["save_bytes"] for s in samples),
+            "discovered": statistics.fmean(s["discovered"] for s in samples),
+            "console_lines": max(s["console_lines"] for s in samples),
+            "kills": sum(s["kills"] for s in samples),
+            "deaths": sum(s["deaths"] for s in samples),
+            "p50_ms": statistics.median(s["p50_ms"] for s in samples),
+            "p99_ms": max(s["p99_ms"] for s in samples),
+            "max_ms": max(s["max_ms"] for s in samples)
+        })
+
+    for row in rows:
+        rss = f"{row['rss'] / 2 ** 20:8.1f}" if row["rss"] is not None else f"{'-':>8}"
+        lines.append(f"{row['tick']:>8} {row['commands_per_s']:8.0f} {rss} {row['save_bytes'] / 1024:9.1f} "
+                     f"{row['discovered']:8.0f} {row['console_lines']:8} {row['kills']:6} {row['deaths']:6} "
+                     f"{row['p50_ms']:7.3f} {row['p99_ms']:7.3f} {row['max_ms']:7.2f}")
+
+    ticks = [row["tick"] for row in rows]
+    flagged = False
+    lines += ["", "Trend over the second half of the run:"]
+    for key, label, limit in (("rss", "RSS", args.memory_growth), ("p99_ms", "p99 tick time", args.latency_growth),
+                              ("save_bytes", "world on disk", None), ("discovered", "discovered cells", None)):
+        change = growth(ticks, [row[key] for row in rows])
+        if change is None:
+            lines.append(f"  {label}: not enough samples")
+            continue
+        verdict = ""
+        if limit is not None:
+            over = change > limit
+            flagged |= over
+            verdict = f"  FLAG: above {limit:+.0%}" if over else f"  ok (limit {limit:+.0%})"
+        lines.append(f"  {label}: {change:+.1%}{verdict}")
+    return lines, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=4)
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--memory-growth", type=float, default=0.10)
+    parser.add_argument("--latency-growth", type=float, default=0.50)
+    parser.add_argument("--report", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    report_path = os.path.abspath(args.report) if args.report else None
+    every = max(1, args.ticks // args.samples)
+    with temp_world("soak", "template"):
+        for index in range(args.bots):
+            clone_world("template", f"bot{index}")
+
+        jobs = [(index, args.policy, args.ticks, every, rng.randrange(2 ** 32)) for index in range(args.bots)]
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.bots) as pool:
+            runs = pool.map(run_bot, jobs)
+        elapsed = time.perf_counter() - start
+
+    lines, flagged = report(runs, args)
+    lines.insert(1, f"seed {seed}, {elapsed:.1f}s wall clock, "
+                    f"{args.bots * args.ticks / elapsed:.0f} bot ticks/s")
+    print("\n".join(lines))
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"\nReport written to {report_path}")
+    if flagged:
+        print("Growth flagged")
+
+
+if __name__ == "__main__":
+    main()
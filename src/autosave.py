@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import world_format
+
+DEFAULT_INTERVAL = 60.0
+
+
+def autosave_interval(config: dict) -> float | None:
+    """Read the autosave setting from server/config.cfg: true, false or a number of seconds."""
+    value = config.get("autosave", True)
+
+    if value is False or value is None:
+        return None
+    if value is True:
+        return float(config.get("autosave_interval", DEFAULT_INTERVAL))
+    return float(value)
+
+
+def write_atomic(path: str, data: str) -> int:
+    encoded = data.encode("utf-8")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return len(encoded)
+
+
+def write_snapshot(world_path: str, world: dict, player: dict) -> int:
+    """Serialize a world/player snapshot and swap it in with temp file + os.replace."""
+    # stat.alb first: if we die between the two, the older server.alb still
+    # replays the whole journal on top of it.
+    written = write_atomic(os.path.join(world_path, "stat.alb"), json.dumps(player))
+    written += world_format.write_world(os.path.join(world_path, "server.alb"), world)
+    return written
+
+
+@dataclass
+class SaveJob:
+    world_path: str
+    seq: int
+    world: dict
+    player: dict
+    reload: bool = False
+    stored: dict | None = None
+    error: Exception | None = None
+
+
+@dataclass
+class SyncJob:
+    fd: int
+    error: Exception | None = None
+
+
+class AutoSaver:
+    """Writes world snapshots and fsyncs the journal on a worker thread.
+
+    The caller captures a consistent copy of the game state on the main
+    thread (timed as snapshot_ms); serialization and the atomic file swap
+    happen on the worker (timed as write_ms), followed by reading the new
+    file back when the job asks for it. Finished jobs are handed
+    back through completed() so the main thread can drop covered journal
+    segments; journal syncs come back only when they fail.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stats = {
+            "saves": 0,
+            "failures": 0,
+            "skipped": 0,
+            "bytes_written": 0,
+            "snapshot_ms": 0.0,
+            "max_snapshot_ms": 0.0,
+            "write_ms": 0.0,
+            "max_write_ms": 0.0
+        }
+
+        self._last_save = time.monotonic()
+        self._jobs: queue.Queue[SaveJob | SyncJob | None] = queue.Queue()
+        self._done: queue.Queue[SaveJob | SyncJob] = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="albina-autosave", daemon=True)
+        self._thread.start()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_save >= self.interval
+
+    def reset(self):
+        self._last_save = time.monotonic()
+
+    def busy(self) -> bool:
+        with self._lock:
+            return self._pending > 0
+
+    def sync(self, fd: int):
+        """fsync and close fd on the worker, after any snapshot already queued."""
+        self._jobs.put(SyncJob(fd))
+
+    def submit(self, world_path: str, seq: int, capture: Callable[[], tuple[dict, dict]],
+               reload: bool = False) -> bool:
+        if self.busy():
+            self.stats["skipped"] += 1
+            return False
+
+        start = time.perf_counter()
+        world, player = capture()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats["snapshot_ms"] = elapsed
+        self.stats["max_snapshot_ms"] = max(self.stats["max_snapshot_ms"], elapsed)
+
+        with self._lock:
+            self._pending += 1
+        self._jobs.put(SaveJob(world_path, seq, world, player, reload))
+        return True
+
+    def completed(self) -> list[SaveJob | SyncJob]:
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._done.get_nowait())
+            except queue.Empty:
+                return jobs
+
+    def wait(self):
+        self._jobs.join()
+
+    def stop(self):
+        self.wait()
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            if isinstance(job, SyncJob):
+                self._sync(job)
+                self._jobs.task_done()
+                continue
+
+            start = time.perf_counter()
+            try:
+                written = write_snapshot(job.world_path, job.world, job.player)
+                if job.reload:
+                    job.stored = world_format.read_world(os.path.join(job.world_path, "server.alb"))
+            except Exception as e:
+                job.error = e
+                self.stats["failures"] += 1
+            else:
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stats["saves"] += 1
+                self.stats["bytes_written"] += written
+                self.stats["write_ms"] = elapsed
+                self.stats["max_write_ms"] = max(self.stats["max_write_ms"], elapsed)
+
+            job.player = None
+            self._done.put(job)
+            with self._lock:
+                self._pending -= 1
+            self._jobs.task_done()
+
+    def _sync(self, job: SyncJob):
+        try:
+            os.fsync(job.fd)
+        except OSError as e:
+            job.error = e
+            self._done.put(job)
+        finally:
+            os.close(job.fd)
@@ -0,0 +1,80 @@
+import bisect
+import json
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+
+# Upper bounds of the latency histogram buckets, in microseconds; the last bucket is open-ended.
+BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+@dataclass
+class CommandTiming:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS_US) + 1))
+
+    def add(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[bisect.bisect_left(BUCKETS_US, elapsed * 1e6)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound in microseconds of the bucket holding the given fraction of calls."""
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                return BUCKETS_US[bucket] if bucket < len(BUCKETS_US) else self.max * 1e6
+        return 0.0
+
+    def to_json(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            "p50_us": self.percentile(0.5),
+            "p99_us": self.percentile(0.99),
+            "histogram": {f"<={bound}us": count for bound, count in zip(BUCKETS_US, self.histogram)}
+                         | {f">{BUCKETS_US[-1]}us": self.histogram[-1]}
+        }
+
+
+class CommandStats:
+    """Call count, cumulative time and a latency histogram per (verb, state)."""
+
+    def __init__(self):
+        self.timings: dict[tuple[str, Enum], CommandTiming] = {}
+        self.since = time.time()
+
+    def record(self, key: tuple[str, Enum], elapsed: float):
+        timing = self.timings.get(key)
+        if timing is None:
+            timing = self.timings[key] = CommandTiming()
+        timing.add(elapsed)
+
+    def reset(self):
+        self.timings.clear()
+        self.since = time.time()
+
+    def rows(self) -> list[tuple[str, Enum, CommandTiming]]:
+        """Every recorded command, the most expensive in total first."""
+        return sorted(((verb, state, timing) for (verb, state), timing in self.timings.items()),
+                      key=lambda row: row[2].total, reverse=True)
+
+    def to_json(self) -> dict:
+        return {
+            "since": self.since,
+            "commands": {f"{verb}:{state.name}": timing.to_json() for verb, state, timing in self.rows()}
+        }
+
+    def dump(self, path: str) -> int:
+        data = json.dumps(self.to_json(), indent=2)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return len(data)
@@ -0,0 +1,78 @@
+from typing import Callable
+
+DEFAULT_MAX_LINES = 2000
+TRANSCRIPT_FILE = "server/console.log"
+
+
+def console_settings(config: dict) -> tuple[int, str | None]:
+    """Read console_lines and console_transcript (true, false or a path) from server/config.cfg."""
+    max_lines = int(config.get("console_lines", DEFAULT_MAX_LINES))
+
+    transcript = config.get("console_transcript", False)
+    if transcript is True:
+        transcript = TRANSCRIPT_FILE
+    elif not transcript:
+        transcript = None
+
+    return max_lines, transcript
+
+
+class ConsoleSink:
+    """Batches printed lines into one widget update and keeps the history bounded.
+
+    write() only queues a line; flush() hands everything queued to render
+    as one string, together with the number of old lines to drop from the
+    top. Lines are dropped in steps of a tenth of max_lines, so a long
+    session does not edit both ends of the widget on every flush. With a
+    transcript every line is also appended to that file.
+    """
+
+    def __init__(self, render: Callable[[str, int], None], max_lines: int = DEFAULT_MAX_LINES,
+                 transcript: str | None = None):
+        self.render = render
+        self.max_lines = max_lines
+        self.shown = 0
+        self._pending: list[str] = []
+        self._transcript = None
+        self.open_transcript(transcript)
+
+    def write(self, text: str) -> bool:
+        """Queue a line; True if it is the first one since the last flush."""
+        self._pending.append(text)
+        return len(self._pending) == 1
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        data = "\n".join(self._pending) + "\n"
+        self._pending = []
+
+        self.shown += data.count("\n")
+        trim = 0
+        if self.shown > self.max_lines + max(1, self.max_lines // 10):
+            trim = self.shown - self.max_lines
+            self.shown = self.max_lines
+
+        self.render(data, trim)
+
+        if self._transcript:
+            self._transcript.write(data)
+            self._transcript.flush()
+
+    def configure(self, max_lines: int, transcript: str | None):
+        self.max_lines = max_lines
+        self.open_transcript(transcript)
+
+    def open_transcript(self, path: str | None):
+        if self._transcript and self._transcript.name == path:
+            return
+
+        self.close()
+        if path:
+            self._transcript = open(path, "a", encoding="utf-8")
+
+    def close(self):
+        if self._transcript:
+            self._transcript.close()
+            self._transcript = None
@@ -0,0 +1,1517 @@
+"""Albina without a window: game state, rules and commands.
+
+AlbinaEngine talks to its frontend only through an AlbinaUI (output and
+colour changes). The Tk window in albina.py is one such frontend;
+HeadlessUI below collects output in memory for scripts, servers and
+benchmarks.
+"""
+from collections import deque
+from enum import Enum
+import copy
+import os
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Callable
+
+import autosave
+import pathfinding
+import simulation
+import wall_gen
+import world_format
+import worldgen
+from command_stats import CommandStats
+from console import DEFAULT_MAX_LINES
+from journal import WorldJournal, read_journal, replay
+from observable import ObservedDict
+from plugin_manager import AlbinaEvent, AlbinaManager, AlbinaUI
+from regions import OVERLAY_DIR, REGION_SIZE, MemoryRegions, ProceduralRegions, RegionStore, region_of
+from sampling import SamplerRegistry, nested_uniform_weights, uniform_weights
+from scheduler import Job, Scheduler
+from wall_map import WallMap
+
+
+ITEM_TYPES = {
+    "clothes": {
+        "ushanka": {"name": "Ushanka", "effect": {"sleep_rate": -0.2}, "rarity": 0.3},
+        "leather_jacket": {"name": "Leather Jacket", "effect": {"snake_damage": -0.2}, "rarity": 0.3},
+        "striped_pants": {"name": "Striped Pants", "effect": {"hunger_rate": -0.2}, "rarity": 0.3},
+        "croc_shoes": {"name": "Crocodile Shoes", "effect": {"move_speed": 0.1}, "rarity": 0.1},
+    },
+    "food": {
+        "vodka": {"name": "Vodka", "hunger": -50, "rarity": 0.1},
+        "bread": {"name": "Bread", "hunger": -35, "rarity": 0.4},
+        "pickles": {"name": "Pickles", "hunger": -30, "rarity": 0.5},
+        "potato": {"name": "Potato", "hunger": -10, "rarity": 0.7},
+        "resin": {"name": "Resin", "hunger": -5, "rarity": 0.8},
+        "bones": {"name": "Bones", "hunger": -1, "rarity": 0.6},
+        "cockroach": {"name": "Cockroach", "hunger": -2, "rarity": 0.9}
+    },
+    "special": {
+        "pingpong": {"name": "Ping Pong Ball", "effect": {"ping": True}, "rarity": 0.2},
+        "wires": {"name": "Wires", "effect": {"craft": True}, "rarity": 0.4},
+        "backpack": {"name": "Backpack", "effect": {"capacity": 15}, "rarity": 0.1}
+    }
+}
+
+MOB_TYPES = {
+    "snake": {"name": "Snake", "hp": 5, "damage": 3, "rarity": 0.5},
+    "rat": {"name": "Rat", "hp": 6, "damage": 2, "rarity": 0.4},
+    "centipede": {"name": "Centipede", "hp": 10, "damage": 4, "rarity": 0.3},
+    "cockroach": {"name": "Cockroach", "hp": 1, "damage": 0, "rarity": 0.8}
+}
+
+COMMAND_STATS_FILE = "server/command_stats.json"
+
+DIRECTIONS = {"up": (0, 1, "N"), "down": (0, -1, "S"), "left": (-1, 0, "W"), "right": (1, 0, "E")}
+MAX_WALK = 100000
+WALL_BATCH = 32
+MAX_WALL_BATCH = 4096
+
+
+def path_moves(start: tuple[int, int], path: list[tuple[int, int]]) -> list[tuple[str, int]]:
+    """A path of adjacent cells as runs of (direction, cells) for walk()."""
+    names = {(dx, dy): name for name, (dx, dy, _) in DIRECTIONS.items()}
+    moves = []
+    x, y = start
+    for nx, ny in path:
+        direction = names[(nx - x, ny - y)]
+        if moves and moves[-1][0] == direction:
+            moves[-1] = (direction, moves[-1][1] + 1)
+        else:
+            moves.append((direction, 1))
+        x, y = nx, ny
+    return moves
+
+
+def new_player() -> dict:
+    """stat.alb of someone who has just entered the labyrinth."""
+    return {
+        "x": 0,
+        "y": 0,
+        "hp": 100,
+        "sleep": 0,
+        "hunger": 0,
+        "exp": 0,
+        "day": 1,
+        "time": "morning",
+        "inventory": [],
+        "equipped": {
+            "hat": None,
+            "jacket": None,
+            "pants": None,
+            "shoes": None
+        },
+        "used": None,
+        "killed_mobs": {},
+        "collected_items": [],
+        "inventory_capacity": 3,
+        "kick_damage": 2
+    }
+
+
+class State(Enum):
+    MENU = 0
+    GAME = 1
+
+
+class CommandHandler:
+    def __init__(self, commands: dict[tuple[str, State], Callable]):
+        self._commands: dict[tuple[str, State], Callable] = dict()
+        self.stats = CommandStats()
+        self.timing = False
+
+        for item, callback in commands.items():
+            verb, state = item
+            if callable(callback):
+                self._commands[(verb.lower(), state)] = callback
+            else:
+                raise TypeError(f"Handler for {verb} isn't callable")
+
+    def has(self, verb: str, state: State) -> bool:
+        return (verb.lower(), state) in self._commands
+
+    def unregister(self, verb: str, state: State):
+        self._commands.pop((verb.lower(), state), None)
+
+    def register(self, verb: str, state: State, callback: Callable):
+        if not callable(callback):
+            raise TypeError(f"Handler for {verb} isn't callable")
+        self._commands[(verb.lower(), state)] = callback
+
+    def verbs(self, state: State) -> list[str]:
+        return sorted(verb for verb, verb_state in self._commands if verb_state == state)
+
+    def process_command(self, command: str, state: State):
+        # Only the verb is case-insensitive; arguments such as file paths are passed on as typed.
+        blocks = command.strip().split()
+
+        args = blocks[1:]
+
+        first = blocks[0].lower()
+
+        func = self._commands.get((first, state))
+
+        if not func:
+            return f"Unknown command '{first}'"
+
+        if not self.timing:
+            func(args)
+            return
+
+        start = time.perf_counter()
+        try:
+            func(args)
+        finally:
+            self.stats.record((first, state), time.perf_counter() - start)
+
+
+class HeadlessUI(AlbinaUI):
+    """Frontend without a window: output is kept in memory until drained, at most max_lines of it."""
+
+    def __init__(self, echo: bool = False, max_lines: int | None = DEFAULT_MAX_LINES):
+        self.echo = echo
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.color = "#00ff00"
+        self.direction = "X"
+        self.closed = False
+
+    def change_color(self, color: str = "#00ff00", pos: str = "X"):
+        self.color = color
+        self.direction = pos
+
+    def print(self, text):
+        self.lines.append(text)
+        if self.echo:
+            print(text)
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> list[str]:
+        lines = list(self.lines)
+        self.lines.clear()
+        return lines
+
+
+class AlbinaEngine:
+    """Player, world, commands and the per-second tick, with all output going through self.ui."""
+
+    def __init__(self, ui: AlbinaUI):
+        self.ui = ui
+        self.version = "Albina V1.1"
+        self.running = True
+        self.server_running = False
+        self.game_loaded = False
+        self.current_world = None
+        self.day_length = 300
+        self.selected_item = None
+        self.plugins = []
+        self.mob_difficulty = 0
+        self.migrate_walls = True
+        self.walls = None
+        self.planner = None
+        self.goto_search = None
+        self.journal = None
+        self._saved_player = {}
+        self.region_capacity = 64
+        self.config = {}
+        self.autosaver = None
+        self._state = State.MENU
+        self.scheduler = Scheduler(on_error=self.job_failed, on_skip=self.fast_forward)
+
+        self.item_types = copy.deepcopy(ITEM_TYPES)
+        self.mob_types = copy.deepcopy(MOB_TYPES)
+
+        self.samplers = SamplerRegistry()
+        self.samplers.register("give", lambda: nested_uniform_weights(self.item_types))
+        self.samplers.register("drop", lambda: nested_uniform_weights(self.item_types, ["food", "special"]))
+        # Worlds are generated from the built-in types only, so plugins cannot change what a seed gives.
+        self.samplers.register("world_items", lambda: nested_uniform_weights(ITEM_TYPES, rarity=True))
+        self.samplers.register("world_mobs", lambda: uniform_weights(MOB_TYPES, rarity=True))
+
+        self.player = ObservedDict(new_player())
+
+        self.world = {
+            "seed": None,
+            "layout": {},
+            "discovered": WallMap(),
+            "time": 0.0
+        }
+
+        self.open_regions(MemoryRegions([], []))
+
+        commands = {
+            ("worlds", State.MENU): self.worlds_list,
+            ("load", State.MENU): self.load_command,
+            ("new", State.MENU): self.new_world,
+            ("exit", State.MENU): self.exit_command,
+            ("help", State.MENU): self.help_command,
+            ("credits", State.MENU): self.credits_command,
+            ("stop", State.MENU): self.stop_command,
+            ("start", State.MENU): self.start_command,
+            ("exit", State.MENU): self.exit_command,  # noqa: F601
+            ("stats", State.MENU): self.stats_command,
+
+            ("up", State.GAME): self.up_command,
+            ("down", State.GAME): self.down_command,
+            ("left", State.GAME): self.left_command,
+            ("right", State.GAME): self.right_command,
+            ("goto", State.GAME): self.goto_command,
+            ("inventory", State.GAME): self.show_inventory,
+            ("give", State.GAME): self.give_item,
+            ("select", State.GAME): self.select_item,
+            ("kick", State.GAME): self.kick,
+            ("eat", State.GAME): self.eat_item,
+            ("sleep", State.GAME): self.sleep,
+            ("ping", State.GAME): self.ping,
+            ("cloth", State.GAME): self.show_equipped,
+            ("equip", State.GAME): self.equip_item,
+            ("unequip", State.GAME): self.unequip_item,
+            ("use", State.GAME): self.use_item,
+            ("save", State.GAME): self.save_game,
+            ("kill", State.GAME): self.kill_command,
+            ("plugin", State.GAME): self.list_plugins,
+            ("autosave", State.GAME): self.autosave_stats,
+            ("stats", State.GAME): self.stats_command,
+            ("exit", State.GAME): self.exit_game_mode
+        }
+
+        self.command_handler = CommandHandler(commands)
+        self.plugin_manager = AlbinaManager(self, State.GAME)
+
+        self.scheduler.every(self.scheduler.tick_length, self.tick, name="tick")
+        self.scheduler.every(self.scheduler.tick_length, self.autosave_tick, name="autosave")
+
+    def print_to_console(self, text):
+        self.ui.print(text)
+
+    def color_gui(self, color: str = "#00ff00", pos: str = "X"):
+        self.ui.change_color(color, pos)
+
+    def handle_command(self, command: str):
+        self.print_to_console(f"> {command}")
+
+        if self.plugin_manager.listening(AlbinaEvent.COMMAND):
+            words = command.strip().split()
+            self.plugin_manager.emit(AlbinaEvent.COMMAND, {"verb": words[0].lower() if words else "", "args": words[1:]})
+
+        traceback = self.command_handler.process_command(command, self._state)
+
+        if traceback:
+            self.print_to_console(traceback)
+        self.plugin_manager.flush()
+
+    def update(self):
+        """Run the ticks that are due. Frontends call this from their own loop."""
+        self.scheduler.advance()
+
+    def job_failed(self, job: Job, error: Exception):
+        self.print_to_console(f"Error in {job.name or job.callback.__name__}: {error}")
+
+    def kill_command(self, _args):
+        self.game_over("You committed suicide")
+
+    def help_command(self, _args):
+        self.print_to_console("Albina says: no one will help you")
+
+    def credits_command(self, _args):
+        self.print_to_console(self.version)
+
+    def check_server(self):
+        """Set up server/ and plugins/ and read server/config.cfg; hosting over TCP is src/server.py."""
+        if not os.path.exists("server"):
+            os.makedirs("server")
+            self.print_to_console("Created server directory")
+
+        if not os.path.exists("server/config.cfg"):
+            with open("server/config.cfg", "w") as f:
+                json.dump({"port": 8080, "autosave": True}, f)
+            self.print_to_console("Created default config file")
+
+        if not os.path.exists("plugins"):
+            os.makedirs("plugins")
+            self.print_to_console("Created plugins directory")
+
+        try:
+            with open("server/config.cfg", "r") as f:
+                self.config = json.load(f)
+        except Exception as e:
+            self.print_to_console(f"Error reading server config: {e}")
+            self.config = {}
+
+        interval = autosave.autosave_interval(self.config)
+        if interval and self.autosaver is None:
+            self.autosaver = autosave.AutoSaver(interval)
+            self.print_to_console(f"Autosave every {interval:g}s")
+
+        if self.config.get("command_stats"):
+            self.command_handler.timing = True
+
+        self.server_running = True
+        self.print_to_console("Server config loaded")
+        self.print_to_console("Type 'load' to load a world")
+
+    def worlds(self) -> list[str] | None:
+        if not os.path.exists("world"):
+            os.makedirs("world")
+            self.print_to_console("Created worlds directory")
+            return None
+
+        worlds = [d for d in os.listdir("world") if os.path.isdir(os.path.join("world", d))]
+
+        if worlds:
+            return worlds
+        else:
+            return None
+
+    def worlds_list(self, _args):
+        worlds = self.worlds()
+
+        if worlds:
+            self.print_to_console("Available worlds:")
+            for i, world in enumerate(worlds, 1):
+                self.print_to_console(f"{i}. {world}")
+
+            self.print_to_console("type 'load <index>' to load world")
+        else:
+            self.print_to_console("No available worlds")
+            self.print_to_console("type 'new <name>' to create new world")
+
+    def load_command(self, args: list[str]):
+        index = int(args[0])
+
+        worlds = self.worlds()
+
+        if worlds:
+            self.load_specific_world(worlds[index - 1])
+        else:
+            self.print_to_console("type 'new <name>' to create new world")
+
+    def load_specific_world(self, world_name):
+        world_path = os.path.join("world", world_name)
+
+        if not os.path.exists(world_path):
+            self.print_to_console(f"World {world_name} not found")
+            return
+
+        server_file = os.path.join(world_path, "server.alb")
+        stat_file = os.path.join(world_path, "stat.alb")
+
+        if os.path.exists(server_file):
+            try:
+                world_data = world_format.read_world(server_file)
+                source = world_data.pop("regions")
+                diffs = world_data.pop("region_diffs", None)
+                self.world.update({"wall_generator": None, "entities": None, "journal_seq": 0})
+                self.world.update(world_data)
+                self.walls = wall_gen.for_world(self.world, self.migrate_walls)
+                self.open_regions(self.region_source(source, diffs), world_path)
+
+            except Exception as e:
+                self.print_to_console(f"Error loading world data: {e}")
+                return
+
+            self.current_world = world_name
+            self._state = State.GAME
+            self.game_loaded = True
+
+        else:
+            self.print_to_console("No world data found")
+            return
+
+        if os.path.exists(stat_file):
+            try:
+                with open(stat_file, "r", encoding="utf-8") as f:
+                    player_data = json.load(f, parse_int=None)
+                    self.player.update(player_data)
+            except Exception as e:
+                self.print_to_console(f"Error loading world data: {e}")
+                return
+
+        else:
+            self.print_to_console("No world data found")
+            return
+
+        try:
+            records = read_journal(world_path, self.world["journal_seq"])
+            last_seq = replay(records, self.world, self.player, self.regions)
+        except Exception as e:
+            self.print_to_console(f"Error replaying world journal: {e}")
+            return
+
+        self.journal = WorldJournal(world_path)
+        if self.autosaver:
+            self.journal.syncer = self.autosaver.sync
+        self.journal.open(last_seq)
+        self._saved_player = copy.deepcopy(self.player)
+        self.regions.focus(self.player["x"], self.player["y"])
+
+        self.print_to_console(f"World {world_name} loaded")
+        self.print_to_console("Use commands: up, down, left, right to move")
+
+        if abs(self.player["x"]) > 50000 or abs(self.player["y"]) > 50000:
+            self.game_over("You saw the light and came out. This is the end")
+
+    def open_regions(self, source, world_path: str | None = None):
+        # In-memory sources hold the whole world already; paging them out would only add disk writes.
+        capacity = None if isinstance(source, MemoryRegions) else self.region_capacity
+        overlay_dir = os.path.join(world_path, OVERLAY_DIR) if world_path else None
+
+        self.regions = RegionStore(source, overlay_dir, capacity, current_seq=self.journal_seq)
+        self.items = self.regions.items
+        self.mobs = self.regions.mobs
+
+    def region_source(self, source, diffs: dict | None = None):
+        """The world file's regions, or for a procedural world its regions generated and patched with diffs."""
+        if self.world.get("entities") != worldgen.PROCEDURAL:
+            return source
+
+        regions = ProceduralRegions(dict(diffs or {}), self.generate_region)
+        # Saves from before diffs stored each changed region whole.
+        for key in source.keys():
+            regions.diffs[key] = regions.diff(key, *source.load(key))
+        return regions
+
+    def generate_region(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+        return worldgen.region_entities(self.world["seed"], key, self.samplers.table("world_items"),
+                                        self.samplers.table("world_mobs"), MOB_TYPES, self.walls.is_wall)
+
+    def journal_seq(self) -> int:
+        return self.journal.seq if self.journal else self.world.get("journal_seq", 0)
+
+    def generate_world(self):
+        data = dict()
+
+        data["seed"] = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=12))
+        data["wall_generator"] = wall_gen.MAZE
+
+        data["layout"] = {}
+        data["time"] = 0.0
+        # Items and mobs are generated per region when first reached; see region_source.
+        data["entities"] = worldgen.PROCEDURAL
+
+        return data
+
+    def new_world(self, args: list[str]):
+        name = args[0].lower()
+
+        if not os.path.exists("world"):
+            os.makedirs("world")
+
+        os.mkdir(f"world/{name}")
+
+        with open(f"world/{name}/stat.alb", 'w', encoding="utf-8") as file:
+            data = new_player()
+            data["start_time"] = time.time()
+
+            json.dump(data, file)
+
+        data = self.generate_world()
+        data["format"] = world_format.VERSION
+        world_format.write_world(f"world/{name}/server.alb", data)
+
+        self.print_to_console(f"created world \"{name}\"")
+
+    def up_command(self, args: list[str]):
+        self.move_command("up", args)
+
+    def down_command(self, args: list[str]):
+        self.move_command("down", args)
+
+    def left_command(self, args: list[str]):
+        self.move_command("left", args)
+
+    def right_command(self, args: list[str]):
+        self.move_command("right", args)
+
+    def move_command(self, direction: str, args: list[str]):
+        if not args:
+            self.move_player(direction)
+            return
+
+        try:
+            steps = int(args[0])
+        except ValueError:
+            steps = 0
+
+        if steps < 1:
+            self.print_to_console(f"Usage: {direction} [steps]")
+            return
+
+        self.walk(direction, min(steps, MAX_WALK))
+
+    def walk(self, direction: str, steps: int, quiet: bool = False) -> tuple[int, bool]:
+        """Move up to `steps` cells, stopping at a wall or on the first cell that holds a mob.
+
+        Changes the same state as that many single moves (sleep, discovered
+        cells, difficulty, encounters at difficulty boundaries) but prints
+        one summary line instead of one per cell, or none if quiet. Items
+        are walked over as single moves do, and the summary counts them.
+        Returns the number of cells moved and whether something stopped the
+        walk.
+
+        The path is taken a segment at a time, each inside one region: its
+        walls come from walls_ahead, the entities on it from one range
+        query, and the next difficulty boundary is worked out rather than
+        tested cell by cell. Segments grow while the walk goes on, so one
+        that stops early does not pay for the whole path.
+        """
+        dx, dy, pos = DIRECTIONS[direction]
+        player = self.player
+        discovered = self.world["discovered"]
+        x, y, sleep = player["x"], player["y"], player["sleep"]
+        moved = passed = 0
+        blocked = False
+        stopped_by = None
+        batch = WALL_BATCH
+
+        def settle():
+            player["sleep"] = sleep
+            player["x"], player["y"] = x, y
+
+        while moved < steps and not blocked and stopped_by is None:
+            along, step = (x + dx, dx) if dx else (y + dy, dy)
+            count = min(batch, steps - moved, REGION_SIZE - along % REGION_SIZE if step > 0 else along % REGION_SIZE + 1)
+            batch = min(batch * 2, MAX_WALL_BATCH)
+
+            walls, missing = self.walls_ahead(x, y, dx, dy, count)
+            open_cells = walls.index(True) if True in walls else count
+
+            # The first cell past the current difficulty, by the same test move_player makes.
+            limit = 100 + self.mob_difficulty * 100
+            if abs(along) > limit or abs(y if dx else x) > limit:
+                crossing = 1
+            else:
+                crossing = limit - step * (along - step) + 1
+            free = min(open_cells, crossing - 1)
+
+            region = None
+            if open_cells:
+                self.regions.focus(x + dx, y + dy)
+                region = self.regions.region(region_of(x + dx, y + dy))
+
+            crossed = False
+            hit = self.first_mob(region, x, y, dx, dy, free) if free else None
+            if hit:
+                (cells, stopped_by), reached = hit, hit[0]
+            elif free == count:
+                cells = reached = free
+            elif free == open_cells:
+                cells, reached, blocked = free, free + 1, True
+            else:
+                cells = reached = free + 1
+                crossed = True
+
+            # Cells are recorded once reached, walls included, as check_wall_collision does.
+            for i in missing:
+                if i >= reached:
+                    break
+                cx, cy = x + dx * (i + 1), y + dy * (i + 1)
+                discovered.set(cx, cy, walls[i])
+                self.journal_record("cell", x=cx, y=cy, wall=walls[i])
+
+            # A crossing cell's items are picked up by check_position, not walked past.
+            if cells > crossed:
+                over = cells - crossed
+                passed += len(region.items.in_range(x + dx, y + dy, x + dx * over, y + dy * over))
+            sleep = min(100, sleep + reached)
+            x, y = x + dx * cells, y + dy * cells
+            moved += cells
+
+            if crossed:
+                settle()
+                self.mob_difficulty += 1
+                self.print_to_console("You feel the darkness getting deeper...")
+                self.check_position(pos)
+                # check_position may have picked up or fought what was here, so look again.
+                stopped_by = self.mob_here(region, x, y)
+
+        settle()
+
+        if moved:
+            if not quiet:
+                over = f", past {passed} {'item' if passed == 1 else 'items'}" if passed else ""
+                self.print_to_console(f"Moved {direction} {moved} {'cell' if moved == 1 else 'cells'}{over}")
+            self.plugin_manager.emit(AlbinaEvent.MOVE, {"x": x, "y": y, "direction": direction, "cells": moved})
+        if blocked:
+            self.color_gui("blue")
+            self.print_to_console("Dead end")
+        elif stopped_by:
+            self.print_to_console(f"You stop: {stopped_by}")
+        return moved, blocked or stopped_by is not None
+
+    def first_mob(self, region, x: int, y: int, dx: int, dy: int, cells: int) -> tuple[int, str] | None:
+        """The nearest of the next `cells` cells that holds a mob, as (distance, reason)."""
+        found = region.mobs.in_range(x + dx, y + dy, x + dx * cells, y + dy * cells)
+        if not found:
+            return None
+
+        # The first mob listed on the nearest cell, as first_at gives it.
+        distance, mob = min(((abs(mob["x"] - x) + abs(mob["y"] - y), mob) for mob in found), key=lambda hit: hit[0])
+        return distance, f"{self.mob_types[mob['type']]['name']} is here"
+
+    def mob_here(self, region, x: int, y: int) -> str | None:
+        mob = region.mobs.first_at(x, y)
+        return f"{self.mob_types[mob['type']]['name']} is here" if mob else None
+
+    def goto_command(self, args: list[str]):
+        try:
+            goal = int(args[0]), int(args[1])
+        except (IndexError, ValueError):
+            self.print_to_console("Usage: goto <x> <y>")
+            return
+
+        start = self.player["x"], self.player["y"]
+        if start == goal:
+            self.print_to_console("You are already there")
+            return
+
+        self.goto_search = self.route_planner().begin(start, goal)
+        self.continue_goto(self.goto_search)
+
+    def continue_goto(self, search: pathfinding.Search):
+        """Plan a slice of a goto and come back on the next update, then walk the route once planned.
+
+        Planning stops when the player moves, the world changes or another
+        goto replaces it.
+        """
+        if search is not self.goto_search or search.planner is not self.planner or not self.game_loaded:
+            return
+        start, goal = search.start, search.goal
+        if (self.player["x"], self.player["y"]) != start:
+            self.goto_search = None
+            self.print_to_console(f"You moved; goto {goal[0]} {goal[1]} stopped")
+            return
+
+        plan = search.run(pathfinding.PLAN_SLICE_SECONDS)
+        if plan is None:
+            if search.slices == 1:
+                self.print_to_console(f"Planning a route to {goal[0]}, {goal[1]}...")
+            self.scheduler.soon(self.continue_goto, search, name="goto")
+            return
+
+        self.goto_search = None
+        if plan.status == pathfinding.NO_ROUTE or not plan.path:
+            self.print_to_console(f"No route to {goal[0]}, {goal[1]}")
+            return
+
+        walked = 0
+        for direction, steps in path_moves(start, plan.path):
+            moved, stopped = self.walk(direction, steps, quiet=True)
+            walked += moved
+            if stopped or not self.game_loaded:
+                break
+
+        position = self.player["x"], self.player["y"]
+        if position == goal:
+            self.print_to_console(f"Arrived at {goal[0]}, {goal[1]} after {walked} cells")
+        elif walked == len(plan.path):
+            self.print_to_console(f"Walked {walked} cells toward {goal[0]}, {goal[1]}; "
+                                  f"no full route found yet, goto again to go on")
+        elif walked:
+            self.print_to_console(f"Walked {walked} of {len(plan.path)} cells toward {goal[0]}, {goal[1]}")
+
+    def route_planner(self) -> pathfinding.Planner:
+        """The goto planner for the loaded world, rebuilt when the world or the budget changes."""
+        nodes, seconds = pathfinding.plan_budget(self.config, self.walls.algorithm)
+        planner = self.planner
+        if planner is None or planner.walls.generator is not self.walls \
+                or planner.walls.discovered is not self.world["discovered"]:
+            planner = self.planner = pathfinding.Planner(
+                pathfinding.WallCache(self.world["discovered"], self.walls), nodes, seconds)
+
+        planner.max_nodes, planner.max_seconds = nodes, seconds
+        return planner
+
+    def walls_ahead(self, x: int, y: int, dx: int, dy: int, count: int) -> tuple[list[bool], list[int]]:
+        """Whether each of the count cells from (x + dx, y + dy) on is a wall, and which of them are undiscovered.
+
+        Nothing is recorded here: walk records the cells it actually reaches.
+        Maze chunks are sliced whole; other generators only compute the
+        undiscovered cells.
+        """
+        walls = self.world["discovered"].line(x + dx, y + dy, dx, dy, count)
+        missing = [i for i, wall in enumerate(walls) if wall is None]
+
+        if missing and (self.walls.maze is not None or len(missing) == count):
+            generated = self.walls.line(x + dx, y + dy, dx, dy, count)
+            for i in missing:
+                walls[i] = generated[i]
+        elif missing:
+            cells = [(x + dx * (i + 1), y + dy * (i + 1)) for i in missing]
+            for i, wall in zip(missing, self.walls.walls(cells)):
+                walls[i] = wall
+
+        return walls, missing
+
+    def move_player(self, direction: str):
+        self.player["sleep"] = min(100, self.player["sleep"] + 1)
+        old_x, old_y = self.player["x"], self.player["y"]
+
+        if direction == "up":
+            self.player["y"] += 1
+        elif direction == "down":
+            self.player["y"] -= 1
+        elif direction == "left":
+            self.player["x"] -= 1
+        elif direction == "right":
+            self.player["x"] += 1
+
+        if self.check_wall_collision():
+            self.player["x"], self.player["y"] = old_x, old_y
+            self.color_gui("blue")
+            self.print_to_console("Dead end")
+        else:
+            self.print_to_console(f"Moved {direction}")
+            self.regions.focus(self.player["x"], self.player["y"])
+            self.plugin_manager.emit(AlbinaEvent.MOVE, {"x": self.player["x"], "y": self.player["y"],
+                                                        "direction": direction, "cells": 1})
+
+            if abs(self.player["x"]) > 100 + self.mob_difficulty * 100 or abs(self.player["y"]) > 100 + self.mob_difficulty * 100:
+                self.mob_difficulty += 1
+                self.print_to_console("You feel the darkness getting deeper...")
+
+                pos = "X"
+                if direction == "up":
+                    pos = "N"
+                elif direction == "right":
+                    pos = "E"
+                elif direction == "down":
+                    pos = "S"
+                elif direction == "left":
+                    pos = "W"
+
+                self.check_position(pos)
+
+    def check_wall_collision(self):
+        x, y = self.player["x"], self.player["y"]
+        is_wall = self.world["discovered"].get(x, y)
+
+        if is_wall is None:
+            is_wall = self.walls.is_wall(x, y)
+            self.world["discovered"].set(x, y, is_wall)
+            self.journal_record("cell", x=x, y=y, wall=is_wall)
+
+        return is_wall
+
+    def check_position(self, pos: str):
+        pos_items = self.items.at(self.player["x"], self.player["y"])
+
+        for item in pos_items:
+            if item["type"] == "clothes":
+                item_data = self.item_types["clothes"][item["subtype"]]
+            elif item["type"] == "food":
+                item_data = self.item_types["food"][item["subtype"]]
+            else:
+                item_data = self.item_types["special"][item["subtype"]]
+
+            self.print_to_console(f"You found: {item_data['name']}")
+            self.items.remove(item)
+            self.journal_record("item_del", x=item["x"], y=item["y"], type=item["type"], subtype=item["subtype"])
+
+            kept = len(self.player["inventory"]) < self.player["inventory_capacity"]
+            if kept:
+                self.player["inventory"].append({
+                    "type": item["type"],
+                    "subtype": item["subtype"],
+                    "name": item_data["name"]
+                })
+                self.print_to_console(f"{item_data['name']} added to inventory")
+            else:
+                self.print_to_console("Inventory full! Can't pick up item")
+            self.plugin_manager.emit(AlbinaEvent.PICKUP, {"x": item["x"], "y": item["y"], "type": item["type"],
+                                                          "subtype": item["subtype"], "kept": kept})
+
+        pos_mobs = self.mobs.at(self.player["x"], self.player["y"])
+
+        if pos_mobs:
+            self.color_gui("red")
+        else:
+            self.scheduler.after(1.0, self.color_gui, "#00ff00", pos)
+
+        for mob in pos_mobs:
+            mob_data = self.mob_types[mob["type"]]
+            self.print_to_console(f"You encountered a {mob_data['name']}! Use 'kick' to fight")
+
+    def show_inventory(self, _args):
+        if not self.player["inventory"]:
+            self.print_to_console("Inventory is empty")
+            return
+
+        self.print_to_console("Inventory:")
+        for i, item in enumerate(self.player["inventory"], 1):
+            self.print_to_console(f"{i}. {item['name']}")
+        self.print_to_console("Use 'select <number>' to choose item")
+
+    def select_item(self, args: list[str]):
+        try:
+
+            if len(args) < 1:
+                self.print_to_console("Usage: select <item_number>")
+                return
+
+            item_num = int(args[0]) - 1
+            if 0 <= item_num < len(self.player["inventory"]):
+                self.selected_item = item_num
+                self.print_to_console(f"Selected {self.player['inventory'][item_num]['name']}")
+            else:
+                self.print_to_console("Invalid item number")
+        except ValueError:
+            self.print_to_console("Invalid item number")
+
+    def eat_item(self, _args):
+        if not hasattr(self, 'selected_item') or self.selected_item is None:
+            self.print_to_console("No item selected")
+            return
+
+        selected = self.player["inventory"][self.selected_item]
+
+        if selected["type"] == "food":
+            food_data = self.item_types["food"][selected["subtype"]]
+            self.player["hunger"] = max(0, self.player["hunger"] + food_data["hunger"])
+            self.print_to_console(f"You ate {selected['name']}. Hunger: {self.player['hunger']}")
+        else:
+            self.print_to_console(f"You tried to eat {selected['name']}, but it's not food")
+
+        self.player["inventory"].pop(self.selected_item)
+        self.selected_item = None
+
+    def sleep(self, _args):
+        if self.player["time"] == "night":
+            self.print_to_console("You're already sleeping")
+            return
+
+        self.player["time"] = "night"
+        self.player["sleep"] = 0
+        self.player["day"] += 1
+        self.player["exp"] += 10
+        self.print_to_console("You fell asleep...")
+        self.scheduler.after(5.0, self.wake_up, name="wake_up")
+
+    def wake_up(self):
+        self.player["time"] = "morning"
+        self.print_to_console("You woke up refreshed")
+        self.print_to_console(f"Day {self.player['day']} begins")
+
+    def ping(self, _args):
+        has_ping = any(item["subtype"] == "pingpong" for item in self.player["inventory"])
+
+        if has_ping:
+            self.print_to_console("pong")
+        else:
+            self.print_to_console("You need a ping pong ball for that")
+
+    def kick(self, _args):
+        mob = self.mobs.first_at(self.player["x"], self.player["y"])
+
+        if not mob:
+            self.print_to_console("Nothing to kick here")
+            return
+
+        self.player["sleep"] = min(100, self.player["sleep"] + 5)
+        mob_data = self.mob_types[mob["type"]]
+
+        damage = self.player["kick_damage"] + self.mob_difficulty
+        hp_from = mob["hp"]
+        mob["hp"] -= damage
+        self.mobs.changed(mob)
+        self.journal_record("mob", x=mob["x"], y=mob["y"], type=mob["type"], hp_from=hp_from, hp=mob["hp"])
+        self.print_to_console(f"You kicked {mob_data['name']} for {damage} damage")
+        self.plugin_manager.emit(AlbinaEvent.KICK, {"mob": mob["type"], "damage": damage, "hp": mob["hp"],
+                                                    "killed": mob["hp"] <= 0})
+
+        if mob["hp"] <= 0:
+            self.mobs.remove(mob)
+            self.player["exp"] += 5
+            self.player["kick_damage"] += 1
+            self.color_gui()
+
+            if mob["type"] not in self.player["killed_mobs"]:
+                self.player["killed_mobs"][mob["type"]] = 0
+            self.player["killed_mobs"][mob["type"]] += 1
+
+            self.print_to_console(f"{mob_data['name']} defeated! +5 EXP")
+
+            if random.random() < 0.3:
+                self.generate_mob_drop(mob["type"])
+        else:
+            mob_damage = max(1, mob_data["damage"] + self.mob_difficulty)
+            self.player["hp"] -= mob_damage
+            self.print_to_console(f"{mob_data['name']} hit you for {mob_damage} damage")
+
+            if self.player["hp"] <= 0:
+                self.game_over(f"You were killed by {mob_data['name']}")
+
+    def generate_mob_drop(self, mob_type):
+        if mob_type == "cockroach":
+            item = {"type": "food", "subtype": "cockroach", "name": "Cockroach"}
+            self.player["inventory"].append(item)
+            self.print_to_console("You got a Cockroach from the corpse")
+        elif random.random() < 0.5:
+            item_type, item_subtype = self.samplers.sample("drop")
+            item = {
+                "type": item_type,
+                "subtype": item_subtype,
+                "name": self.item_types[item_type][item_subtype]["name"]
+            }
+            self.player["inventory"].append(item)
+            self.print_to_console(f"You got {item['name']} from the corpse")
+
+    def show_equipped(self, _args):
+        self.print_to_console("Equipped items:")
+        for slot, item in self.player["equipped"].items():
+            if item:
+                self.print_to_console(f"{slot.capitalize()}: {item['name']}")
+            else:
+                self.print_to_console(f"{slot.capitalize()}: Empty")
+
+    def equip_item(self, _args):
+        if not hasattr(self, 'selected_item') or self.selected_item is None:
+            self.print_to_console("No item selected")
+            return
+
+        item = self.player["inventory"][self.selected_item]
+
+        if item["type"] != "clothes":
+            self.print_to_console("You can only equip clothing items")
+            return
+
+        slot = None
+        if item["subtype"] == "ushanka":
+            slot = "hat"
+        elif item["subtype"] == "leather_jacket":
+            slot = "jacket"
+        elif item["subtype"] == "striped_pants":
+            slot = "pants"
+        elif item["subtype"] == "croc_shoes":
+            slot = "shoes"
+
+        if slot:
+            if self.player["equipped"][slot]:
+                old_item = self.player["equipped"][slot]
+                self.player["inventory"].append(old_item)
+                self.print_to_console(f"Removed {old_item['name']}")
+
+            self.player["equipped"][slot] = item
+            self.player["inventory"].pop(self.selected_item)
+            self.selected_item = None
+            self.print_to_console(f"You equipped {item['name']}")
+
+            self.apply_item_effects()
+        else:
+            self.print_to_console("This item cannot be equipped")
+
+    def unequip_item(self, args: list[str]):
+        if len(args) < 1:
+            self.print_to_console("Usage: unset <slot>")
+            return
+
+        slot = args[0].lower()
+        if slot not in self.player["equipped"]:
+            self.print_to_console("Invalid slot. Available slots: hat, jacket, pants, shoes")
+            return
+
+        if self.player["equipped"][slot]:
+            item = self.player["equipped"][slot]
+            if len(self.player["inventory"]) < self.player["inventory_capacity"]:
+                self.player["inventory"].append(item)
+                self.player["equipped"][slot] = None
+                self.print_to_console(f"You unequipped {item['name']}")
+                self.apply_item_effects()
+            else:
+                self.print_to_console("Inventory full! Can't unequip item")
+        else:
+            self.print_to_console(f"{slot.capitalize()} slot is already empty")
+
+    def apply_item_effects(self):
+        self.player["inventory_capacity"] = 3
+        self.player["kick_damage"] = 2
+
+        item = self.player["used"]
+        if item:
+            item_data = self.item_types["special"][item["subtype"]]
+            if "effect" in item_data:
+                for effect, value in item_data["effect"].items():
+                    if effect == "capacity":
+                        self.player["inventory_capacity"] = value
+
+        for _slot, item in self.player["equipped"].items():
+            if item:
+                item_data = self.item_types["clothes"][item["subtype"]]
+                if "effect" in item_data:
+                    for effect, value in item_data["effect"].items():
+                        if effect == "capacity":
+                            self.player["inventory_capacity"] = value
+                        elif effect == "sleep_rate":
+                            pass
+                        elif effect == "hunger_rate":
+                            pass
+                        elif effect == "snake_damage":
+                            pass
+                        elif effect == "move_speed":
+                            pass
+
+    def use_item(self, _args):
+        if not hasattr(self, 'selected_item') or self.selected_item is None:
+            self.print_to_console("No item selected")
+            return
+
+        item = self.player["inventory"][self.selected_item]
+
+        if item["type"] != "special":
+            self.print_to_console("You can only use special items")
+            return
+
+        if self.player["used"]:
+            old_item = self.player["used"]
+            self.player["inventory"].append(old_item)
+            self.print_to_console(f"Removed {old_item['name']}")
+
+        self.player["used"] = item
+        self.player["inventory"].pop(self.selected_item)
+        self.selected_item = None
+        self.print_to_console(f"You equipped {item['name']}")
+
+        self.apply_item_effects()
+
+    def save_game(self, _args):
+        if self._state != State.GAME:
+            self.print_to_console("No world loaded to save")
+            return
+
+        self.save_world()
+        self.print_to_console("Game saved")
+
+    def save_world(self):
+        world_path = os.path.join("world", str(self.current_world))
+        if not os.path.exists(world_path):
+            os.makedirs(world_path)
+
+        if not self.journal:
+            world, player = self.capture_snapshot()
+            autosave.write_snapshot(world_path, world, player)
+            self.regions.release(world["regions"])
+            return
+
+        changed = {key: value for key, value in self.player.items() if self._saved_player.get(key) != value}
+        if changed:
+            self.journal.record("player", fields=changed)
+            self._saved_player = copy.deepcopy(self.player)
+        self.journal.record("world", fields={"time": self.world["time"]})
+        self.journal.flush(sync=True)
+
+        if self.journal.needs_compaction():
+            self.compact_world(world_path)
+        self.plugin_manager.emit(AlbinaEvent.SAVE, {"world": self.current_world})
+
+    def compact_world(self, world_path: str):
+        if self.autosaver and self.autosaver.busy():
+            return
+
+        seq = self.journal.rotate()
+        self.world["journal_seq"] = seq
+
+        if self.autosaver:
+            reload = self.reloads_snapshot()
+            self.autosaver.submit(world_path, seq, self.capture_snapshot, reload)
+            return
+
+        world, player = self.capture_snapshot()
+        try:
+            autosave.write_snapshot(world_path, world, player)
+        except Exception:
+            self.regions.release(world["regions"])
+            raise
+
+        stored = None
+        if self.reloads_snapshot():
+            stored = world_format.read_world(os.path.join(world_path, "server.alb"))
+        self.snapshot_written(world_path, seq, world["regions"], stored)
+
+    def reloads_snapshot(self) -> bool:
+        """Whether regions come from the new file once written: v2 files and every procedural world."""
+        return self.world.get("format") == world_format.VERSION or self.world.get("entities") == worldgen.PROCEDURAL
+
+    def snapshot_written(self, world_path: str, seq: int, region_snapshot, stored: dict | None):
+        """Drop what the snapshot covers; stored is the new file read back, when reloads_snapshot()."""
+        self.journal.discard_through(seq)
+
+        source = None
+        if stored is not None:
+            source = self.region_source(stored["regions"], stored.get("region_diffs"))
+        self.regions.compacted(region_snapshot, seq, source)
+
+    def capture_snapshot(self) -> tuple[dict, dict]:
+        world = dict(self.world)
+        world["regions"] = self.regions.capture()
+        world["discovered"] = self.world["discovered"].copy()
+        return world, copy.deepcopy(self.player)
+
+    def autosave_tick(self):
+        if self.autosaver is None:
+            return
+
+        self.collect_autosaves()
+
+        if self.game_loaded and self.autosaver.due():
+            self.autosaver.reset()
+            self.save_world()
+
+    def collect_autosaves(self):
+        for job in self.autosaver.completed():
+            if isinstance(job, autosave.SyncJob):
+                self.print_to_console(f"Journal sync failed: {job.error}")
+                continue
+
+            current = self.journal and job.world_path == self.journal.world_path
+            if job.error:
+                self.print_to_console(f"Autosave failed: {job.error}")
+                if current:
+                    self.regions.release(job.world["regions"])
+            elif current:
+                self.snapshot_written(job.world_path, job.seq, job.world["regions"], job.stored)
+
+    def autosave_stats(self, _args):
+        if self.autosaver is None:
+            self.print_to_console("Autosave is off")
+            return
+
+        stats = self.autosaver.stats
+        self.print_to_console(f"Autosave every {self.autosaver.interval:g}s: "
+                              f"{stats['saves']} saves, {stats['failures']} failed, {stats['skipped']} skipped")
+        self.print_to_console(f"Snapshot (main thread): {stats['snapshot_ms']:.2f} ms, max {stats['max_snapshot_ms']:.2f} ms")
+        self.print_to_console(f"Write (worker): {stats['write_ms']:.2f} ms, max {stats['max_write_ms']:.2f} ms")
+        self.print_to_console(f"Bytes written: {stats['bytes_written']}")
+
+    def stats_command(self, args: list[str]):
+        handler = self.command_handler
+        action = args[0].lower() if args else "show"
+
+        if action == "on":
+            handler.timing = True
+            self.print_to_console("Command timing on")
+        elif action == "off":
+            handler.timing = False
+            self.print_to_console("Command timing off")
+        elif action == "reset":
+            handler.stats.reset()
+            self.print_to_console("Command stats cleared")
+        elif action == "dump":
+            path = args[1] if len(args) > 1 else COMMAND_STATS_FILE
+            try:
+                handler.stats.dump(path)
+            except OSError as e:
+                self.print_to_console(f"Failed to write {path}: {e}")
+                return
+            self.print_to_console(f"Command stats written to {path}")
+        elif action == "show":
+            self.show_command_stats()
+        else:
+            self.print_to_console("Usage: stats [on|off|reset|dump [path]]")
+
+    def show_command_stats(self):
+        handler = self.command_handler
+        rows = handler.stats.rows()
+
+        ticks = self.scheduler.stats
+        self.print_to_console(f"Ticks: {ticks['ticks']} run, {ticks['caught_up']} caught up, {ticks['dropped']} dropped, "
+                              f"{ticks['overruns']} overran; last {ticks['last_ms']:.2f} ms, max {ticks['max_ms']:.2f} ms")
+
+        self.print_to_console(f"Command timing is {'on' if handler.timing else 'off'}")
+        if not rows:
+            self.print_to_console("No commands timed yet. Use 'stats on' to start")
+            return
+
+        for verb, state, timing in rows:
+            self.print_to_console(f"{verb} [{state.name}]: {timing.count} calls, {timing.total * 1000:.1f} ms total, "
+                                  f"avg {timing.total / timing.count * 1e6:.0f} us, "
+                                  f"p99 <= {timing.percentile(0.99):.0f} us, max {timing.max * 1e6:.0f} us")
+
+    def journal_record(self, op: str, **fields):
+        if self.journal:
+            self.journal.record(op, **fields)
+
+    def close_journal(self):
+        if self.autosaver:
+            self.autosaver.wait()
+            self.collect_autosaves()
+
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def game_over(self, message):
+        self.save_game(None)
+        self.close_journal()
+        self.print_to_console(f"Game Over: {message}")
+        self.game_loaded = False
+        self._state = State.MENU
+        self.current_world = None
+        self.print_to_console("Type 'load' to start a new game")
+
+    def tick(self):
+        """One tick of game time; the scheduler runs it every tick."""
+        if self.game_loaded:
+            self.player_tick()
+
+            self.world["time"] += self.scheduler.tick_length
+            self.player["time"] = simulation.day_phase(self.world["time"], self.day_length)
+            self.plugin_manager.emit(AlbinaEvent.TICK, {"tick": self.scheduler.ticks, "time": self.world["time"]})
+            self.plugin_manager.flush()
+
+    def player_tick(self):
+        """One tick of hunger and sleep for self.player, and the damage they do."""
+        starving, exhausted = simulation.step(self.player)
+        self.report_needs(starving, exhausted)
+
+        if self.player["hp"] <= 0:
+            self.game_over("You died from your wounds")
+
+    def report_needs(self, starving: bool, exhausted: bool):
+        """Print the HP one tick of hunger or of no sleep cost, as simulation.step reports them."""
+        self.report_damage(starving, exhausted)
+
+    def report_damage(self, starving: int, exhausted: int):
+        """Print the HP lost to `starving` ticks of hunger and `exhausted` ticks of no sleep."""
+        if starving:
+            self.print_to_console(f"You're starving! -{starving * simulation.STARVING_DAMAGE} HP")
+        if exhausted:
+            self.print_to_console(f"You're exhausted! -{exhausted * simulation.EXHAUSTED_DAMAGE} HP")
+
+    def fast_forward(self, ticks: int) -> int:
+        """Apply `ticks` ticks of hunger, sleep and world time at once.
+
+        Ends in the same state as calling tick() that many times, death
+        included, but prints one summary line per cause instead of one line
+        per tick. Scheduled jobs do not run for these ticks. Returns the
+        number of ticks simulated.
+        """
+        if not self.game_loaded or ticks <= 0:
+            return 0
+
+        tick_length = self.scheduler.tick_length
+        result = simulation.fast_forward(self.player, ticks)
+        self.report_damage(result.starving, result.exhausted)
+
+        if result.died:
+            # tick() ends the game before it moves the clock on that last tick.
+            if result.ticks > 1:
+                self.world["time"] = simulation.repeat_add(self.world["time"], tick_length, result.ticks - 1)
+                self.player["time"] = simulation.day_phase(self.world["time"], self.day_length)
+            self.game_over("You died from your wounds")
+            self.world["time"] += tick_length
+        else:
+            self.world["time"] = simulation.repeat_add(self.world["time"], tick_length, result.ticks)
+
+        self.player["time"] = simulation.day_phase(self.world["time"], self.day_length)
+        return result.ticks
+
+    def load_plugins(self):
+        """Загрузка плагинов из папки plugins"""
+        if not os.path.exists("plugins"):
+            os.makedirs("plugins")
+            return
+
+        self.plugins = []
+        self.plugin_manager.clear()
+        self.plugin_manager.configure(self.config)
+        for filename in sorted(os.listdir("plugins")):
+            path = os.path.join("plugins", filename)
+            if filename.endswith(".alb"):
+                try:
+                    with open(path, "r") as f:
+                        plugin_data = json.load(f)
+                        plugin_data["enabled"] = True
+                        self.plugins.append(plugin_data)
+                        self.print_to_console(f"Loaded plugin: {plugin_data.get('name', 'Unnamed')}")
+                except Exception as e:
+                    self.print_to_console(f"Failed to load plugin {filename}: {str(e)}")
+            elif filename.endswith(".py") or os.path.exists(os.path.join(path, "__init__.py")):
+                try:
+                    count = self.plugin_manager.load_path(path)
+                except Exception as e:
+                    self.print_to_console(f"Failed to load plugin {filename}: {str(e)}")
+                    continue
+                for loaded in self.plugin_manager.plugins[len(self.plugin_manager.plugins) - count:]:
+                    self.print_to_console(f"Loaded plugin: {loaded.name}")
+
+    def apply_plugin_effects(self):
+        """Применение эффектов от активных плагинов"""
+        for plugin in self.plugins:
+            if plugin.get("enabled", False):
+                if "items" in plugin:
+                    for item_type, items in plugin["items"].items():
+                        if item_type not in self.item_types:
+                            self.item_types[item_type] = {}
+                        self.item_types[item_type].update(items)
+
+                if "mobs" in plugin:
+                    for mob_name, mob_data in plugin["mobs"].items():
+                        self.mob_types[mob_name] = mob_data
+
+        self.samplers.invalidate()
+
+    def list_plugins(self, args: list[str]):
+        """Показать список всех плагинов"""
+        if args:
+            self.toggle_plugin(" ".join(["plugin"] + args))
+            return
+
+        python_plugins = self.plugin_manager.plugins
+        if not self.plugins and not python_plugins:
+            self.print_to_console("No plugins available")
+            return
+
+        self.print_to_console("Available plugins:")
+        for i, plugin in enumerate(self.plugins, 1):
+            status = "ON" if plugin.get("enabled", False) else "OFF"
+            self.print_to_console(f"{i}. {plugin.get('name', 'Unnamed')} [{status}]")
+        for i, loaded in enumerate(python_plugins, len(self.plugins) + 1):
+            status = "ON" if loaded.enabled else "OFF"
+            self.print_to_console(f"{i}. {loaded.name} [{status}] {self.plugin_cost(loaded)}")
+        self.print_to_console("Use 'plugin <number> on/off' to toggle plugins")
+
+    @staticmethod
+    def plugin_cost(loaded) -> str:
+        timing = loaded.timing
+        cost = f"{timing.count} calls, {timing.total * 1000:.1f} ms total"
+        if timing.count:
+            cost += (f", avg {timing.total / timing.count * 1e6:.0f} us, p99 <= {timing.percentile(0.99):.0f} us, "
+                     f"max {timing.max * 1e6:.0f} us")
+        if loaded.worker is not None:
+            latency = loaded.latency
+            cost += f", sandboxed: waited p99 <= {latency.percentile(0.99):.0f} us, {loaded.skipped} skipped"
+            if not loaded.worker.running:
+                cost += ", stopped"
+        if loaded.errors:
+            cost += f", {loaded.errors} errors"
+        return cost
+
+    def toggle_plugin(self, command):
+        """Включить/выключить плагин"""
+        parts = command.split()
+        if len(parts) < 3:
+            self.print_to_console("Usage: plugin <number> <on/off>")
+            return
+
+        try:
+            plugin_num = int(parts[1]) - 1
+            python_num = plugin_num - len(self.plugins)
+            if 0 <= python_num < len(self.plugin_manager.plugins):
+                loaded = self.plugin_manager.plugins[python_num]
+                action = parts[2].lower()
+                if action in ("on", "off"):
+                    self.plugin_manager.set_enabled(loaded, action == "on")
+                    self.print_to_console(f"Plugin '{loaded.name}' {'enabled' if action == 'on' else 'disabled'}")
+                else:
+                    self.print_to_console("Invalid action. Use 'on' or 'off'")
+            elif 0 <= plugin_num < len(self.plugins):
+                action = parts[2].lower()
+                if action == "on":
+                    self.plugins[plugin_num]["enabled"] = True
+                    self.print_to_console(f"Plugin '{self.plugins[plugin_num].get('name', 'Unnamed')}' enabled")
+                elif action == "off":
+                    self.plugins[plugin_num]["enabled"] = False
+                    self.print_to_console(f"Plugin '{self.plugins[plugin_num].get('name', 'Unnamed')}' disabled")
+                else:
+                    self.print_to_console("Invalid action. Use 'on' or 'off'")
+
+                self.apply_plugin_effects()
+            else:
+                self.print_to_console("Invalid plugin number")
+        except ValueError:
+            self.print_to_console("Invalid plugin number")
+
+    def give_item(self, _args):
+        """Команда give - получить случайный предмет (для тестирования)"""
+        if len(self.player["inventory"]) >= self.player["inventory_capacity"]:
+            self.print_to_console("Inventory full!")
+            return
+
+        item_type, item_subtype = self.samplers.sample("give")
+        item_data = self.item_types[item_type][item_subtype]
+
+        self.player["inventory"].append({
+            "type": item_type,
+            "subtype": item_subtype,
+            "name": item_data["name"]
+        })
+        self.print_to_console(f"You got: {item_data['name']}")
+
+    def exit_game_mode(self, _args):
+        self.save_game(None)
+        self.close_journal()
+
+        self.game_loaded = False
+        self.current_world = None
+        self._state = State.MENU
+
+    def confirm_exit(self, _args):
+        """Подтверждение выхода из игры"""
+        self.print_to_console("Are you sure you want to exit? 1: Yes, 2: No")
+
+        self.exit_command(None)
+
+    def exit_command(self, _args):
+        """Выход из игры"""
+        if self.game_loaded:
+            self.save_game(None)
+            self.close_journal()
+        if self.autosaver:
+            self.autosaver.stop()
+        self.plugin_manager.clear()
+        self.running = False
+        self.ui.close()
+
+    def stop_command(self, _args):
+        """Остановка сервера"""
+        self.print_to_console("Stop server? Unsaved changes will be lost. 1: Yes, 2: No")
+
+        self.server_running = False
+        self.print_to_console("Server stopped")
+
+    def start_command(self, _args):
+        """Запуск сервера"""
+        if not self.server_running:
+            self.server_running = True
+
+
+def read_commands(commands: queue.Queue):
+    for line in sys.stdin:
+        commands.put(line)
+    commands.put(None)
+
+
+def main():
+    """Run the game in a terminal: commands from stdin, ticks from the scheduler, no Tk."""
+    ui = HeadlessUI(echo=True, max_lines=0)
+    engine = AlbinaEngine(ui)
+    engine.print_to_console(engine.version)
+    engine.check_server()
+    engine.load_plugins()
+    engine.apply_plugin_effects()
+
+    commands: queue.Queue[str | None] = queue.Queue()
+    threading.Thread(target=read_commands, args=(commands,), daemon=True).start()
+
+    while engine.running:
+        try:
+            command = commands.get(timeout=engine.scheduler.next_due())
+        except queue.Empty:
+            command = ""
+
+        if command is None:
+            engine.exit_command(None)
+            break
+        if command.strip():
+            engine.handle_command(command)
+
+        engine.update()
+
+
+if __name__ == "__main__":
+    main()
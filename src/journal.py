@@ -0,0 +1,195 @@
+import json
+import os
+import time
+from typing import Callable
+
+from spatial import SpatialIndex
+from wall_map import WallMap
+
+JOURNAL_FILE = "journal.alb"
+
+
+class WorldJournal:
+    """Append-only log of world and player deltas kept next to server.alb.
+
+    Every record carries a sequence number. A snapshot stores the last
+    sequence it contains as world["journal_seq"], so loading is the
+    snapshot plus every journal record after it. Records are buffered and
+    fsynced in batches; save_game forces a synced flush.
+
+    Compaction seals the active segment as journal.alb.<last seq> and starts
+    a new one, so taking a snapshot never has to rewrite the log. Sealed
+    segments are deleted once a snapshot that covers them is on disk.
+
+    With a syncer set, fsyncs are handed off as a duplicate of the file
+    descriptor instead of run in place, so the caller's thread never waits
+    on the disk.
+    """
+
+    def __init__(self, world_path: str, fsync_every: int = 64, fsync_interval: float = 5.0,
+                 compact_bytes: int = 1 << 20, compact_age: float = 300.0):
+        self.world_path = world_path
+        self.path = os.path.join(world_path, JOURNAL_FILE)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self.compact_age = compact_age
+
+        self.seq = 0
+        self.bytes_written = 0
+        self._buffer: list[str] = []
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._last_compaction = time.monotonic()
+        self._file = None
+        self.syncer: Callable[[int], None] | None = None
+
+    def open(self, seq: int):
+        self.seq = seq
+        self._file = open(self.path, "ab")
+        self._last_compaction = time.monotonic()
+
+    def record(self, op: str, **fields):
+        self.seq += 1
+        self._buffer.append(json.dumps({"seq": self.seq, "op": op, **fields}))
+
+        if len(self._buffer) >= self.fsync_every:
+            self.flush()
+
+    def flush(self, sync: bool = False):
+        if self._file is None:
+            return
+
+        if self._buffer:
+            data = ("\n".join(self._buffer) + "\n").encode("utf-8")
+            self._file.write(data)
+            self.bytes_written += len(data)
+            self._unsynced += len(self._buffer)
+            self._buffer.clear()
+
+        self._file.flush()
+
+        now = time.monotonic()
+        if self._unsynced and (sync or self._unsynced >= self.fsync_every
+                               or now - self._last_sync >= self.fsync_interval):
+            if self.syncer:
+                self.syncer(os.dup(self._file.fileno()))
+            else:
+                os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = now
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def needs_compaction(self) -> bool:
+        if self.seq == 0 or self.size() == 0:
+            return False
+        return (self.size() >= self.compact_bytes
+                or time.monotonic() - self._last_compaction >= self.compact_age)
+
+    def rotate(self) -> int:
+        """Seal the active segment and return the last sequence number it holds."""
+        self.flush(sync=True)
+        self._file.close()
+
+        if self.size() > 0:
+            os.replace(self.path, f"{self.path}.{self.seq}")
+
+        self._file = open(self.path, "ab")
+        self._last_compaction = time.monotonic()
+        return self.seq
+
+    def discard_through(self, snapshot_seq: int):
+        """Delete sealed segments a snapshot on disk already contains."""
+        for last_seq, path in sealed_segments(self.world_path):
+            if last_seq <= snapshot_seq:
+                os.remove(path)
+
+    def close(self):
+        if self._file is not None:
+            self.flush(sync=True)
+            self._file.close()
+            self._file = None
+
+
+def sealed_segments(world_path: str) -> list[tuple[int, str]]:
+    segments = []
+    for filename in os.listdir(world_path):
+        prefix, _, suffix = filename.rpartition(".")
+        if prefix == JOURNAL_FILE and suffix.isdigit():
+            segments.append((int(suffix), os.path.join(world_path, filename)))
+    return sorted(segments)
+
+
+def read_journal(world_path: str, after_seq: int = 0) -> list[dict]:
+    paths = [path for _, path in sealed_segments(world_path)]
+    paths.append(os.path.join(world_path, JOURNAL_FILE))
+
+    records = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything before it is intact.
+                    break
+                if record["seq"] > after_seq:
+                    records.append(record)
+
+    return records
+
+
+ENTITY_OPS = ("item_del", "mob")
+
+
+def replay(records: list[dict], world: dict, player: dict, regions) -> int:
+    """Apply journal records to a loaded snapshot and return the last sequence number seen.
+
+    Item and mob records go to regions.defer, which applies them when the
+    region they belong to is loaded.
+    """
+    last_seq = world.get("journal_seq", 0)
+    discovered: WallMap = world["discovered"]
+
+    for record in records:
+        op = record["op"]
+        last_seq = max(last_seq, record["seq"])
+
+        if op == "cell":
+            discovered.set(record["x"], record["y"], record["wall"])
+
+        elif op in ENTITY_OPS:
+            regions.defer(record)
+
+        elif op == "player":
+            player.update(record["fields"])
+
+        elif op == "world":
+            world.update(record["fields"])
+
+    return last_seq
+
+
+def apply_entity_record(record: dict, items: SpatialIndex, mobs: SpatialIndex):
+    if record["op"] == "item_del":
+        for item in items.at(record["x"], record["y"]):
+            if item["type"] == record["type"] and item["subtype"] == record["subtype"]:
+                items.remove(item)
+                return
+
+    elif record["op"] == "mob":
+        for mob in mobs.at(record["x"], record["y"]):
+            if mob["type"] == record["type"] and mob["hp"] == record["hp_from"]:
+                if record["hp"] <= 0:
+                    mobs.remove(mob)
+                else:
+                    mob["hp"] = record["hp"]
+                return
@@ -0,0 +1,104 @@
+import random
+from collections import OrderedDict
+from typing import Callable
+
+from wall_map import CHUNK_CELLS, CHUNK_SIZE, cell_bit, chunk_run
+
+MAZE_CHUNKS = 256
+BORDER_OPENING = 0.125
+
+ROOMS = CHUNK_SIZE // 2
+
+_PADDED = ROOMS + 2
+# Grid index of the cell each padded room number stands for.
+_CELL = [2 * (room // _PADDED - 1) * CHUNK_SIZE + 2 * (room % _PADDED - 1) for room in range(_PADDED * _PADDED)]
+
+
+def carve_chunk(seed: int) -> bytearray:
+    """One chunk of maze as CHUNK_CELLS bytes, 1 for a wall, indexed [y * CHUNK_SIZE + x].
+
+    Rooms sit on even coordinates and are joined into a perfect maze by an
+    iterative recursive backtracker. The last column and row are the east
+    and north borders: a few rooms open through them into the rooms at
+    local 0 of the next chunk, which are always open, so neighbouring
+    chunks join up without either having to generate the other.
+    """
+    rng = random.Random(seed)
+    grid = bytearray(b"\x01") * CHUNK_CELLS
+
+    # Rooms are numbered on a grid with a one-room visited border, so neighbours need no bounds checks.
+    visited = bytearray(b"\x01") * (_PADDED * _PADDED)
+    for j in range(ROOMS):
+        visited[(j + 1) * _PADDED + 1:(j + 1) * _PADDED + 1 + ROOMS] = bytes(ROOMS)
+
+    room = (rng.randrange(ROOMS) + 1) * _PADDED + rng.randrange(ROOMS) + 1
+    visited[room] = 1
+    grid[_CELL[room]] = 0
+    stack = [room]
+
+    while stack:
+        room = stack[-1]
+        options = [other for other in (room + 1, room - 1, room + _PADDED, room - _PADDED) if not visited[other]]
+        if not options:
+            stack.pop()
+            continue
+
+        other = options[rng.randrange(len(options))]
+        visited[other] = 1
+        cell = _CELL[other]
+        grid[cell] = 0
+        grid[(_CELL[room] + cell) // 2] = 0
+        stack.append(other)
+
+    east = [room for room in range(ROOMS) if rng.random() < BORDER_OPENING] or [rng.randrange(ROOMS)]
+    north = [room for room in range(ROOMS) if rng.random() < BORDER_OPENING] or [rng.randrange(ROOMS)]
+    for room in east:
+        grid[2 * room * CHUNK_SIZE + CHUNK_SIZE - 1] = 0
+    for room in north:
+        grid[(CHUNK_SIZE - 1) * CHUNK_SIZE + 2 * room] = 0
+
+    return grid
+
+
+class MazeChunks:
+    """Maze chunks generated on first use and kept in an LRU of capacity chunks."""
+
+    def __init__(self, seed_of: Callable[[int, int], int], capacity: int = MAZE_CHUNKS):
+        self.seed_of = seed_of
+        self.capacity = capacity
+        self.generated = 0
+        self._chunks: OrderedDict[tuple[int, int], bytearray] = OrderedDict()
+
+    def get(self, cx: int, cy: int) -> bytearray:
+        key = (cx, cy)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+
+        chunk = self._chunks[key] = carve_chunk(self.seed_of(cx, cy))
+        self.generated += 1
+        if len(self._chunks) > self.capacity:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def is_wall(self, x: int, y: int) -> bool:
+        chunk = self.get(x // CHUNK_SIZE, y // CHUNK_SIZE)
+        return chunk[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE] == 1
+
+    def line(self, x: int, y: int, dx: int, dy: int, count: int) -> bytes:
+        """Walls of count cells from (x, y) on in steps of (dx, dy), sliced out of each chunk at once."""
+        parts = []
+        step = dx + dy * CHUNK_SIZE
+
+        while count > 0:
+            span = min(count, chunk_run(x, y, dx, dy))
+            start = cell_bit(x, y)
+            stop = start + step * span
+            parts.append(self.get(x // CHUNK_SIZE, y // CHUNK_SIZE)[start:stop if stop >= 0 else None:step])
+            x, y, count = x + dx * span, y + dy * span, count - span
+
+        return b"".join(parts)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
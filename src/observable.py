@@ -0,0 +1,195 @@
+from typing import Callable
+
+
+class ObservedDict(dict):
+    """dict that reports which top-level key changed to its subscribers.
+
+    List and dict values are wrapped so that changes inside them (an item
+    appended to the inventory, a slot equipped) are reported under the key
+    that holds them. Copies, deep copies and pickles are plain dicts and
+    lists, so snapshots and the journal never see the wrappers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._listeners: tuple[Callable[[str], None], ...] = ()
+        self.update(*args, **kwargs)
+
+    def subscribe(self, listener: Callable[[str], None]):
+        self._listeners += (listener,)
+
+    def unsubscribe(self, listener: Callable[[str], None]):
+        self._listeners = tuple(other for other in self._listeners if other != listener)
+
+    def changed(self, key: str):
+        for listener in self._listeners:
+            listener(key)
+
+    def _wrap(self, key: str, value):
+        if type(value) is list:
+            return ObservedList(value, key, self)
+        if type(value) is dict:
+            return _ObservedChild(value, key, self)
+        return value
+
+    def __setitem__(self, key, value):
+        if type(value) not in (list, dict) and key in self and dict.__getitem__(self, key) == value:
+            dict.__setitem__(self, key, value)
+            return
+
+        dict.__setitem__(self, key, self._wrap(key, value))
+        self.changed(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        had = key in self
+        value = dict.pop(self, key, *default)
+        if had:
+            self.changed(key)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.changed(key)
+        return key, value
+
+    def clear(self):
+        keys = list(self)
+        dict.clear(self)
+        for key in keys:
+            self.changed(key)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class ObservedList(list):
+    """List value of an ObservedDict; any change is reported as a change of its key."""
+
+    def __init__(self, values, key: str, owner: ObservedDict):
+        super().__init__(values)
+        self._key = key
+        self._owner = owner
+
+    def _changed(self):
+        self._owner.changed(self._key)
+
+    def append(self, value):
+        list.append(self, value)
+        self._changed()
+
+    def extend(self, values):
+        list.extend(self, values)
+        self._changed()
+
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        self._changed()
+
+    def pop(self, index=-1):
+        value = list.pop(self, index)
+        self._changed()
+        return value
+
+    def remove(self, value):
+        list.remove(self, value)
+        self._changed()
+
+    def clear(self):
+        list.clear(self)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._changed()
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._changed()
+
+    def __iadd__(self, values):
+        list.extend(self, values)
+        self._changed()
+        return self
+
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self._changed()
+        return self
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+class _ObservedChild(dict):
+    """Dict value of an ObservedDict (equipped slots, kill counts); changes are reported under its key."""
+
+    def __init__(self, values, key: str, owner: ObservedDict):
+        super().__init__(values)
+        self._key = key
+        self._owner = owner
+
+    def _changed(self):
+        self._owner.changed(self._key)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        value = dict.setdefault(self, key, default)
+        self._changed()
+        return value
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self._changed()
+        return item
+
+    def clear(self):
+        dict.clear(self)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
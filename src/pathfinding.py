@@ -0,0 +1,240 @@
+import heapq
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from wall_gen import MAZE, SPLITMIX64, WallGenerator, np
+from wall_map import BITSET_BYTES, CHUNK_CELLS, CHUNK_SIZE, WallMap
+
+PLAN_NODES = 20000
+PLAN_SECONDS = 0.05
+# Maze corridors wind: a goal 50 cells away is often 400+ cells of path, one
+# search in twenty expands 20000 cells or more, and each new chunk takes a
+# few ms to carve. These let about 97% of such searches finish.
+MAZE_PLAN_NODES = 40000
+MAZE_PLAN_SECONDS = 0.3
+# How long one Search.run may hold the caller when it is given a slice: the
+# game plans goto routes this much at a time, between frontend events.
+PLAN_SLICE_SECONDS = 0.004
+CACHED_CHUNKS = 256
+CACHED_PATHS = 16
+
+FOUND = "found"
+PARTIAL = "partial"
+NO_ROUTE = "no route"
+
+STEPS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+def plan_budget(config: dict, algorithm: str | None = None) -> tuple[int, float]:
+    """Read goto_nodes and goto_ms from server/config.cfg, defaulting by wall generator."""
+    nodes, seconds = (MAZE_PLAN_NODES, MAZE_PLAN_SECONDS) if algorithm == MAZE else (PLAN_NODES, PLAN_SECONDS)
+    nodes = int(config.get("goto_nodes", nodes))
+    seconds = float(config.get("goto_ms", seconds * 1000)) / 1000
+    return nodes, seconds
+
+
+class WallCache:
+    """Wall lookups for planning that never mark cells as discovered.
+
+    Cells come a chunk at a time from an LRU of chunks laid out like WallMap
+    (known bitset, then wall bitset), with discovered cells taking
+    precedence over the generator. Maze chunks, and with NumPy splitmix64
+    chunks, are generated whole when first touched; otherwise cells are
+    generated as they are asked for. Cells discovered later come from the same
+    generator, so a cached chunk never goes stale.
+    """
+
+    def __init__(self, discovered: WallMap, generator: WallGenerator, capacity: int = CACHED_CHUNKS):
+        self.discovered = discovered
+        self.generator = generator
+        self.capacity = capacity
+        self.generated = 0
+        self._chunks: OrderedDict[tuple[int, int], bytearray] = OrderedDict()
+        self._whole = generator.algorithm == MAZE or (np is not None and generator.algorithm == SPLITMIX64)
+
+    def is_wall(self, x: int, y: int) -> bool:
+        key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._load(key)
+        else:
+            self._chunks.move_to_end(key)
+
+        bit = (y % CHUNK_SIZE) * CHUNK_SIZE + (x % CHUNK_SIZE)
+        byte, mask = bit >> 3, 1 << (bit & 7)
+        if chunk[byte] & mask:
+            return bool(chunk[BITSET_BYTES + byte] & mask)
+
+        wall = self.discovered.get(x, y)
+        if wall is None:
+            wall = self.generator.is_wall(x, y)
+            self.generated += 1
+        chunk[byte] |= mask
+        if wall:
+            chunk[BITSET_BYTES + byte] |= mask
+        return wall
+
+    def _load(self, key: tuple[int, int]) -> bytearray:
+        if self._whole:
+            walls = int.from_bytes(self.generator.chunk_bits(*key), "little")
+            self.generated += CHUNK_CELLS
+
+            known = self.discovered.chunk(key)
+            if known is not None:
+                mask = int.from_bytes(known[:BITSET_BYTES], "little")
+                walls = (walls & ~mask) | (int.from_bytes(known[BITSET_BYTES:], "little") & mask)
+            chunk = bytearray(b"\xff" * BITSET_BYTES + walls.to_bytes(BITSET_BYTES, "little"))
+        else:
+            chunk = bytearray(2 * BITSET_BYTES)
+
+        self._chunks[key] = chunk
+        if len(self._chunks) > self.capacity:
+            self._chunks.popitem(last=False)
+        return chunk
+
+
+@dataclass
+class Plan:
+    status: str
+    path: list[tuple[int, int]]
+    expanded: int = 0
+    cached: bool = False
+
+
+class Planner:
+    """Bounded A* over a 4-connected grid of lazily generated walls.
+
+    The search gives up after max_nodes expansions or max_seconds, and then
+    returns the path to the expanded cell closest to the goal, so a long
+    trip is made in legs. Paths are remembered per goal: asking again from
+    any cell on a remembered path returns the rest of it without a search.
+    """
+
+    def __init__(self, walls: WallCache, max_nodes: int = PLAN_NODES, max_seconds: float = PLAN_SECONDS):
+        self.walls = walls
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self._paths: OrderedDict[tuple[int, int], tuple[str, list[tuple[int, int]], dict]] = OrderedDict()
+
+    def plan(self, start: tuple[int, int], goal: tuple[int, int]) -> Plan:
+        """Plan in one go, taking up to the whole budget."""
+        return self.begin(start, goal).run()
+
+    def begin(self, start: tuple[int, int], goal: tuple[int, int]) -> "Search":
+        """A search from start to goal, to be run in one go or a slice at a time."""
+        search = Search(self, start, goal)
+        cached = self._paths.get(goal)
+        if cached is not None:
+            status, path, index = cached
+            position = index.get(start)
+            if position is not None and position + 1 < len(path):
+                self._paths.move_to_end(goal)
+                search.result = Plan(status, path[position + 1:], cached=True)
+        return search
+
+    def remember(self, start: tuple[int, int], goal: tuple[int, int], plan: Plan):
+        if not plan.path or plan.cached:
+            return
+        path = [start] + plan.path
+        self._paths[goal] = (plan.status, path, {cell: i for i, cell in enumerate(path)})
+        self._paths.move_to_end(goal)
+        if len(self._paths) > CACHED_PATHS:
+            self._paths.popitem(last=False)
+
+
+class Search:
+    """One bounded A* search, kept between calls so it can run a slice at a time.
+
+    The planner's node and time budgets apply to the whole search, summed
+    over the slices; the time between slices does not count.
+    """
+
+    def __init__(self, planner: Planner, start: tuple[int, int], goal: tuple[int, int]):
+        self.planner = planner
+        self.start = start
+        self.goal = goal
+        self.result: Plan | None = Plan(FOUND, []) if start == goal else None
+        self.slices = 0
+        self.elapsed = 0.0
+        self.expanded = 0
+
+        start_h = abs(start[0] - goal[0]) + abs(start[1] - goal[1])
+        self._came_from: dict[tuple[int, int], tuple[int, int] | None] = {start: None}
+        self._cost = {start: 0}
+        self._frontier = [(start_h, start_h, start)]
+        self._best, self._best_h = start, start_h
+        self._closed: set[tuple[int, int]] = set()
+
+    def run(self, seconds: float | None = None) -> Plan | None:
+        """Search on for at most `seconds` (default: the rest of the budget); None if it is not done yet."""
+        if self.result is not None:
+            return self.result
+
+        self.slices += 1
+        began = time.perf_counter()
+        budget = self.planner.max_seconds - self.elapsed
+        deadline = began + (budget if seconds is None else min(seconds, budget))
+        try:
+            self.result = self._expand(deadline, seconds is None or seconds >= budget)
+        finally:
+            self.elapsed += time.perf_counter() - began
+
+        if self.result is not None:
+            self.planner.remember(self.start, self.goal, self.result)
+        return self.result
+
+    def _expand(self, deadline: float, last: bool) -> Plan | None:
+        is_wall = self.planner.walls.is_wall
+        max_nodes = self.planner.max_nodes
+        gx, gy = goal = self.goal
+        if self.slices == 1 and is_wall(gx, gy):
+            return Plan(NO_ROUTE, [])
+
+        came_from, cost, frontier, closed = self._came_from, self._cost, self._frontier, self._closed
+        best, best_h = self._best, self._best_h
+        expanded = self.expanded
+
+        try:
+            while frontier:
+                _, h, cell = heapq.heappop(frontier)
+                if cell == goal:
+                    return Plan(FOUND, self._path(cell), expanded)
+                if cell in closed:
+                    continue
+
+                closed.add(cell)
+                expanded += 1
+                if h < best_h:
+                    best, best_h = cell, h
+                if expanded >= max_nodes:
+                    return Plan(PARTIAL, self._path(best), expanded)
+
+                x, y = cell
+                g = cost[cell] + 1
+                for dx, dy in STEPS:
+                    nx, ny = x + dx, y + dy
+                    neighbour = (nx, ny)
+                    if g >= cost.get(neighbour, g + 1) or is_wall(nx, ny):
+                        continue
+
+                    cost[neighbour] = g
+                    came_from[neighbour] = cell
+                    nh = abs(nx - gx) + abs(ny - gy)
+                    heapq.heappush(frontier, (g + nh, nh, neighbour))
+
+                if expanded & 31 == 0 and time.perf_counter() > deadline:
+                    return Plan(PARTIAL, self._path(best), expanded) if last else None
+
+            return Plan(NO_ROUTE, [], expanded)
+        finally:
+            self._best, self._best_h, self.expanded = best, best_h, expanded
+
+    def _path(self, cell: tuple[int, int]) -> list[tuple[int, int]]:
+        came_from = self._came_from
+        path = []
+        while came_from[cell] is not None:
+            path.append(cell)
+            cell = came_from[cell]
+        path.reverse()
+        return path
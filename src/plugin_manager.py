@@ -1,14 +1,33 @@
+import importlib.util
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
 from abc import ABC, abstractmethod
-from enum import Enum, EnumDict
+from collections import Counter
+from enum import Enum
+from typing import Callable, Iterator
 
+from command_stats import CommandTiming
 
-class AlbinaEvent(EnumDict):
-    COMMAND: str
+DEFAULT_BUDGET_MS = 20.0
+DEFAULT_OVERRUNS = 3
+LOAD_TIMEOUT = 10.0
+SANDBOX_NICE = 10
 
 
-class AlbinaManager:
-    def __init__(self):
-        pass
+class AlbinaEvent(Enum):
+    """What listeners can subscribe to, and the data each event carries."""
+
+    COMMAND = "command"  # verb, args: a command line about to run
+    MOVE = "move"        # x, y, direction, cells: where a move or walk ended
+    KICK = "kick"        # mob, damage, hp, killed: a kick and how the mob took it
+    PICKUP = "pickup"    # x, y, type, subtype, kept: an item found on the floor
+    TICK = "tick"        # tick, time: a game tick has run
+    SAVE = "save"        # world: the world was saved
+
 
 class AlbinaUI(ABC):
     @abstractmethod
@@ -16,13 +35,17 @@ class AlbinaUI(ABC):
         pass
 
     @abstractmethod
-    def change_color(self, color):
+    def change_color(self, color, pos="X"):
         pass
 
     @abstractmethod
     def print(self, text):
         pass
 
+    @abstractmethod
+    def close(self):
+        pass
+
 class AlbinaCommand(ABC):
     @abstractmethod
     def __call__(self, args):
@@ -30,5 +53,467 @@ class AlbinaCommand(ABC):
 
 class AlbinaListener(ABC):
     @abstractmethod
-    def __call__(self) -> AlbinaEvent:
+    def __call__(self, event: AlbinaEvent, data: dict):
         pass
+
+
+class AlbinaPlugin:
+    """Base class of Python plugins.
+
+    A plugin is a module in plugins/ (foo.py) or a package (foo/__init__.py,
+    with an optional plugin.json giving its "name"). Every subclass of
+    AlbinaPlugin defined there is created once with the engine. commands()
+    maps new verbs to AlbinaCommand objects or any callable taking the
+    argument list; listeners() maps events to one listener or a list of
+    them. Both are read once, when the plugin loads.
+    """
+
+    name = ""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def commands(self) -> dict[str, Callable[[list[str]], None]]:
+        return {}
+
+    def listeners(self) -> dict[AlbinaEvent, Callable | list[Callable]]:
+        return {}
+
+
+def sandbox_settings(config: dict) -> tuple[bool, float, int]:
+    """Read plugin_sandbox, plugin_budget_ms and plugin_overruns from server/config.cfg."""
+    sandbox = bool(config.get("plugin_sandbox", False))
+    budget = float(config.get("plugin_budget_ms", DEFAULT_BUDGET_MS)) / 1000
+    overruns = int(config.get("plugin_overruns", DEFAULT_OVERRUNS))
+    return sandbox, budget, overruns
+
+
+def plugin_classes(path: str) -> list[tuple[str, type[AlbinaPlugin]]]:
+    """Import a plugin module or package and return every AlbinaPlugin it defines, with its name."""
+    base = os.path.basename(path.rstrip(os.sep))
+    stem = base[:-3] if base.endswith(".py") else base
+    name = stem
+
+    if os.path.isdir(path):
+        meta = os.path.join(path, "plugin.json")
+        if os.path.exists(meta):
+            with open(meta, "r", encoding="utf-8") as f:
+                name = json.load(f).get("name", stem)
+        spec = importlib.util.spec_from_file_location(f"albina_plugins.{stem}", os.path.join(path, "__init__.py"),
+                                                      submodule_search_locations=[path])
+    else:
+        spec = importlib.util.spec_from_file_location(f"albina_plugins.{stem}", path)
+
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[spec.name]
+        raise
+
+    classes = [value for value in vars(module).values() if isinstance(value, type)
+               and issubclass(value, AlbinaPlugin) and value.__module__ == module.__name__]
+    return [(cls.name or (name if len(classes) == 1 else cls.__name__), cls) for cls in classes]
+
+
+def plugin_listeners(plugin: AlbinaPlugin) -> Iterator[tuple[AlbinaEvent, Callable]]:
+    for event, listeners in plugin.listeners().items():
+        for listener in listeners if isinstance(listeners, (list, tuple)) else [listeners]:
+            yield event, listener
+
+
+class LoadedPlugin:
+    """A plugin as the manager keeps it: what it registered, whether it is on, and what it has cost.
+
+    For a sandboxed plugin, plugin is None and worker runs it; timing is
+    then what its calls took in the worker, latency how long the game
+    waited for each answer, skipped how many calls were dropped or
+    answered too late to be used, and overruns how many of its calls in a
+    row took longer than the budget.
+    """
+
+    def __init__(self, name: str, plugin: AlbinaPlugin | None, worker: "PluginWorker | None" = None, index: int = 0):
+        self.name = name
+        self.plugin = plugin
+        self.worker = worker
+        self.index = index
+        self.enabled = True
+        self.commands: dict[str, Callable | None] = {}
+        self.listeners: list[tuple[AlbinaEvent, Callable | None]] = []
+        self.timing = CommandTiming()
+        self.latency = CommandTiming()
+        self.errors = 0
+        self.skipped = 0
+        self.overruns = 0
+
+
+class SandboxEngine:
+    """The engine as a sandboxed plugin sees it: the config, and a console whose lines go back with each answer."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.lines: list[str] = []
+
+    def print_to_console(self, text):
+        self.lines.append(str(text))
+
+    def drain(self) -> list[str]:
+        lines, self.lines = self.lines, []
+        return lines
+
+
+def serve_plugins(path: str, config: dict, conn):
+    """Worker process: load the plugins at path and run their commands and listeners until the pipe closes.
+
+    The first message is ("loaded", [(name, verbs, events), ...]) or
+    ("failed", error). Requests are ("events", seq, [(index, event, data),
+    ...]) and ("command", seq, index, verb, args), and each is answered by
+    ("done", seq, calls, errors, lines): the seconds every call took as
+    (index, seconds), failures as (index, what, error) and what the
+    plugins printed.
+    """
+    # Ctrl+C reaches the whole process group; the game decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(os, "nice"):
+        os.nice(SANDBOX_NICE)
+
+    engine = SandboxEngine(config)
+    try:
+        plugins = [(name, cls(engine)) for name, cls in plugin_classes(path)]
+        commands = [{verb.lower(): command for verb, command in plugin.commands().items()} for _, plugin in plugins]
+        listeners = []
+        for _, plugin in plugins:
+            by_event: dict[AlbinaEvent, list[Callable]] = {}
+            for event, listener in plugin_listeners(plugin):
+                by_event.setdefault(event, []).append(listener)
+            listeners.append(by_event)
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+    conn.send(("loaded", [(name, list(verbs), [event.value for event in by_event])
+                          for (name, _), verbs, by_event in zip(plugins, commands, listeners)]))
+
+    while True:
+        try:
+            op, seq, *args = conn.recv()
+        except (EOFError, OSError):
+            return
+        calls, errors = [], []
+        if op == "events":
+            jobs = []
+            for index, value, data in args[0]:
+                event = AlbinaEvent(value)
+                jobs += [(index, value, listener, (event, data)) for listener in listeners[index].get(event, ())]
+        else:
+            index, verb, words = args
+            jobs = [(index, f"'{verb}'", commands[index][verb], (words,))]
+
+        for index, what, call, call_args in jobs:
+            start = time.perf_counter()
+            try:
+                call(*call_args)
+            except Exception as e:
+                errors.append((index, what, str(e)))
+            calls.append((index, time.perf_counter() - start))
+        conn.send(("done", seq, calls, errors, engine.drain()))
+
+
+class PluginWorker:
+    """A sandbox process running the plugins of one plugins/ entry, and the events waiting to be sent to it.
+
+    Each batch of events and each command is one request, answered
+    within the manager's budget or skipped: its output is dropped, and
+    further events are dropped while the late answer is still out. The
+    budget is charged per call, from the times the worker reports: a
+    plugin whose calls take longer than the budget max_overruns times in
+    a row has its process stopped and its plugins disabled. Requests
+    skipped while waiting for a late answer are not charged, but an
+    answer still missing after max_overruns budgets stops the process
+    too, since some call in it has overrun that many times over.
+    """
+
+    def __init__(self, manager: "AlbinaManager", path: str):
+        self.manager = manager
+        self.path = path
+        self.plugins: list[LoadedPlugin] = []
+        self.batch: list[tuple[int, str, dict]] = []
+        self.process = None
+        self.conn = None
+        self.seq = 0
+        self.late: int | None = None
+        self.late_sent = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None
+
+    def start(self) -> list[tuple[str, list[str], list[str]]]:
+        """Start the process and return what it loaded; raises if it did not load in time."""
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=serve_plugins, args=(self.path, self.manager.engine.config, child),
+                                       name=f"albina-plugin-{os.path.basename(self.path)}", daemon=True)
+        self.process.start()
+        child.close()
+        self.batch, self.seq, self.late = [], 0, None
+        for loaded in self.plugins:
+            loaded.overruns = 0
+
+        try:
+            if not self.conn.poll(LOAD_TIMEOUT):
+                raise TimeoutError(f"not loaded after {LOAD_TIMEOUT:g}s")
+            kind, value = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.stop()
+            raise RuntimeError("sandbox process exited") from e
+        except TimeoutError:
+            self.stop()
+            raise
+        if kind != "loaded":
+            self.stop()
+            raise RuntimeError(value)
+        return value
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(1.0)
+            self.conn.close()
+        self.process = None
+        self.batch = []
+
+    def queue(self, loaded: LoadedPlugin, event: AlbinaEvent, data: dict):
+        self.batch.append((loaded.index, event.value, data))
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if batch and self.running:
+            self.request(Counter(index for index, _, _ in batch), "events", batch)
+
+    def command(self, loaded: LoadedPlugin, verb: str) -> Callable:
+        def run(args: list[str]):
+            self.flush()
+            if self.running and self.request(Counter([loaded.index]), "command", loaded.index, verb, args) is None:
+                self.manager.engine.print_to_console(f"Plugin {loaded.name} did not answer '{verb}' in time")
+        return run
+
+    def request(self, calls: Counter, op: str, *args) -> list | None:
+        """Send one request and wait out the budget for its answer; None if it was skipped."""
+        start = time.perf_counter()
+        try:
+            if self.late is not None and not self._caught_up(start):
+                return self._skip(calls)
+
+            self.seq += 1
+            self.conn.send((op, self.seq, *args))
+            deadline = start + self.manager.budget
+            while (answer := self._receive(max(0.0, deadline - time.perf_counter()))) is not None:
+                if answer[0] == self.seq:
+                    break
+            else:
+                self.late, self.late_sent = self.seq, start
+                return self._skip(calls)
+        except (EOFError, OSError):
+            self.manager.stop_worker(self, "its sandbox process exited")
+            return None
+        if not self._within_budget():
+            return None
+
+        elapsed = time.perf_counter() - start
+        for index in calls:
+            self.plugins[index].latency.add(elapsed)
+        _, errors, lines = answer
+        for index, what, error in errors:
+            self.manager.engine.print_to_console(f"Plugin {self.plugins[index].name} failed on {what}: {error}")
+        for line in lines:
+            self.manager.engine.print_to_console(line)
+        return lines
+
+    def _caught_up(self, now: float) -> bool:
+        """Take in the answers that came since; whether the late one is among them and the worker may go on."""
+        while (answer := self._receive(0)) is not None:
+            if answer[0] == self.late:
+                self.late = None
+                return self._within_budget()
+
+        waited = now - self.late_sent
+        if waited >= self.manager.max_overruns * self.manager.budget:
+            self.manager.stop_worker(self, f"no answer after {waited * 1000:.0f} ms, "
+                                           f"{self.manager.max_overruns} times its {self.manager.budget * 1000:g} ms budget")
+        return False
+
+    def _receive(self, timeout: float) -> tuple | None:
+        """The next answer within timeout seconds, its calls already counted against their plugins."""
+        if not self.conn.poll(timeout):
+            return None
+        _, seq, calls, errors, lines = self.conn.recv()
+        for index, elapsed in calls:
+            loaded = self.plugins[index]
+            loaded.timing.add(elapsed)
+            loaded.overruns = loaded.overruns + 1 if elapsed > self.manager.budget else 0
+        for index, _, _ in errors:
+            self.plugins[index].errors += 1
+        return seq, errors, lines
+
+    def _within_budget(self) -> bool:
+        """Stop the worker if one of its plugins has overrun the budget max_overruns calls in a row."""
+        for loaded in self.plugins:
+            if loaded.overruns >= self.manager.max_overruns:
+                self.manager.stop_worker(self, f"{loaded.name} took over the {self.manager.budget * 1000:g} ms "
+                                               f"budget {loaded.overruns} calls in a row")
+                return False
+        return True
+
+    def _skip(self, calls: Counter) -> None:
+        for index, count in calls.items():
+            self.plugins[index].skipped += count
+        return None
+
+
+class AlbinaManager:
+    """Loads Python plugins, registers their commands and delivers events to their listeners.
+
+    For every event the listeners of enabled plugins are kept in one tuple,
+    rebuilt only when a plugin is loaded, enabled or disabled, so emit()
+    costs a dict lookup when nobody listens. Every command and listener
+    call is timed against its plugin; a plugin that raises is reported
+    and carries on.
+
+    With sandbox on, plugins run in PluginWorker processes instead: emit()
+    only queues their events, and flush(), which the engine calls after
+    every command and tick, sends each worker its batch and waits at most
+    budget seconds for the answer.
+    """
+
+    def __init__(self, engine, state: Enum):
+        self.engine = engine
+        self.state = state
+        self.plugins: list[LoadedPlugin] = []
+        self.workers: list[PluginWorker] = []
+        self.sandbox = False
+        self.budget = DEFAULT_BUDGET_MS / 1000
+        self.max_overruns = DEFAULT_OVERRUNS
+        self._dispatch: dict[AlbinaEvent, tuple[tuple[LoadedPlugin, Callable | None], ...]] = {}
+
+    def configure(self, config: dict):
+        self.sandbox, self.budget, self.max_overruns = sandbox_settings(config)
+
+    def load_path(self, path: str) -> int:
+        """Load every AlbinaPlugin defined by a plugin module or package, in a sandbox process if sandbox is on."""
+        if self.sandbox:
+            return self._load_sandboxed(path)
+
+        classes = plugin_classes(path)
+        for name, cls in classes:
+            self.add(cls(self.engine), name)
+        return len(classes)
+
+    def _load_sandboxed(self, path: str) -> int:
+        worker = PluginWorker(self, path)
+        loaded = worker.start()
+        self.workers.append(worker)
+        for index, (name, verbs, events) in enumerate(loaded):
+            plugin = LoadedPlugin(name, None, worker, index)
+            worker.plugins.append(plugin)
+            self._register(plugin, dict.fromkeys(verbs), [(AlbinaEvent(value), None) for value in events])
+        return len(loaded)
+
+    def add(self, plugin: AlbinaPlugin, name: str) -> LoadedPlugin:
+        loaded = LoadedPlugin(name, plugin)
+        self._register(loaded, plugin.commands(), plugin_listeners(plugin))
+        return loaded
+
+    def _register(self, loaded: LoadedPlugin, commands: dict, listeners):
+        for verb, command in commands.items():
+            verb = verb.lower()
+            if self.engine.command_handler.has(verb, self.state):
+                self.engine.print_to_console(f"Plugin {loaded.name}: command '{verb}' already exists")
+                continue
+            loaded.commands[verb] = command
+        loaded.listeners.extend(listeners)
+
+        self.plugins.append(loaded)
+        self.set_enabled(loaded, True)
+
+    def clear(self):
+        for loaded in self.plugins:
+            self.set_enabled(loaded, False)
+        for worker in self.workers:
+            worker.stop()
+        self.plugins = []
+        self.workers = []
+
+    def set_enabled(self, loaded: LoadedPlugin, enabled: bool):
+        worker = loaded.worker
+        if enabled and worker is not None and not worker.running:
+            try:
+                worker.start()
+            except Exception as e:
+                self.engine.print_to_console(f"Plugin {loaded.name} failed to restart: {e}")
+                return
+
+        loaded.enabled = enabled
+        handler = self.engine.command_handler
+        for verb, command in loaded.commands.items():
+            if not enabled:
+                handler.unregister(verb, self.state)
+            elif worker is not None:
+                handler.register(verb, self.state, worker.command(loaded, verb))
+            else:
+                handler.register(verb, self.state, self._timed_command(loaded, verb, command))
+        self.rebuild()
+
+    def stop_worker(self, worker: PluginWorker, reason: str):
+        worker.stop()
+        for loaded in worker.plugins:
+            if loaded.enabled:
+                self.set_enabled(loaded, False)
+                self.engine.print_to_console(f"Plugin {loaded.name} disabled: {reason}")
+
+    def rebuild(self):
+        dispatch: dict[AlbinaEvent, list[tuple[LoadedPlugin, Callable]]] = {}
+        for loaded in self.plugins:
+            if loaded.enabled:
+                for event, listener in loaded.listeners:
+                    dispatch.setdefault(event, []).append((loaded, listener))
+        self._dispatch = {event: tuple(listeners) for event, listeners in dispatch.items()}
+
+    def listening(self, event: AlbinaEvent) -> bool:
+        return event in self._dispatch
+
+    def emit(self, event: AlbinaEvent, data: dict):
+        listeners = self._dispatch.get(event)
+        if not listeners:
+            return
+
+        for loaded, listener in listeners:
+            if loaded.worker is not None:
+                loaded.worker.queue(loaded, event, data)
+                continue
+            start = time.perf_counter()
+            try:
+                listener(event, data)
+            except Exception as e:
+                loaded.errors += 1
+                self.engine.print_to_console(f"Plugin {loaded.name} failed on {event.value}: {e}")
+            finally:
+                loaded.timing.add(time.perf_counter() - start)
+
+    def flush(self):
+        """Send every sandbox worker the events queued for it and use the answers that come back in time."""
+        for worker in self.workers:
+            if worker.batch:
+                worker.flush()
+
+    def _timed_command(self, loaded: LoadedPlugin, verb: str, command: Callable) -> Callable:
+        def run(args: list[str]):
+            start = time.perf_counter()
+            try:
+                command(args)
+            except Exception as e:
+                loaded.errors += 1
+                self.engine.print_to_console(f"Plugin {loaded.name} failed on '{verb}': {e}")
+            finally:
+                loaded.timing.add(time.perf_counter() - start)
+        return run
@@ -0,0 +1,489 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Iterator, Protocol
+
+from journal import apply_entity_record
+from spatial import SpatialIndex
+
+REGION_SIZE = 64
+OVERLAY_DIR = "regions"
+
+
+def region_of(x: int, y: int) -> tuple[int, int]:
+    return x // REGION_SIZE, y // REGION_SIZE
+
+
+class RegionSource(Protocol):
+    """Where regions come from when they are not in memory: a world file or plain lists."""
+
+    def load(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]: ...
+
+    def keys(self) -> Iterator[tuple[int, int]]: ...
+
+
+class MemoryRegions:
+    """Region source over item and mob lists that are already in memory (v1 worlds)."""
+
+    def __init__(self, items: list[dict], mobs: list[dict]):
+        self._regions: dict[tuple[int, int], tuple[list[dict], list[dict]]] = {}
+
+        for item in items:
+            self._bucket(region_of(item["x"], item["y"]))[0].append(item)
+        for mob in mobs:
+            self._bucket(region_of(mob["x"], mob["y"]))[1].append(mob)
+
+    def _bucket(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+        if key not in self._regions:
+            self._regions[key] = ([], [])
+        return self._regions[key]
+
+    def load(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+        return self._bucket(key)
+
+    def keys(self) -> Iterator[tuple[int, int]]:
+        return iter(list(self._regions))
+
+
+# What makes an entry the same entry; other fields may change in place (a hit mob keeps its slot).
+_IDENTITY = {"items": ("type", "subtype", "x", "y"), "mobs": ("type", "x", "y")}
+
+
+class ProceduralRegions:
+    """Region source for worlds whose items and mobs are generated from the seed.
+
+    Only what changed is kept, as a diff per region against what generate
+    gives for it: per kind, the indexes of generated entries that are gone,
+    [index, fields] for those that changed, and entries that were added.
+    Regions without a diff are generated as they are. The saved world
+    therefore only grows with the changes the player made.
+    """
+
+    def __init__(self, diffs: dict[tuple[int, int], dict],
+                 generate: Callable[[tuple[int, int]], tuple[list[dict], list[dict]]]):
+        self.diffs = diffs
+        self.generate = generate
+
+    def load(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+        return self.patch(key, self.diffs.get(key))
+
+    def keys(self) -> Iterator[tuple[int, int]]:
+        return iter(list(self.diffs))
+
+    def patch(self, key: tuple[int, int], diff: dict | None) -> tuple[list[dict], list[dict]]:
+        items, mobs = self.generate(key)
+        if not diff:
+            return items, mobs
+        return _patch(items, diff.get("items")), _patch(mobs, diff.get("mobs"))
+
+    def diff(self, key: tuple[int, int], items: list[dict], mobs: list[dict]) -> dict:
+        """What turns the generated region into items and mobs; empty if nothing changed."""
+        generated_items, generated_mobs = self.generate(key)
+        diff = {}
+        for kind, generated, current in (("items", generated_items, items), ("mobs", generated_mobs, mobs)):
+            changes = _diff(generated, current, _IDENTITY[kind])
+            if changes:
+                diff[kind] = changes
+        return diff
+
+
+def _diff(generated: list[dict], current: list[dict], identity: tuple[str, ...]) -> dict:
+    slots: dict[tuple, list[int]] = {}
+    for i, entry in enumerate(generated):
+        slots.setdefault(tuple(entry[field] for field in identity), []).append(i)
+
+    changed, added = [], []
+    for entry in current:
+        matches = slots.get(tuple(entry[field] for field in identity))
+        if not matches:
+            added.append(dict(entry))
+            continue
+
+        i = matches.pop(0)
+        fields = {field: value for field, value in entry.items() if generated[i].get(field) != value}
+        if fields:
+            changed.append([i, fields])
+
+    changes = {}
+    removed = sorted(i for matches in slots.values() for i in matches)
+    for name, values in (("removed", removed), ("changed", changed), ("added", added)):
+        if values:
+            changes[name] = values
+    return changes
+
+
+def _patch(generated: list[dict], changes: dict | None) -> list[dict]:
+    if not changes:
+        return generated
+
+    for i, fields in changes.get("changed", ()):
+        generated[i].update(fields)
+    removed = set(changes.get("removed", ()))
+    return [entry for i, entry in enumerate(generated) if i not in removed] + [dict(entry) for entry in changes.get("added", ())]
+
+
+def shares_lists(source: RegionSource) -> bool:
+    """Whether the source hands out the lists it keeps, rather than fresh ones per load."""
+    return isinstance(source, MemoryRegions)
+
+
+class Region:
+    __slots__ = ("key", "items", "mobs", "dirty")
+
+    def __init__(self, key: tuple[int, int], items: list[dict], mobs: list[dict]):
+        self.key = key
+        self.items = SpatialIndex(items)
+        self.mobs = SpatialIndex(mobs)
+        self.dirty = False
+
+
+def overlay_paths(overlay_dir: str | None) -> dict[tuple[int, int], list[tuple[int, str]]]:
+    """All overlay files per region, oldest first."""
+    overlays: dict[tuple[int, int], list[tuple[int, str]]] = {}
+    if not overlay_dir or not os.path.isdir(overlay_dir):
+        return overlays
+
+    for filename in os.listdir(overlay_dir):
+        if not filename.endswith(".json"):
+            continue
+        name, _, seq = filename[:-len(".json")].rpartition(".")
+        rx, _, ry = name.partition("_")
+        overlays.setdefault((int(rx), int(ry)), []).append((int(seq), os.path.join(overlay_dir, filename)))
+
+    for versions in overlays.values():
+        versions.sort()
+    return overlays
+
+
+def load_region(source: RegionSource, key: tuple[int, int], overlay: tuple[int, str] | None,
+                pending: list[dict] | None, copy: bool = False) -> tuple[list[dict], list[dict]]:
+    """Read one region: its newest overlay if any, else the source, plus the journal records after it."""
+    if overlay is not None:
+        overlay_seq, path = overlay
+        data = read_overlay(path)
+        items, mobs = source.patch(key, data["diff"]) if "diff" in data else (data["items"], data["mobs"])
+    else:
+        overlay_seq = 0
+        items, mobs = source.load(key)
+        if copy:
+            items, mobs = list(items), [dict(mob) for mob in mobs]
+
+    if pending:
+        item_index, mob_index = SpatialIndex(items), SpatialIndex(mobs)
+        for record in pending:
+            if record["seq"] > overlay_seq:
+                apply_entity_record(record, item_index, mob_index)
+
+    return items, mobs
+
+
+def read_overlay(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RegionSnapshot:
+    """A point-in-time view of every region, for writing a full world snapshot off the main thread.
+
+    Dirty regions are copied when the snapshot is taken; everything else is
+    read from the source or the overlay files named here when iterated.
+    """
+
+    def __init__(self, source: RegionSource, overlays: dict[tuple[int, int], tuple[int, str]],
+                 captured: dict[tuple[int, int], tuple[list[dict], list[dict]]],
+                 pending: dict[tuple[int, int], list[dict]]):
+        self.source = source
+        self.overlays = overlays
+        self.captured = captured
+        self.pending = pending
+
+    def __iter__(self) -> Iterator[tuple[tuple[int, int], list[dict], list[dict]]]:
+        keys = set(self.source.keys()) | set(self.overlays) | set(self.captured)
+
+        for key in sorted(keys):
+            if key in self.captured:
+                items, mobs = self.captured[key]
+            else:
+                items, mobs = load_region(self.source, key, self.overlays.get(key), self.pending.get(key), copy=True)
+
+            # A changed region is kept even when emptied.
+            if items or mobs or key in self.captured or key in self.overlays:
+                yield key, items, mobs
+
+
+class DiffSnapshot:
+    """RegionSnapshot for procedural worlds: the diff of every changed region, and no stored regions.
+
+    Diffs need the generated regions, which only the main thread may
+    produce, so they are all worked out when the snapshot is taken; the
+    overlays named here already hold diffs and are only read when iterated.
+    """
+
+    def __init__(self, diffs: dict[tuple[int, int], dict], overlays: dict[tuple[int, int], tuple[int, str]],
+                 captured: dict[tuple[int, int], dict]):
+        self.stored = diffs
+        self.overlays = overlays
+        self.captured = captured
+
+    def __iter__(self) -> Iterator[tuple[tuple[int, int], list[dict], list[dict]]]:
+        return iter(())
+
+    def region_diffs(self) -> Iterator[tuple[tuple[int, int], dict]]:
+        for key in sorted(set(self.stored) | set(self.overlays) | set(self.captured)):
+            if key in self.captured:
+                diff = self.captured[key]
+            elif key in self.overlays:
+                diff = read_overlay(self.overlays[key][1])["diff"]
+            else:
+                diff = self.stored[key]
+
+            # A region back to what the seed gives needs no entry.
+            if diff:
+                yield key, diff
+
+
+class RegionStore:
+    """Items and mobs paged in by region around the player.
+
+    Regions live in a bounded LRU. A dirty region is written back to
+    regions/<rx>_<ry>.<seq>.json when evicted, where seq is the journal
+    position it reflects, so journal records up to seq are not replayed
+    over it again. Journal records for regions that are not loaded yet are
+    kept aside and applied when the region is first loaded.
+    """
+
+    def __init__(self, source: RegionSource, overlay_dir: str | None = None, capacity: int | None = 64,
+                 radius: int = 1, current_seq: Callable[[], int] = lambda: 0):
+        self.source = source
+        self.overlay_dir = overlay_dir
+        self.capacity = capacity
+        self.radius = radius
+        self.current_seq = current_seq
+
+        self.loads = 0
+        self.evictions = 0
+        self.write_backs = 0
+
+        self._regions: OrderedDict[tuple[int, int], Region] = OrderedDict()
+        self._overlays = overlay_paths(overlay_dir)
+        self._found = {path for versions in self._overlays.values() for _, path in versions}
+        self._pending: dict[tuple[int, int], list[dict]] = {}
+        self._pinned: set[str] = set()
+        self._focus: set[tuple[int, int]] = set()
+        self._center: tuple[int, int] | None = None
+
+        self.items = RegionView(self, "items")
+        self.mobs = RegionView(self, "mobs")
+
+    def defer(self, record: dict):
+        key = region_of(record["x"], record["y"])
+        region = self._regions.get(key)
+        if region is not None:
+            apply_entity_record(record, region.items, region.mobs)
+            region.dirty = True
+        else:
+            self._pending.setdefault(key, []).append(record)
+
+    def region(self, key: tuple[int, int]) -> Region:
+        region = self._regions.get(key)
+        if region is not None:
+            self._regions.move_to_end(key)
+            return region
+
+        versions = self._overlays.get(key)
+        pending = self._pending.pop(key, None)
+        items, mobs = load_region(self.source, key, versions[-1] if versions else None, pending)
+
+        region = self._regions[key] = Region(key, items, mobs)
+        # Replayed journal records are not in the source or overlay yet.
+        region.dirty = bool(pending)
+        self.loads += 1
+        self._trim()
+        return region
+
+    def focus(self, x: int, y: int):
+        rx, ry = region_of(x, y)
+        if (rx, ry) == self._center:
+            return
+
+        self._center = (rx, ry)
+        self._focus = {(rx + dx, ry + dy)
+                       for dx in range(-self.radius, self.radius + 1)
+                       for dy in range(-self.radius, self.radius + 1)}
+
+        for key in self._focus:
+            self.region(key)
+
+    def loaded(self) -> int:
+        return len(self._regions)
+
+    def _trim(self):
+        if self.capacity is None:
+            return
+
+        for key in list(self._regions):
+            if len(self._regions) <= self.capacity:
+                break
+            if key not in self._focus:
+                self._evict(key)
+
+    def _evict(self, key: tuple[int, int]):
+        region = self._regions.pop(key)
+        self.evictions += 1
+
+        if region.dirty and self.overlay_dir:
+            self._write_back(region)
+
+    def _write_back(self, region: Region):
+        os.makedirs(self.overlay_dir, exist_ok=True)
+
+        seq = self.current_seq()
+        rx, ry = region.key
+        path = os.path.join(self.overlay_dir, f"{rx}_{ry}.{seq}.json")
+        if isinstance(self.source, ProceduralRegions):
+            data = {"seq": seq, "diff": self.source.diff(region.key, list(region.items), list(region.mobs))}
+        else:
+            data = {"seq": seq, "items": list(region.items), "mobs": list(region.mobs)}
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+        self.write_backs += 1
+
+        versions = self._overlays.setdefault(region.key, [])
+        for _, old_path in versions:
+            if old_path != path and old_path not in self._pinned:
+                os.remove(old_path)
+        versions[:] = [(old_seq, old_path) for old_seq, old_path in versions
+                       if old_path != path and old_path in self._pinned]
+        versions.append((seq, path))
+
+    def capture(self) -> RegionSnapshot | DiffSnapshot:
+        """Copy dirty regions and pin the overlays a snapshot taken now will read.
+
+        A MemoryRegions source shares its lists with the loaded regions, so
+        there every region is copied now rather than read later. For a
+        procedural source, dirty regions and regions with journal records
+        waiting are diffed now.
+        """
+        if isinstance(self.source, ProceduralRegions):
+            return self._capture_diffs()
+
+        eager = shares_lists(self.source)
+
+        captured = {}
+        for key, region in self._regions.items():
+            if region.dirty or eager:
+                captured[key] = (list(region.items), [dict(mob) for mob in region.mobs])
+                region.dirty = False
+
+        if eager:
+            for key in self.source.keys():
+                if key not in captured:
+                    captured[key] = load_region(self.source, key, None, self._pending.get(key), copy=True)
+
+        overlays = {key: versions[-1] for key, versions in self._overlays.items() if versions}
+        self._pinned.update(path for _, path in overlays.values())
+
+        pending = {key: list(records) for key, records in self._pending.items()}
+        return RegionSnapshot(self.source, overlays, captured, pending)
+
+    def _capture_diffs(self) -> DiffSnapshot:
+        for key in list(self._pending):
+            self.region(key)
+
+        captured = {}
+        for key, region in self._regions.items():
+            if region.dirty:
+                captured[key] = self.source.diff(key, list(region.items), list(region.mobs))
+                region.dirty = False
+
+        overlays = {key: versions[-1] for key, versions in self._overlays.items() if versions}
+        for key, (_, path) in overlays.items():
+            # Overlays left from before diffs hold the whole region.
+            if key not in captured and path in self._found:
+                data = read_overlay(path)
+                if "diff" not in data:
+                    captured[key] = self.source.diff(key, data["items"], data["mobs"])
+
+        self._pinned.update(path for _, path in overlays.values())
+        return DiffSnapshot(dict(self.source.diffs), overlays, captured)
+
+    def compacted(self, snapshot: RegionSnapshot | DiffSnapshot, snapshot_seq: int, source: RegionSource | None = None):
+        """A snapshot is on disk: drop the overlays it covers and switch to the new source, if any."""
+        for _, path in snapshot.overlays.values():
+            self._pinned.discard(path)
+
+        for key, versions in list(self._overlays.items()):
+            keep = []
+            for seq, path in versions:
+                if seq <= snapshot_seq and path not in self._pinned:
+                    os.remove(path)
+                    self._found.discard(path)
+                else:
+                    keep.append((seq, path))
+            if keep:
+                self._overlays[key] = keep
+            else:
+                del self._overlays[key]
+
+        if source is not None:
+            self.source = source
+            self._pending.clear()
+
+    def release(self, snapshot: RegionSnapshot | DiffSnapshot):
+        """A snapshot failed to write: unpin its overlays and mark its regions dirty again."""
+        for _, path in snapshot.overlays.values():
+            self._pinned.discard(path)
+        for key in snapshot.captured:
+            region = self._regions.get(key)
+            if region is not None:
+                region.dirty = True
+
+
+class RegionView:
+    """SpatialIndex-like access to one kind of entry ("items" or "mobs") across regions."""
+
+    def __init__(self, store: RegionStore, kind: str):
+        self._store = store
+        self._kind = kind
+
+    def _index(self, x: int, y: int) -> SpatialIndex:
+        return getattr(self._store.region(region_of(x, y)), self._kind)
+
+    def at(self, x: int, y: int) -> list[dict]:
+        return self._index(x, y).at(x, y)
+
+    def first_at(self, x: int, y: int) -> dict | None:
+        return self._index(x, y).first_at(x, y)
+
+    def in_range(self, x0: int, y0: int, x1: int, y1: int) -> list[dict]:
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+
+        (rx0, ry0), (rx1, ry1) = region_of(x0, y0), region_of(x1, y1)
+        found = []
+        for rx in range(rx0, rx1 + 1):
+            for ry in range(ry0, ry1 + 1):
+                index = getattr(self._store.region((rx, ry)), self._kind)
+                found.extend(index.in_range(x0, y0, x1, y1))
+        return found
+
+    def near(self, x: int, y: int, radius: int) -> list[dict]:
+        return self.in_range(x - radius, y - radius, x + radius, y + radius)
+
+    def add(self, entry: dict):
+        region = self._store.region(region_of(entry["x"], entry["y"]))
+        getattr(region, self._kind).add(entry)
+        region.dirty = True
+
+    def remove(self, entry: dict):
+        region = self._store.region(region_of(entry["x"], entry["y"]))
+        getattr(region, self._kind).remove(entry)
+        region.dirty = True
+
+    def changed(self, entry: dict):
+        self._store.region(region_of(entry["x"], entry["y"])).dirty = True
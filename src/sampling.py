@@ -0,0 +1,107 @@
+import random
+from typing import Any, Callable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(1) weighted draws after an O(n) build."""
+
+    def __init__(self, outcomes: list, weights: list[float]):
+        if len(outcomes) != len(weights):
+            raise ValueError("outcomes and weights must have the same length")
+
+        self.outcomes = list(outcomes)
+        self.weights = list(weights)
+        self.total = float(sum(weights))
+
+        if not self.outcomes or self.total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+
+        count = len(self.outcomes)
+        scaled = [weight * count / self.total for weight in weights]
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # prob as a bound on 32 random bits, for draws made from integer hashes.
+        self.thresholds = [min(1 << 32, int(p * (1 << 32))) for p in self.prob]
+        self._arrays = None
+
+    def probability(self, outcome) -> float:
+        return sum(weight for candidate, weight in zip(self.outcomes, self.weights)
+                   if candidate == outcome) / self.total
+
+    def sample_index(self, rng: random.Random | None = None) -> int:
+        rng = rng or random
+        i = rng.randrange(len(self.outcomes))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def sample(self, rng: random.Random | None = None) -> Any:
+        return self.outcomes[self.sample_index(rng)]
+
+    def arrays(self):
+        """thresholds and alias as NumPy arrays, for drawing many outcomes at once."""
+        if self._arrays is None:
+            self._arrays = np.asarray(self.thresholds, dtype=np.uint64), np.asarray(self.alias, dtype=np.int64)
+        return self._arrays
+
+
+class SamplerRegistry:
+    """Named alias tables built lazily from builder callbacks and cached until invalidated."""
+
+    def __init__(self):
+        self._builders: dict[str, Callable[[], tuple[list, list[float]]]] = {}
+        self._tables: dict[str, AliasTable] = {}
+
+    def register(self, name: str, builder: Callable[[], tuple[list, list[float]]]):
+        self._builders[name] = builder
+        self._tables.pop(name, None)
+
+    def table(self, name: str) -> AliasTable:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = AliasTable(*self._builders[name]())
+        return table
+
+    def sample(self, name: str, rng: random.Random | None = None) -> Any:
+        return self.table(name).sample(rng)
+
+    def invalidate(self):
+        self._tables.clear()
+
+
+def nested_uniform_weights(item_types: dict, types: list[str] | None = None,
+                           rarity: bool = False) -> tuple[list[tuple[str, str]], list[float]]:
+    """Weights of a uniform type pick followed by a uniform subtype pick.
+
+    With rarity the weights also include the rarity acceptance test, so the
+    table total is the chance that one such attempt is kept.
+    """
+    types = types if types is not None else list(item_types.keys())
+    outcomes, weights = [], []
+
+    for item_type in types:
+        subtypes = item_types[item_type]
+        for subtype, data in subtypes.items():
+            outcomes.append((item_type, subtype))
+            weights.append((data["rarity"] if rarity else 1.0) / (len(types) * len(subtypes)))
+
+    return outcomes, weights
+
+
+def uniform_weights(mob_types: dict, rarity: bool = False) -> tuple[list[str], list[float]]:
+    outcomes = list(mob_types.keys())
+    return outcomes, [(mob_types[name]["rarity"] if rarity else 1.0) / len(outcomes) for name in outcomes]
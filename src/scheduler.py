@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+DEFAULT_TICK = 1.0
+MAX_CATCH_UP = 600
+
+
+@dataclass(order=True)
+class Job:
+    due: int
+    order: int
+    callback: Callable = field(compare=False)
+    args: tuple = field(compare=False, default=())
+    interval: int = field(compare=False, default=0)
+    name: str = field(compare=False, default="")
+    cancelled: bool = field(compare=False, default=False)
+
+
+class Scheduler:
+    """Fixed-timestep simulation clock with delayed and periodic jobs.
+
+    Ticks are numbered from the moment the scheduler is created and run
+    tick_length apart. advance() runs every tick whose time has come, so
+    after a stall the missed ticks run back to back and the simulation ends
+    up where it would have been. Beyond max_catch_up ticks the rest are
+    not run but counted as dropped and handed to on_skip, if given, to be
+    applied in one go; jobs do not run for them. Jobs are due on a tick
+    number, not a wall-clock time, so their order against the simulation
+    never depends on how late the frontend called advance().
+    """
+
+    def __init__(self, tick_length: float = DEFAULT_TICK, max_catch_up: int = MAX_CATCH_UP,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_error: Callable[[Job, Exception], None] | None = None,
+                 on_skip: Callable[[int], object] | None = None):
+        self.tick_length = tick_length
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.on_error = on_error
+        self.on_skip = on_skip
+        self.ticks = 0
+        self.stats = {
+            "ticks": 0,
+            "caught_up": 0,
+            "dropped": 0,
+            "overruns": 0,
+            "last_ms": 0.0,
+            "max_ms": 0.0,
+            "total_ms": 0.0
+        }
+
+        self._start = clock()
+        self._jobs: list[Job] = []
+        self._soon: list[Job] = []
+        self._order = itertools.count()
+
+    def to_ticks(self, seconds: float) -> int:
+        return max(1, math.ceil(seconds / self.tick_length - 1e-9))
+
+    def after(self, delay: float, callback: Callable, *args, name: str = "") -> Job:
+        """Run callback(*args) once, on the first tick at least delay seconds of game time from now."""
+        job = Job(self.ticks + self.to_ticks(delay), next(self._order), callback, args, 0, name)
+        heapq.heappush(self._jobs, job)
+        return job
+
+    def every(self, interval: float, callback: Callable, *args, name: str = "", delay: float | None = None) -> Job:
+        """Run callback(*args) every interval seconds of game time, the first time after delay (default interval)."""
+        ticks = self.to_ticks(interval)
+        first = ticks if delay is None else self.to_ticks(delay)
+        job = Job(self.ticks + first, next(self._order), callback, args, ticks, name)
+        heapq.heappush(self._jobs, job)
+        return job
+
+    def soon(self, callback: Callable, *args, name: str = "") -> Job:
+        """Run callback(*args) once on the next advance(), tick due or not.
+
+        For work split into short slices outside game time; next_due() is 0
+        while such a job waits, so frontends come back to it straight away.
+        """
+        job = Job(self.ticks, next(self._order), callback, args, 0, name)
+        self._soon.append(job)
+        return job
+
+    def cancel(self, job: Job):
+        job.cancelled = True
+
+    def jobs(self) -> list[Job]:
+        return sorted(job for job in self._jobs if not job.cancelled)
+
+    def next_due(self) -> float:
+        """Seconds until the next tick should run, or 0 while a soon() job waits."""
+        if self._soon:
+            return 0.0
+        return max(0.0, self._start + (self.ticks + 1) * self.tick_length - self.clock())
+
+    def advance(self, now: float | None = None) -> int:
+        """Run every tick that is due by now; returns how many ran."""
+        now = self.clock() if now is None else now
+        behind = int((now - self._start) // self.tick_length) - self.ticks
+
+        if behind > self.max_catch_up:
+            dropped = behind - self.max_catch_up
+            self.stats["dropped"] += dropped
+            self._start += dropped * self.tick_length
+            behind = self.max_catch_up
+            if self.on_skip is not None:
+                self.on_skip(dropped)
+
+        if behind > 1:
+            self.stats["caught_up"] += behind - 1
+
+        for _ in range(behind):
+            self.step()
+
+        # Jobs queued by these run on the next call, after the frontend has had its turn.
+        soon, self._soon = self._soon, []
+        for job in soon:
+            if not job.cancelled:
+                self._run(job)
+        return max(0, behind)
+
+    def step(self):
+        """Run one tick: every job due on it, in the order they were scheduled."""
+        start = time.perf_counter()
+        self.ticks += 1
+
+        jobs = self._jobs
+        while jobs and jobs[0].due <= self.ticks:
+            job = heapq.heappop(jobs)
+            if job.cancelled:
+                continue
+
+            if job.interval:
+                job.due += job.interval
+                job.order = next(self._order)
+                heapq.heappush(jobs, job)
+
+            self._run(job)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["last_ms"] = elapsed
+        stats["total_ms"] += elapsed
+        if elapsed > stats["max_ms"]:
+            stats["max_ms"] = elapsed
+        if elapsed > self.tick_length * 1000:
+            stats["overruns"] += 1
+
+    def _run(self, job: Job):
+        try:
+            job.callback(*job.args)
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(job, e)
@@ -0,0 +1,462 @@
+"""Albina over TCP: one loaded world shared by many players.
+
+    python src/server.py [world] [--host HOST] [--port PORT]
+
+The protocol is line-based UTF-8. A client first sends its player name
+(or `hello <name> [world]`), then one command per line using the game's own verbs
+(up 5, goto 10 20, give, kick, ...) plus `status`, `who` and `quit`. The
+output of each command is sent back followed by a line holding a single
+".". Lines the world sends on its own, such as hunger damage or waking
+up, start with "! " and can arrive at any time. An output line that
+would start with "." or "!" is sent with one extra "." in front.
+
+Every command and every tick runs to completion on the event loop
+thread, one at a time, so the world has a single writer and needs no
+locks. Each connection carries its own player, which is swapped into the
+engine for the length of a command. A connection's next command is not
+read until the output of the last one has been taken up by the socket,
+and a client whose unread output passes output_limit bytes is dropped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import traceback
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+import autosave
+import pathfinding
+import simulation
+from engine import AlbinaEngine, HeadlessUI, State, new_player
+from observable import ObservedDict
+from plugin_manager import AlbinaEvent
+from scheduler import Scheduler
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+OUTPUT_LIMIT = 1 << 20
+SESSION_LINES = 2000
+LINE_LIMIT = 4096
+PLAYERS_DIR = "players"
+
+# Verbs that act on the server rather than on one player's game.
+HOST_VERBS = {"stats", "plugin", "save", "exit"}
+NAME = re.compile(r"[a-z0-9_-]{1,32}")
+
+
+def server_settings(config: dict) -> tuple[str, int, int]:
+    """Read host, port and output_limit (bytes of unread output per client) from server/config.cfg."""
+    host = str(config.get("host", DEFAULT_HOST))
+    port = int(config.get("port", DEFAULT_PORT))
+    output_limit = int(config.get("output_limit", OUTPUT_LIMIT))
+    return host, port, output_limit
+
+
+def frame(lines: list[str], pushed: bool = False) -> str:
+    if pushed:
+        return "".join(f"! {line}\n" for line in lines)
+    return "".join(("." + line if line.startswith((".", "!")) else line) + "\n" for line in lines)
+
+
+@dataclass
+class Session:
+    name: str
+    player: ObservedDict
+    ui: HeadlessUI = field(default_factory=lambda: HeadlessUI(max_lines=SESSION_LINES))
+    selected_item: int | None = None
+    mob_difficulty: int = 0
+    goto_search: pathfinding.Search | None = None
+    writer: asyncio.StreamWriter | None = None
+    commands: int = 0
+
+
+class SessionScheduler(Scheduler):
+    """Scheduler whose one-off jobs run as the session that scheduled them."""
+
+    def __init__(self, world: "SharedWorld", **kwargs):
+        super().__init__(**kwargs)
+        self.world = world
+
+    def after(self, delay: float, callback: Callable, *args, name: str = ""):
+        callback, args = self._as_session(callback, args)
+        return super().after(delay, callback, *args, name=name)
+
+    def soon(self, callback: Callable, *args, name: str = ""):
+        callback, args = self._as_session(callback, args)
+        return super().soon(callback, *args, name=name)
+
+    def _as_session(self, callback: Callable, args: tuple) -> tuple[Callable, tuple]:
+        session = self.world.session
+        if session is not None:
+            return self.world.run_as, (session, callback) + args
+        return callback, args
+
+
+class SharedWorld(AlbinaEngine):
+    """An AlbinaEngine whose player is whichever session is running a command.
+
+    The world's own player (stat.alb) stays bound the rest of the time, so
+    saves and the journal keep describing the same world as in single
+    player. Session players are kept in players/<name>.json next to it and
+    are written whenever the world is saved and when they leave.
+    """
+
+    def __init__(self, ui):
+        super().__init__(ui)
+        self.sessions: dict[str, Session] = {}
+        self.session: Session | None = None
+        self._host = None
+
+        self.scheduler = SessionScheduler(self, on_error=self.job_failed, on_skip=self.fast_forward)
+        self.scheduler.every(self.scheduler.tick_length, self.tick, name="tick")
+        self.scheduler.every(self.scheduler.tick_length, self.autosave_tick, name="autosave")
+
+        self.command_handler.register("status", State.GAME, self.status_command)
+        self.command_handler.register("who", State.GAME, self.who_command)
+
+    @contextmanager
+    def bound(self, session: Session):
+        host = self.player, self.selected_item, self.mob_difficulty, self.goto_search, self.ui
+        self.player, self.selected_item, self.mob_difficulty, self.goto_search, self.ui = \
+            session.player, session.selected_item, session.mob_difficulty, session.goto_search, session.ui
+        self.session, self._host = session, host
+        try:
+            yield
+        finally:
+            session.selected_item, session.mob_difficulty, session.goto_search = \
+                self.selected_item, self.mob_difficulty, self.goto_search
+            self.player, self.selected_item, self.mob_difficulty, self.goto_search, self.ui = host
+            self.session = self._host = None
+
+    def run_as(self, session: Session, callback: Callable, *args):
+        if self.sessions.get(session.name) is not session:
+            return
+        with self.bound(session):
+            callback(*args)
+
+    def run_command(self, session: Session, command: str) -> list[str]:
+        """Run one command line as session and return what it printed.
+
+        A command that raises is logged on the server with its traceback;
+        the session that sent it only gets an error line, and every other
+        session carries on.
+        """
+        verb = command.split()[0].lower()
+        session.commands += 1
+        failure = None
+
+        with self.bound(session):
+            if verb in HOST_VERBS:
+                self.print_to_console(f"'{verb}' is not available over the network")
+            else:
+                try:
+                    message = self.command_handler.process_command(command, State.GAME)
+                except Exception as e:
+                    failure = e
+                    message = f"Error in '{verb}': {e}"
+                if message:
+                    self.print_to_console(message)
+
+        if failure is not None:
+            self.print_to_console(f"{session.name}: '{command}' failed\n"
+                                  + "".join(traceback.format_exception(failure)).rstrip())
+        return session.ui.drain()
+
+    def player_path(self, name: str) -> str:
+        return os.path.join("world", str(self.current_world), PLAYERS_DIR, f"{name}.json")
+
+    def join(self, name: str) -> Session:
+        player = new_player()
+        path = self.player_path(name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                player.update(json.load(f))
+        else:
+            player["time"] = simulation.day_phase(self.world["time"], self.day_length)
+
+        session = self.sessions[name] = Session(name, ObservedDict(player))
+        with self.bound(session):
+            self.regions.focus(self.player["x"], self.player["y"])
+        return session
+
+    def leave(self, session: Session):
+        if self.sessions.get(session.name) is session:
+            del self.sessions[session.name]
+            self.save_player(session)
+
+    def save_player(self, session: Session):
+        path = self.player_path(session.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        autosave.write_atomic(path, json.dumps(session.player))
+
+    def save_world(self):
+        super().save_world()
+        for session in self.sessions.values():
+            self.save_player(session)
+
+    def save_game(self, args):
+        if self.session is None:
+            super().save_game(args)
+            return
+
+        # The journal and stat.alb belong to the world's own player, not to this session.
+        session, player = self.session, self.player
+        self.player, self.session = self._host[0], None
+        try:
+            self.save_world()
+        finally:
+            self.player, self.session = player, session
+        self.print_to_console("Game saved")
+
+    def game_over(self, message):
+        if self.session is None:
+            super().game_over(message)
+            return
+
+        self.print_to_console(f"Game Over: {message}")
+        self.player.clear()
+        self.player.update(new_player())
+        self.player["time"] = simulation.day_phase(self.world["time"], self.day_length)
+        self.selected_item = None
+        self.mob_difficulty = 0
+        self.print_to_console("You wake up at the entrance of the labyrinth")
+
+    def tick(self):
+        """One tick for every connected player, then the world clock."""
+        if not self.game_loaded:
+            return
+
+        for session in list(self.sessions.values()):
+            with self.bound(session):
+                self.player_tick()
+
+        self.world["time"] += self.scheduler.tick_length
+        phase = simulation.day_phase(self.world["time"], self.day_length)
+        for session in self.sessions.values():
+            session.player["time"] = phase
+        self.plugin_manager.emit(AlbinaEvent.TICK, {"tick": self.scheduler.ticks, "time": self.world["time"]})
+        self.plugin_manager.flush()
+
+    def fast_forward(self, ticks: int) -> int:
+        if not self.game_loaded or ticks <= 0:
+            return 0
+
+        for session in list(self.sessions.values()):
+            with self.bound(session):
+                result = simulation.fast_forward(self.player, ticks)
+                self.report_damage(result.starving, result.exhausted)
+                if result.died:
+                    self.game_over("You died from your wounds")
+
+        self.world["time"] = simulation.repeat_add(self.world["time"], self.scheduler.tick_length, ticks)
+        phase = simulation.day_phase(self.world["time"], self.day_length)
+        for session in self.sessions.values():
+            session.player["time"] = phase
+        return ticks
+
+    def status_command(self, _args):
+        p = self.player
+        self.print_to_console(f"X: {p['x']} Y: {p['y']} HP: {p['hp']} Hunger: {p['hunger']:g} "
+                              f"Sleep: {p['sleep']:g} Day: {p['day']} EXP: {p['exp']} Time: {p['time']}")
+
+    def who_command(self, _args):
+        self.print_to_console(f"{len(self.sessions)} online: {', '.join(sorted(self.sessions))}")
+
+
+class LineServer(ABC):
+    """The connection side of the protocol: names, one command at a time, framing and output limits.
+
+    Subclasses decide where players live: join() returns a session (any
+    object with name and writer attributes) or the reason it was refused,
+    execute() returns a command's output lines, leave() lets the player go.
+    """
+
+    def __init__(self, console: AlbinaEngine, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 output_limit: int = OUTPUT_LIMIT):
+        self.console = console
+        self.host = host
+        self.port = port
+        self.output_limit = output_limit
+        self.server: asyncio.Server | None = None
+        self.stats = {"connections": 0, "commands": 0, "dropped": 0}
+
+    def log(self, text: str):
+        self.console.print_to_console(text)
+
+    def greeting(self) -> str:
+        return self.console.version
+
+    @abstractmethod
+    async def join(self, name: str, world: str | None):
+        pass
+
+    @abstractmethod
+    async def execute(self, session, command: str) -> list[str]:
+        pass
+
+    @abstractmethod
+    async def leave(self, session):
+        pass
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve_client, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.log(f"Listening on {self.host}:{self.port}")
+        sys.stdout.flush()
+
+    def stopped(self):
+        self.server.close()
+        self.log(f"{self.stats['connections']} connections, {self.stats['commands']} commands, "
+                 f"{self.stats['dropped']} dropped for not reading")
+
+    def push(self, session, lines: list[str]):
+        if lines and session.writer is not None:
+            self.send(session, frame(lines, pushed=True))
+
+    def send(self, session, text: str):
+        writer = session.writer
+        if writer.is_closing():
+            return
+        writer.write(text.encode())
+        if writer.transport.get_write_buffer_size() > self.output_limit:
+            self.stats["dropped"] += 1
+            self.log(f"{session.name} is not reading its output, disconnecting")
+            writer.close()
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        session = None
+        try:
+            writer.write(f"{self.greeting()}\nname?\n".encode())
+            await writer.drain()
+
+            while session is None:
+                line = await reader.readline()
+                if not line:
+                    return
+                words = line.decode(errors="replace").strip().split()
+                if words[:1] and words[0].lower() == "hello":
+                    words = words[1:]
+
+                if not words or len(words) > 2 or not NAME.fullmatch(words[0].lower()):
+                    writer.write(b"Names are 1-32 letters, digits, _ or -\n.\n")
+                else:
+                    session, refusal = await self.join(words[0].lower(), words[1] if len(words) > 1 else None)
+                    if session is None:
+                        writer.write(f"{refusal}\n.\n".encode())
+                    else:
+                        session.writer = writer
+                        writer.write(f"Welcome, {session.name}\n.\n".encode())
+                await writer.drain()
+
+            while not writer.is_closing():
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                if not command:
+                    continue
+                if command.lower() in ("quit", "exit"):
+                    writer.write(b"Bye\n.\n")
+                    break
+
+                self.stats["commands"] += 1
+                self.send(session, frame(await self.execute(session, command)) + ".\n")
+                await writer.drain()
+                # Let other connections in even when this one has a backlog of commands buffered.
+                await asyncio.sleep(0)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if session is not None:
+                await self.leave(session)
+            writer.close()
+
+
+class AlbinaServer(LineServer):
+    """Serves one SharedWorld, run in this process."""
+
+    def __init__(self, world: SharedWorld, *args, **kwargs):
+        super().__init__(world, *args, **kwargs)
+        self.world = world
+
+    def greeting(self) -> str:
+        return f"{self.world.version} on {self.world.current_world}"
+
+    async def join(self, name: str, world: str | None):
+        if world not in (None, self.world.current_world):
+            return None, f"This server only hosts {self.world.current_world}"
+        if name in self.world.sessions:
+            return None, f"{name} is already playing"
+        return self.world.join(name), None
+
+    async def execute(self, session: Session, command: str) -> list[str]:
+        return self.world.run_command(session, command)
+
+    async def leave(self, session: Session):
+        self.world.leave(session)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.run_world()
+        finally:
+            self.stopped()
+            for session in list(self.world.sessions.values()):
+                self.world.leave(session)
+            self.world.exit_command(None)
+
+    async def run_world(self):
+        """Run the ticks as they come due, and push what they printed to the players."""
+        while self.world.running and self.world.game_loaded:
+            await asyncio.sleep(self.world.scheduler.next_due())
+            self.world.update()
+            for session in list(self.world.sessions.values()):
+                self.push(session, session.ui.drain())
+
+
+def open_world(name: str | None, ui) -> SharedWorld:
+    """A SharedWorld with the server config and plugins read and world `name` (default the first) loaded.
+
+    Check game_loaded: if the world could not be loaded, ui says why.
+    """
+    world = SharedWorld(ui)
+    world.print_to_console(world.version)
+    world.check_server()
+    world.load_plugins()
+    world.apply_plugin_effects()
+
+    name = name or (world.worlds() or [None])[0]
+    if name is None:
+        world.print_to_console("No world to host; create one with 'new <name>' first")
+    else:
+        world.load_specific_world(name)
+    return world
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("world", nargs="?")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+
+    world = open_world(args.world, HeadlessUI(echo=True, max_lines=0))
+    if not world.game_loaded:
+        sys.exit(1)
+
+    host, port, output_limit = server_settings(world.config)
+    server = AlbinaServer(world, args.host or host, port if args.port is None else args.port, output_limit)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import math
+from dataclasses import dataclass
+
+HUNGER_PER_TICK = 0.125
+SLEEP_PER_TICK = 0.1
+STARVING_DAMAGE = 5
+EXHAUSTED_DAMAGE = 2
+NEED_CAP = 100
+
+
+def day_phase(world_time: float, day_length: float) -> str:
+    day_progress = world_time % day_length
+    if day_progress < day_length * 0.4:
+        return "morning"
+    elif day_progress < day_length * 0.7:
+        return "day"
+    elif day_progress < day_length * 0.9:
+        return "evening"
+    else:
+        return "night"
+
+
+def step(player: dict) -> tuple[bool, bool]:
+    """One tick of hunger, sleep and the HP they cost; returns (starving, exhausted)."""
+    player["hunger"] = min(NEED_CAP, player["hunger"] + HUNGER_PER_TICK)
+    player["sleep"] = min(NEED_CAP, round(player["sleep"] + SLEEP_PER_TICK, 2))
+
+    starving = player["hunger"] >= NEED_CAP
+    exhausted = player["sleep"] >= NEED_CAP
+
+    if starving:
+        player["hp"] -= STARVING_DAMAGE
+    if exhausted:
+        player["hp"] -= EXHAUSTED_DAMAGE
+
+    return starving, exhausted
+
+
+@dataclass
+class FastForward:
+    ticks: int
+    starving: int
+    exhausted: int
+    died: bool
+
+
+def fast_forward(player: dict, ticks: int) -> FastForward:
+    """The state `ticks` calls of step() leave behind, computed in closed form.
+
+    Stops after the tick on which HP first drops to 0 or below, as the game
+    does. Values are bit-for-bit those of the step-by-step loop: hunger
+    grows by an exact binary fraction, and sleep is rounded to cents every
+    tick, so after the first tick it is always the double nearest to a
+    whole number of cents.
+    """
+    hunger, starving_from = _hunger_series(player["hunger"], ticks)
+    sleep, exhausted_from = _sleep_series(player["sleep"], ticks)
+
+    hp = player["hp"]
+
+    def damage(tick: int) -> int:
+        total = 0
+        if starving_from is not None and tick >= starving_from:
+            total += (tick - starving_from + 1) * STARVING_DAMAGE
+        if exhausted_from is not None and tick >= exhausted_from:
+            total += (tick - exhausted_from + 1) * EXHAUSTED_DAMAGE
+        return total
+
+    last = ticks
+    died = ticks > 0 and hp - damage(ticks) <= 0
+    if died:
+        low, high = 1, ticks
+        while low < high:
+            middle = (low + high) // 2
+            if hp - damage(middle) <= 0:
+                high = middle
+            else:
+                low = middle + 1
+        last = low
+
+    if last > 0:
+        player["hunger"] = hunger(last)
+        player["sleep"] = sleep(last)
+        player["hp"] = hp - damage(last)
+
+    return FastForward(
+        ticks=last,
+        starving=max(0, last - starving_from + 1) if starving_from is not None else 0,
+        exhausted=max(0, last - exhausted_from + 1) if exhausted_from is not None else 0,
+        died=died
+    )
+
+
+def _hunger_series(hunger: float, ticks: int):
+    """hunger after tick i as a function of i, and the first tick it is at the cap (None if not within ticks)."""
+    if hunger >= NEED_CAP:
+        return (lambda _: NEED_CAP), (1 if ticks else None)
+
+    if hunger * 8 == int(hunger * 8) and abs(hunger) < 2 ** 40:
+        # Multiples of 1/8 add exactly, so tick i is just hunger + i/8.
+        first_cap = max(1, math.ceil((NEED_CAP - hunger) / HUNGER_PER_TICK))
+        series = (lambda i: hunger + HUNGER_PER_TICK * i if i < first_cap else NEED_CAP)
+        return series, (first_cap if first_cap <= ticks else None)
+
+    # Anything else rounds on every addition; replay it up to the cap, which is at most 800 ticks away.
+    values = [hunger]
+    while len(values) <= ticks and values[-1] != NEED_CAP:
+        values.append(min(NEED_CAP, values[-1] + HUNGER_PER_TICK))
+
+    first_cap = len(values) - 1 if values[-1] == NEED_CAP and len(values) > 1 else None
+    return (lambda i: values[i] if i < len(values) else NEED_CAP), first_cap
+
+
+def _sleep_series(sleep: float, ticks: int):
+    """sleep after tick i as a function of i, and the first tick it is at the cap (None if not within ticks)."""
+    first = min(NEED_CAP, round(sleep + SLEEP_PER_TICK, 2))
+    if first >= NEED_CAP:
+        return (lambda _: NEED_CAP), (1 if ticks else None)
+
+    cents = round(first * 100)
+    first_cap = 1 + math.ceil((NEED_CAP * 100 - cents) / 10)
+
+    def series(i: int) -> float:
+        if i >= first_cap:
+            return NEED_CAP
+        if i == 1:
+            return first
+        return (cents + 10 * (i - 1)) / 100
+
+    return series, (first_cap if first_cap <= ticks else None)
+
+
+def repeat_add(value: float, step: float, count: int) -> float:
+    """value with step added count times one after another, in far fewer float operations.
+
+    When step is a power of two no smaller than the spacing of doubles near
+    value, every addition is exact except the one that crosses into the next
+    power of two, where the result can round. So whole runs inside one
+    binade are added at once and only the crossings are done singly.
+    """
+    mantissa, _ = math.frexp(step)
+    if mantissa != 0.5 or not math.isfinite(value):
+        for _ in range(count):
+            value += step
+        return value
+
+    while count > 0:
+        if math.ulp(value) > 2 * step:
+            # Too small to move a double this large at all.
+            return value
+        if value < step or math.ulp(value) > step:
+            value += step
+            count -= 1
+            continue
+
+        boundary = 2.0 ** math.frexp(value)[1]
+        inside = min(count, math.ceil((boundary - value) / step) - 1)
+        value += inside * step
+        count -= inside
+
+        if count > 0:
+            value += step
+            count -= 1
+
+    return value
@@ -0,0 +1,88 @@
+from typing import Iterator
+
+
+class SpatialIndex:
+    """Cell-keyed index over a list of world entries (items or mobs).
+
+    The backing list stays the object that gets saved; the index keeps it in
+    sync, so removals are O(1) swap-pops instead of list.remove scans.
+    """
+
+    def __init__(self, entries: list[dict] | None = None):
+        self._entries: list[dict] = []
+        self._cells: dict[tuple[int, int], list[dict]] = {}
+        self._slots: dict[int, int] = {}
+
+        self.rebuild(entries if entries is not None else [])
+
+    def rebuild(self, entries: list[dict]):
+        self._entries = entries
+        self._cells = {}
+        self._slots = {}
+
+        for slot, entry in enumerate(entries):
+            self._slots[id(entry)] = slot
+            self._cells.setdefault((entry["x"], entry["y"]), []).append(entry)
+
+    def at(self, x: int, y: int) -> list[dict]:
+        return list(self._cells.get((x, y), ()))
+
+    def first_at(self, x: int, y: int) -> dict | None:
+        cell = self._cells.get((x, y))
+        return cell[0] if cell else None
+
+    def in_range(self, x0: int, y0: int, x1: int, y1: int) -> list[dict]:
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+
+        found = []
+        area = (x1 - x0 + 1) * (y1 - y0 + 1)
+
+        if area <= len(self._cells):
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cell = self._cells.get((x, y))
+                    if cell:
+                        found.extend(cell)
+        else:
+            for (x, y), cell in self._cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    found.extend(cell)
+
+        return found
+
+    def near(self, x: int, y: int, radius: int) -> list[dict]:
+        return self.in_range(x - radius, y - radius, x + radius, y + radius)
+
+    def add(self, entry: dict):
+        self._slots[id(entry)] = len(self._entries)
+        self._entries.append(entry)
+        self._cells.setdefault((entry["x"], entry["y"]), []).append(entry)
+
+    def remove(self, entry: dict):
+        slot = self._slots.pop(id(entry))
+
+        last = self._entries.pop()
+        if last is not entry:
+            self._entries[slot] = last
+            self._slots[id(last)] = slot
+
+        key = (entry["x"], entry["y"])
+        cell = self._cells[key]
+        for i, candidate in enumerate(cell):
+            if candidate is entry:
+                del cell[i]
+                break
+        if not cell:
+            del self._cells[key]
+
+    def __contains__(self, entry: dict) -> bool:
+        return id(entry) in self._slots
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._entries)
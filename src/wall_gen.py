@@ -0,0 +1,157 @@
+import hashlib
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from maze import MazeChunks
+from wall_map import BITSET_BYTES, CHUNK_SIZE
+
+WALL_CHANCE = 0.3
+
+SPLITMIX64 = "splitmix64"
+LEGACY_SHA256 = "sha256"
+MAZE = "maze"
+
+MASK64 = (1 << 64) - 1
+MASK32 = (1 << 32) - 1
+WALL_THRESHOLD = int(WALL_CHANCE * (1 << 64))
+
+_GAMMA = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+def splitmix64(z: int) -> int:
+    z = (z + _GAMMA) & MASK64
+    z = ((z ^ (z >> 30)) * _MIX1) & MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & MASK64
+    return z ^ (z >> 31)
+
+
+def seed_key(seed: str) -> int:
+    return int.from_bytes(hashlib.sha256(seed.encode()).digest()[:8], "little")
+
+
+def cell_hash(key: int, x: int, y: int) -> int:
+    return splitmix64(key ^ splitmix64(((x & MASK32) << 32) | (y & MASK32)))
+
+
+class WallGenerator:
+    """Deterministic per-cell wall source that never touches the global random state.
+
+    splitmix64 mixes the world seed with the cell coordinates, so a cell costs
+    a few integer multiplies and whole chunks can be produced at once. The
+    sha256 algorithm reproduces the original per-cell reseeding bit for bit
+    on a private Random instance, for worlds that must not change. The maze
+    algorithm carves connected corridors a chunk at a time, seeded by the
+    chunk coordinates, and keeps the chunks it generated in an LRU.
+    """
+
+    def __init__(self, seed: str, algorithm: str = SPLITMIX64):
+        if algorithm not in (SPLITMIX64, LEGACY_SHA256, MAZE):
+            raise ValueError(f"Unknown wall generator '{algorithm}'")
+
+        self.seed = seed
+        self.algorithm = algorithm
+        self._key = seed_key(seed)
+        self._legacy_random = random.Random()
+        self.maze = MazeChunks(lambda cx, cy: cell_hash(self._key, cx, cy)) if algorithm == MAZE else None
+
+    def is_wall(self, x: int, y: int) -> bool:
+        if self.maze is not None:
+            return self.maze.is_wall(x, y)
+
+        if self.algorithm == LEGACY_SHA256:
+            self._legacy_random.seed(hashlib.sha256((self.seed + f"{x},{y}").encode()).hexdigest())
+            return self._legacy_random.random() < WALL_CHANCE
+
+        return cell_hash(self._key, x, y) < WALL_THRESHOLD
+
+    def walls(self, cells: list[tuple[int, int]]) -> list[bool]:
+        """is_wall for many cells in one call, vectorized with NumPy for splitmix64."""
+        if np is None or self.algorithm != SPLITMIX64 or len(cells) < 8:
+            return [self.is_wall(x, y) for x, y in cells]
+
+        coords = np.array(cells, dtype=np.int64).astype(np.uint64) & np.uint64(MASK32)
+        packed = (coords[:, 0] << np.uint64(32)) | coords[:, 1]
+
+        with np.errstate(over="ignore"):
+            hashed = splitmix64_array(np.uint64(self._key) ^ splitmix64_array(packed))
+
+        return (hashed < np.uint64(WALL_THRESHOLD)).tolist()
+
+    def line(self, x: int, y: int, dx: int, dy: int, count: int) -> list[bool]:
+        """walls() for count cells from (x, y) on in steps of (dx, dy); maze chunks are sliced rather than looked up per cell."""
+        if self.maze is not None:
+            return [wall == 1 for wall in self.maze.line(x, y, dx, dy, count)]
+        return self.walls([(x + dx * i, y + dy * i) for i in range(count)])
+
+    def chunk(self, cx: int, cy: int):
+        """Walls of chunk (cx, cy) as a CHUNK_SIZE x CHUNK_SIZE boolean array indexed [y, x]."""
+        if np is None:
+            raise RuntimeError("NumPy is required for array chunks, use chunk_bits instead")
+
+        if self.maze is not None:
+            return np.frombuffer(self.maze.get(cx, cy), dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE).astype(bool)
+
+        if self.algorithm == LEGACY_SHA256:
+            return np.array(self._chunk_rows(cx, cy), dtype=bool)
+
+        local = np.arange(CHUNK_SIZE, dtype=np.int64)
+        xs = (cx * CHUNK_SIZE + local).astype(np.uint64) & np.uint64(MASK32)
+        ys = (cy * CHUNK_SIZE + local).astype(np.uint64) & np.uint64(MASK32)
+        packed = (xs[np.newaxis, :] << np.uint64(32)) | ys[:, np.newaxis]
+
+        with np.errstate(over="ignore"):
+            hashed = splitmix64_array(np.uint64(self._key) ^ splitmix64_array(packed))
+
+        return hashed < np.uint64(WALL_THRESHOLD)
+
+    def chunk_bits(self, cx: int, cy: int) -> bytes:
+        """Walls of chunk (cx, cy) packed in the WallMap bitset layout."""
+        if np is not None:
+            return np.packbits(self.chunk(cx, cy).ravel(), bitorder="little").tobytes()
+
+        bits = bytearray(BITSET_BYTES)
+        for ly, row in enumerate(self._chunk_rows(cx, cy)):
+            for lx, wall in enumerate(row):
+                if wall:
+                    bit = ly * CHUNK_SIZE + lx
+                    bits[bit >> 3] |= 1 << (bit & 7)
+        return bytes(bits)
+
+    def _chunk_rows(self, cx: int, cy: int) -> list[list[bool]]:
+        if self.maze is not None:
+            chunk = self.maze.get(cx, cy)
+            return [[bool(wall) for wall in chunk[ly * CHUNK_SIZE:(ly + 1) * CHUNK_SIZE]] for ly in range(CHUNK_SIZE)]
+
+        x0, y0 = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+        return [[self.is_wall(x0 + lx, y0 + ly) for lx in range(CHUNK_SIZE)]
+                for ly in range(CHUNK_SIZE)]
+
+
+def splitmix64_array(z):
+    z = z + np.uint64(_GAMMA)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+    return z ^ (z >> np.uint64(31))
+
+
+def for_world(world: dict, migrate: bool = True) -> WallGenerator:
+    """Pick the generator for a loaded world.
+
+    Worlds saved before the generator was recorded used sha256 reseeding.
+    With migrate their undiscovered cells switch to splitmix64 while the
+    cells already in world["discovered"] stay authoritative; without it
+    they keep the legacy algorithm.
+    """
+    algorithm = world.get("wall_generator")
+
+    if algorithm is None:
+        algorithm = SPLITMIX64 if migrate else LEGACY_SHA256
+        world["wall_generator"] = algorithm
+
+    return WallGenerator(world["seed"], algorithm)
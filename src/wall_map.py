@@ -0,0 +1,200 @@
+import base64
+from typing import Iterator, Protocol
+
+CHUNK_SIZE = 64
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+BITSET_BYTES = CHUNK_CELLS // 8
+
+
+def chunk_of(x: int, y: int) -> tuple[int, int]:
+    return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+
+def cell_bit(x: int, y: int) -> int:
+    return (y % CHUNK_SIZE) * CHUNK_SIZE + (x % CHUNK_SIZE)
+
+
+def chunk_run(x: int, y: int, dx: int, dy: int) -> int:
+    """How many cells from (x, y) on, in steps of (dx, dy), stay in the chunk of (x, y)."""
+    along, step = (x, dx) if dx else (y, dy)
+    return CHUNK_SIZE - along % CHUNK_SIZE if step > 0 else along % CHUNK_SIZE + 1
+
+
+class ChunkSource(Protocol):
+    """Read-only chunk storage a WallMap can fall back to, e.g. a memory-mapped world file."""
+
+    def get(self, key: tuple[int, int]) -> bytes | memoryview | None: ...
+
+    def keys(self) -> Iterator[tuple[int, int]]: ...
+
+
+class WallMap:
+    """Discovered cells stored as 64x64 chunks of two bitsets: known and wall.
+
+    Each chunk is one bytearray: the first half is the "known" bitset, the
+    second half the "wall" bitset. That is a quarter of a byte per cell
+    against 200+ bytes for a {"x,y": {"wall": bool}} dict entry.
+
+    With a source, chunks are read from it until first written, at which
+    point the chunk is copied into memory (copy-on-write).
+    """
+
+    def __init__(self, source: ChunkSource | None = None, known: int = 0):
+        self._chunks: dict[tuple[int, int], bytearray] = {}
+        self._source = source
+        self._known = known
+
+    def _chunk(self, key: tuple[int, int]) -> bytes | bytearray | memoryview | None:
+        chunk = self._chunks.get(key)
+        if chunk is None and self._source is not None:
+            chunk = self._source.get(key)
+        return chunk
+
+    def get(self, x: int, y: int) -> bool | None:
+        chunk = self._chunk(chunk_of(x, y))
+        if chunk is None:
+            return None
+
+        bit = cell_bit(x, y)
+        byte, mask = bit >> 3, 1 << (bit & 7)
+        if not chunk[byte] & mask:
+            return None
+
+        return bool(chunk[BITSET_BYTES + byte] & mask)
+
+    def line(self, x: int, y: int, dx: int, dy: int, count: int) -> list[bool | None]:
+        """get() for count cells from (x, y) on in steps of (dx, dy), looking each chunk up once."""
+        found = []
+
+        while len(found) < count:
+            span = min(count - len(found), chunk_run(x, y, dx, dy))
+            chunk = self._chunk(chunk_of(x, y))
+            bit = cell_bit(x, y)
+
+            if chunk is None:
+                found.extend([None] * span)
+            elif dy:
+                # A column: the same bit of every row, one row (CHUNK_SIZE // 8 bytes) apart.
+                first, last = bit >> 3, (bit + dy * (span - 1) * CHUNK_SIZE) >> 3
+                row = dy * (CHUNK_SIZE // 8)
+                stop = last + row if last + row >= 0 else None
+                mask = 1 << (bit & 7)
+                found.extend(bool(wall & mask) if known & mask else None
+                             for known, wall in zip(chunk[first:stop:row],
+                                                    chunk[BITSET_BYTES + first:BITSET_BYTES + last + row:row]))
+            else:
+                # A row: the span's bits are adjacent, so read them as one integer.
+                low = min(bit, bit + dx * (span - 1))
+                first, last = low >> 3, (low + span - 1) >> 3
+                shift = low & 7
+                known = int.from_bytes(chunk[first:last + 1], "little") >> shift
+                walls = int.from_bytes(chunk[BITSET_BYTES + first:BITSET_BYTES + last + 1], "little") >> shift
+                offsets = range(span) if dx > 0 else range(span - 1, -1, -1)
+                found.extend(bool(walls >> i & 1) if known >> i & 1 else None for i in offsets)
+            x, y = x + dx * span, y + dy * span
+
+        return found
+
+    def set(self, x: int, y: int, wall: bool):
+        key = chunk_of(x, y)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            base = self._source.get(key) if self._source is not None else None
+            chunk = bytearray(base) if base is not None else bytearray(BITSET_BYTES * 2)
+            self._chunks[key] = chunk
+
+        bit = cell_bit(x, y)
+        byte, mask = bit >> 3, 1 << (bit & 7)
+
+        if not chunk[byte] & mask:
+            chunk[byte] |= mask
+            self._known += 1
+
+        if wall:
+            chunk[BITSET_BYTES + byte] |= mask
+        else:
+            chunk[BITSET_BYTES + byte] &= ~mask
+
+    def chunk(self, key: tuple[int, int]) -> bytes | bytearray | memoryview | None:
+        """Raw known and wall bitsets of a chunk, None if nothing in it is known."""
+        return self._chunk(key)
+
+    def copy(self) -> "WallMap":
+        clone = WallMap(self._source, self._known)
+        clone._chunks = {key: bytearray(chunk) for key, chunk in self._chunks.items()}
+        return clone
+
+    def __contains__(self, pos: tuple[int, int]) -> bool:
+        return self.get(*pos) is not None
+
+    def __len__(self) -> int:
+        return self._known
+
+    def chunk_count(self) -> int:
+        return sum(1 for _ in self.chunks())
+
+    def chunks(self) -> Iterator[tuple[tuple[int, int], bytes | bytearray | memoryview]]:
+        if self._source is not None:
+            for key in self._source.keys():
+                if key not in self._chunks:
+                    yield key, self._source.get(key)
+
+        yield from self._chunks.items()
+
+    def cells(self) -> Iterator[tuple[int, int, bool]]:
+        for (cx, cy), chunk in self.chunks():
+            for byte in range(BITSET_BYTES):
+                known = chunk[byte]
+                if not known:
+                    continue
+
+                walls = chunk[BITSET_BYTES + byte]
+                for shift in range(8):
+                    if known & (1 << shift):
+                        bit = (byte << 3) | shift
+                        yield (cx * CHUNK_SIZE + bit % CHUNK_SIZE,
+                               cy * CHUNK_SIZE + bit // CHUNK_SIZE,
+                               bool(walls & (1 << shift)))
+
+    def to_json(self) -> dict:
+        return {
+            "chunk_size": CHUNK_SIZE,
+            "chunks": {f"{cx},{cy}": base64.b64encode(chunk).decode("ascii")
+                       for (cx, cy), chunk in self.chunks()}
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "WallMap":
+        wall_map = cls()
+
+        if "chunks" not in data:
+            # Legacy layout: {"x,y": {"wall": bool}}
+            for pos_key, cell in data.items():
+                x, y = pos_key.split(",")
+                wall_map.set(int(x), int(y), cell["wall"])
+            return wall_map
+
+        if data.get("chunk_size", CHUNK_SIZE) != CHUNK_SIZE:
+            raise ValueError(f"Unsupported chunk size {data['chunk_size']}")
+
+        for chunk_key, encoded in data["chunks"].items():
+            cx, cy = chunk_key.split(",")
+            wall_map.load_chunk(int(cx), int(cy), base64.b64decode(encoded))
+
+        return wall_map
+
+    def load_chunk(self, cx: int, cy: int, raw: bytes):
+        if len(raw) != BITSET_BYTES * 2:
+            raise ValueError(f"Chunk {cx},{cy} has {len(raw)} bytes, expected {BITSET_BYTES * 2}")
+
+        old = self._chunk((cx, cy))
+        if old is not None:
+            self._known -= popcount(old[:BITSET_BYTES])
+
+        chunk = bytearray(raw)
+        self._chunks[(cx, cy)] = chunk
+        self._known += popcount(chunk[:BITSET_BYTES])
+
+
+def popcount(bits: bytes | bytearray) -> int:
+    return int.from_bytes(bits, "little").bit_count()
@@ -0,0 +1,318 @@
+"""Reading and writing server.alb.
+
+v1 is the original JSON document. v2 is binary, little-endian:
+
+    header       HEADER (fixed size, see below)
+    region index region_count x REGION_ENTRY (rx, ry, item start/count, mob start/count), sorted
+    meta         JSON object: every world key except items, mobs and discovered,
+                 plus "strings", the table type/subtype indices refer to, and
+                 "regions": {"offset", "count"} locating the region index;
+                 procedural worlds keep their changes as "region_diffs"
+                 ({"rx,ry": diff}, see regions.ProceduralRegions) instead of
+                 stored regions
+    items        item_count x ITEM  (type, subtype, x, y), grouped by region
+    mobs         mob_count x MOB    (type, x, y, hp), grouped by region
+    chunk index  chunk_count x CHUNK_ENTRY (cx, cy), sorted
+    chunk data   chunk_count x 1024 bytes (known bitset, wall bitset), page aligned
+
+The file is memory-mapped. Chunks and regions are looked up by binary
+search over their indexes, so opening a world reads neither the wall map
+nor the item and mob tables; regions are decoded when they are paged in.
+Files written before the region index existed are decoded whole on load.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+from typing import Iterator
+
+from regions import MemoryRegions
+from wall_map import BITSET_BYTES, WallMap
+
+MAGIC = b"ALB2"
+VERSION = 2
+PAGE_SIZE = 4096
+CHUNK_BYTES = BITSET_BYTES * 2
+
+# magic, version, flags, meta offset/length, items offset/count, mobs offset/count,
+# chunk index offset, chunk data offset, chunk count, known cells
+HEADER = struct.Struct("<4sHHQQQIQIQQIQ")
+ITEM = struct.Struct("<HHii")
+MOB = struct.Struct("<Hiii")
+CHUNK_ENTRY = struct.Struct("<ii")
+REGION_ENTRY = struct.Struct("<iiIIII")
+
+
+def detect_version(path: str) -> int:
+    with open(path, "rb") as f:
+        return VERSION if f.read(len(MAGIC)) == MAGIC else 1
+
+
+def read_world(path: str) -> dict:
+    if detect_version(path) == VERSION:
+        return read_v2(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        world = json.load(f)
+
+    world["discovered"] = WallMap.from_json(world.get("discovered", {}))
+    world["regions"] = MemoryRegions(world.pop("items", []), world.pop("mobs", []))
+    world["format"] = 1
+    decode_region_diffs(world)
+    return world
+
+
+def world_meta(world: dict) -> dict:
+    """The world keys stored as JSON, with the region diffs of a procedural world keyed "rx,ry"."""
+    meta = {key: value for key, value in world.items()
+            if key not in ("regions", "items", "mobs", "discovered", "region_diffs")}
+
+    snapshot_diffs = getattr(world.get("regions"), "region_diffs", None)
+    diffs = snapshot_diffs() if snapshot_diffs is not None else world.get("region_diffs", {}).items()
+    encoded = {f"{rx},{ry}": diff for (rx, ry), diff in diffs}
+    if encoded or "region_diffs" in world:
+        meta["region_diffs"] = encoded
+    return meta
+
+
+def decode_region_diffs(world: dict):
+    if "region_diffs" in world:
+        world["region_diffs"] = {tuple(map(int, key.split(","))): diff for key, diff in world["region_diffs"].items()}
+
+
+def iter_regions(world: dict) -> Iterator[tuple[tuple[int, int], list[dict], list[dict]]]:
+    """(key, items, mobs) for every region of a world dict.
+
+    world["regions"] may be a region source, an iterable of such triples
+    (a RegionSnapshot), or absent, in which case the "items" and "mobs"
+    lists are grouped by region.
+    """
+    regions = world.get("regions")
+    if regions is None:
+        regions = MemoryRegions(world.get("items", []), world.get("mobs", []))
+
+    if hasattr(regions, "load"):
+        for key in sorted(regions.keys()):
+            yield key, *regions.load(key)
+    else:
+        yield from regions
+
+
+def write_world(path: str, world: dict) -> int:
+    """Write the world in the format recorded in world["format"] (v1 if absent), atomically."""
+    if world.get("format", 1) == VERSION:
+        data = encode_v2(world)
+    else:
+        items, mobs = [], []
+        for _, region_items, region_mobs in iter_regions(world):
+            items.extend(region_items)
+            mobs.extend(region_mobs)
+
+        discovered = world.get("discovered") or WallMap()
+        meta = world_meta(world)
+        data = json.dumps({**meta, "items": items, "mobs": mobs, "discovered": discovered.to_json()}).encode("utf-8")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return len(data)
+
+
+def encode_v2(world: dict) -> bytes:
+    strings: list[str] = []
+    string_ids: dict[str, int] = {}
+
+    def string_id(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    items, mobs, regions = [], [], []
+    item_count = mob_count = 0
+    for (rx, ry), region_items, region_mobs in iter_regions(world):
+        regions.append(REGION_ENTRY.pack(rx, ry, item_count, len(region_items), mob_count, len(region_mobs)))
+        item_count += len(region_items)
+        mob_count += len(region_mobs)
+        items.extend(ITEM.pack(string_id(item["type"]), string_id(item["subtype"]), item["x"], item["y"])
+                     for item in region_items)
+        mobs.extend(MOB.pack(string_id(mob["type"]), mob["x"], mob["y"], mob["hp"])
+                    for mob in region_mobs)
+
+    items, mobs, region_index = b"".join(items), b"".join(mobs), b"".join(regions)
+
+    discovered: WallMap = world.get("discovered") or WallMap()
+    chunks = sorted(discovered.chunks(), key=lambda entry: entry[0])
+    index = b"".join(CHUNK_ENTRY.pack(cx, cy) for (cx, cy), _ in chunks)
+
+    meta = world_meta(world)
+    meta["format"] = VERSION
+    meta["strings"] = strings
+    meta["regions"] = {"offset": HEADER.size, "count": len(regions)}
+    meta_data = json.dumps(meta).encode("utf-8")
+
+    meta_offset = HEADER.size + len(region_index)
+    items_offset = meta_offset + len(meta_data)
+    mobs_offset = items_offset + len(items)
+    index_offset = mobs_offset + len(mobs)
+    data_offset = -(-(index_offset + len(index)) // PAGE_SIZE) * PAGE_SIZE
+
+    header = HEADER.pack(MAGIC, VERSION, 0, meta_offset, len(meta_data),
+                         items_offset, len(items) // ITEM.size, mobs_offset, len(mobs) // MOB.size,
+                         index_offset, data_offset, len(chunks), len(discovered))
+
+    padding = b"\0" * (data_offset - index_offset - len(index))
+    return b"".join([header, region_index, meta_data, items, mobs, index, padding,
+                     *(bytes(chunk) for _, chunk in chunks)])
+
+
+class MappedChunks:
+    """Chunk source over the chunk region of a v2 file."""
+
+    def __init__(self, buffer, index_offset: int, data_offset: int, count: int):
+        self._buffer = memoryview(buffer)
+        self._data_offset = data_offset
+        self._count = count
+        self._keys = _SortedKeys(self._buffer, index_offset, count, CHUNK_ENTRY)
+
+    def get(self, key: tuple[int, int]) -> memoryview | None:
+        slot = bisect.bisect_left(self._keys, key)
+        if slot == self._count or self._keys[slot] != key:
+            return None
+
+        start = self._data_offset + slot * CHUNK_BYTES
+        return self._buffer[start:start + CHUNK_BYTES]
+
+    def keys(self) -> Iterator[tuple[int, int]]:
+        for slot in range(self._count):
+            yield self._keys[slot]
+
+
+class MappedRegions:
+    """Region source over the item and mob tables of a v2 file."""
+
+    def __init__(self, buffer, strings: list[str], index_offset: int, count: int,
+                 items_offset: int, mobs_offset: int):
+        self._buffer = memoryview(buffer)
+        self._strings = strings
+        self._index_offset = index_offset
+        self._count = count
+        self._items_offset = items_offset
+        self._mobs_offset = mobs_offset
+        self._keys = _SortedKeys(self._buffer, index_offset, count, REGION_ENTRY)
+
+    def load(self, key: tuple[int, int]) -> tuple[list[dict], list[dict]]:
+        slot = bisect.bisect_left(self._keys, key)
+        if slot == self._count or self._keys[slot] != key:
+            return [], []
+
+        _, _, item_start, item_count, mob_start, mob_count = REGION_ENTRY.unpack_from(
+            self._buffer, self._index_offset + slot * REGION_ENTRY.size)
+        strings = self._strings
+
+        start = self._items_offset + item_start * ITEM.size
+        items = [{"type": strings[t], "subtype": strings[s], "x": x, "y": y}
+                 for t, s, x, y in ITEM.iter_unpack(self._buffer[start:start + item_count * ITEM.size])]
+
+        start = self._mobs_offset + mob_start * MOB.size
+        mobs = [{"type": strings[t], "x": x, "y": y, "hp": hp}
+                for t, x, y, hp in MOB.iter_unpack(self._buffer[start:start + mob_count * MOB.size])]
+
+        return items, mobs
+
+    def keys(self) -> Iterator[tuple[int, int]]:
+        for slot in range(self._count):
+            yield self._keys[slot]
+
+
+class _SortedKeys:
+    """Sequence view over a sorted on-disk index so bisect can search it in place."""
+
+    def __init__(self, buffer: memoryview, offset: int, count: int, entry: struct.Struct):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._entry = entry
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, slot: int) -> tuple[int, int]:
+        return self._entry.unpack_from(self._buffer, self._offset + slot * self._entry.size)[:2]
+
+
+def open_buffer(path: str):
+    with open(path, "rb") as f:
+        if os.name == "nt":
+            # Windows cannot replace a file while it is mapped, and autosave
+            # replaces server.alb under a running game.
+            return f.read()
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_v2(path: str) -> dict:
+    buffer = open_buffer(path)
+    (magic, version, _flags, meta_offset, meta_length, items_offset, item_count,
+     mobs_offset, mob_count, index_offset, data_offset, chunk_count, known) = HEADER.unpack_from(buffer, 0)
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not an Albina v2 world")
+
+    world = json.loads(bytes(buffer[meta_offset:meta_offset + meta_length]))
+    decode_region_diffs(world)
+    strings = world.pop("strings")
+    region_index = world.pop("regions", None)
+
+    if region_index is not None:
+        world["regions"] = MappedRegions(buffer, strings, region_index["offset"], region_index["count"],
+                                         items_offset, mobs_offset)
+    else:
+        view = memoryview(buffer)
+        items = [{"type": strings[t], "subtype": strings[s], "x": x, "y": y}
+                 for t, s, x, y in ITEM.iter_unpack(view[items_offset:items_offset + item_count * ITEM.size])]
+        mobs = [{"type": strings[t], "x": x, "y": y, "hp": hp}
+                for t, x, y, hp in MOB.iter_unpack(view[mobs_offset:mobs_offset + mob_count * MOB.size])]
+        world["regions"] = MemoryRegions(items, mobs)
+
+    world["discovered"] = WallMap(MappedChunks(buffer, index_offset, data_offset, chunk_count), known)
+    return world
+
+
+def convert(world_path: str, version: int) -> int:
+    """Rewrite world_path/server.alb in the given format, keeping the old file as server.alb.bak."""
+    server_file = os.path.join(world_path, "server.alb")
+    world = read_world(server_file)
+
+    if world.get("format", 1) == version:
+        return 0
+
+    with open(server_file, "rb") as src, open(server_file + ".bak", "wb") as dst:
+        dst.write(src.read())
+
+    world["format"] = version
+    return write_world(server_file, world)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a world's server.alb between the JSON (v1) and binary (v2) formats")
+    parser.add_argument("world", help="world directory, e.g. world/myworld")
+    parser.add_argument("--to", type=int, choices=(1, VERSION), default=VERSION, help="target format version")
+    args = parser.parse_args()
+
+    written = convert(args.world, args.to)
+    if written:
+        print(f"{args.world}: wrote v{args.to} server.alb ({written} bytes), old file kept as server.alb.bak")
+    else:
+        print(f"{args.world}: already v{args.to}")
+
+
+if __name__ == "__main__":
+    main()
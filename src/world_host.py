@@ -0,0 +1,349 @@
+"""Albina over TCP with every world in its own process.
+
+    python src/world_host.py [--host HOST] [--port PORT] [--idle SECONDS]
+
+Speaks the same protocol as src/server.py; the world is picked at login
+with `hello <name> <world>` (the first world when left out). The router
+in this process keeps the connections and hands each command to the
+worker process that hosts the player's world, over a pipe. A worker is
+started when the first player of its world logs in, and once the last
+one has left and world_idle seconds have passed it saves the world and
+exits. Worlds therefore tick, save and run their commands in parallel,
+each still with a single writer of its own.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import sys
+import threading
+import traceback
+from collections import deque
+from dataclasses import dataclass
+
+from engine import AlbinaEngine, HeadlessUI
+from server import DEFAULT_HOST, DEFAULT_PORT, OUTPUT_LIMIT, LineServer, open_world, server_settings
+
+DEFAULT_IDLE = 300.0
+REAP_EVERY = 5.0
+
+
+def idle_timeout(config: dict) -> float:
+    """Read world_idle (seconds a world without players stays loaded) from server/config.cfg."""
+    return float(config.get("world_idle", DEFAULT_IDLE))
+
+
+def serve_world(name: str, conn):
+    """Worker process: host world `name` and answer the router on conn until told to stop.
+
+    Requests are ("join", player), ("command", player, line), ("leave",
+    player) and ("stop",), sent in lists of however many the router had
+    queued. Each gets exactly one reply value, in order, and the values
+    for everything answered in one go come back as one ("replies",
+    values); the first value is whether the world loaded. In between the
+    worker sends ("push", player, lines) for what ticks printed to a
+    player and ("log", lines) for what it printed itself.
+    """
+    # Ctrl+C reaches the whole process group; the router decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    ui = HeadlessUI()
+    world = open_world(name, ui)
+    conn.send(("log", ui.drain()))
+    conn.send(("replies", [world.game_loaded]))
+    if not world.game_loaded:
+        return
+
+    try:
+        while world.game_loaded:
+            if conn.poll(world.scheduler.next_due()) and not answer(world, conn):
+                break
+
+            world.update()
+            for session in world.sessions.values():
+                lines = session.ui.drain()
+                if lines:
+                    conn.send(("push", session.name, lines))
+            if ui.lines:
+                conn.send(("log", ui.drain()))
+    finally:
+        for session in list(world.sessions.values()):
+            world.leave(session)
+        world.exit_command(None)
+        conn.send(("log", ui.drain()))
+        conn.send(("replies", [None]))
+        conn.close()
+
+
+def answer(world, conn) -> bool:
+    """Answer every request already waiting in one message, so ticks and pushes run once per batch; False on "stop"."""
+    replies = []
+    try:
+        while conn.poll():
+            for op, *args in conn.recv():
+                if op == "stop":
+                    return False
+                replies.append(handle(world, op, args))
+        return True
+    finally:
+        if replies:
+            conn.send(("replies", replies))
+
+
+def handle(world, op: str, args: list):
+    """One request's reply. A request that raises is logged with its traceback and refused, as
+    run_command does for commands, so one bad player file does not take the world down."""
+    try:
+        if op == "join":
+            name = args[0]
+            if name in world.sessions:
+                return False, f"{name} is already playing"
+            world.join(name)
+            return True, None
+
+        session = world.sessions.get(args[0])
+        if session is None:
+            return ["You are not in this world"] if op == "command" else None
+        if op == "command":
+            return world.run_command(session, args[1])
+        world.leave(session)
+        return None
+    except Exception as e:
+        world.print_to_console(f"{args[0]}: '{op}' failed\n" + "".join(traceback.format_exception(e)).rstrip())
+        if op == "join":
+            world.sessions.pop(args[0], None)
+            return False, str(e)
+        return [f"Error in '{op}': {e}"] if op == "command" else None
+
+
+class WorldWorker:
+    """One world's process, and the router's requests still waiting for its answers."""
+
+    def __init__(self, router: "WorldRouter", name: str):
+        self.router = router
+        self.name = name
+        self.sessions: dict[str, RemoteSession] = {}
+        self.joining = 0
+        self.loop = asyncio.get_running_loop()
+        self.idle_since = self.loop.time()
+        self.pending: deque[asyncio.Future] = deque()
+        self.outbox: list[tuple] = []
+        self.ready = self._expect()
+
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=serve_world, args=(name, child), name=f"albina-{name}", daemon=True)
+        self.process.start()
+        child.close()
+
+        # Every worker's pipe is read on the event loop itself, as it becomes readable, so replies
+        # from different worlds are neither handed between threads nor queued behind each other.
+        self.fd = self.conn.fileno()
+        try:
+            self.loop.add_reader(self.fd, self._readable)
+        except NotImplementedError:
+            # The Windows proactor loop cannot wait on pipes; a thread reads them and hands messages over.
+            self.fd = None
+            threading.Thread(target=self._read, name=f"albina-{name}-pipe", daemon=True).start()
+
+    def _expect(self) -> asyncio.Future:
+        future = self.loop.create_future()
+        self.pending.append(future)
+        return future
+
+    def request(self, *message) -> asyncio.Future:
+        """Queue message for the worker; everything queued in one pass of the event loop goes as one send."""
+        if self.conn.closed:
+            raise ConnectionError(f"world {self.name} is not running")
+        future = self._expect()
+        self.outbox.append(message)
+        if len(self.outbox) == 1:
+            self.loop.call_soon(self._send)
+        return future
+
+    def _send(self):
+        batch, self.outbox = self.outbox, []
+        if self.conn.closed:
+            return
+        try:
+            self.conn.send(batch)
+        except OSError:
+            self.exited()
+
+    def _readable(self):
+        try:
+            while self.conn.poll():
+                self.received(self.conn.recv())
+        except (EOFError, OSError):
+            self.exited()
+
+    def _read(self):
+        try:
+            while True:
+                message = self.conn.recv()
+                self.loop.call_soon_threadsafe(self.received, message)
+        except (EOFError, OSError):
+            self.loop.call_soon_threadsafe(self.exited)
+
+    def received(self, message: tuple):
+        kind = message[0]
+        if kind == "replies":
+            for value in message[1]:
+                if not self.pending:
+                    break
+                future = self.pending.popleft()
+                if not future.done():
+                    future.set_result(value)
+        elif kind == "push":
+            session = self.sessions.get(message[1])
+            if session is not None:
+                self.router.push(session, message[2])
+        elif kind == "log":
+            for line in message[1]:
+                self.router.log(f"[{self.name}] {line}")
+
+    def exited(self):
+        if self.conn.closed:
+            return
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError(f"world {self.name} stopped"))
+        self.conn.close()
+        self.router.worker_exited(self)
+        for session in list(self.sessions.values()):
+            if session.writer is not None:
+                session.writer.close()
+
+
+@dataclass
+class RemoteSession:
+    name: str
+    worker: WorldWorker
+    writer: asyncio.StreamWriter | None = None
+
+
+class WorldRouter(LineServer):
+    """Hands each player's commands to the process of their world, starting and unloading worlds as needed."""
+
+    def __init__(self, console: AlbinaEngine, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 output_limit: int = OUTPUT_LIMIT, idle: float = DEFAULT_IDLE):
+        super().__init__(console, host, port, output_limit)
+        self.idle = idle
+        self.workers: dict[str, WorldWorker] = {}
+        self.stopping: dict[str, asyncio.Task] = {}
+
+    def greeting(self) -> str:
+        return f"{self.console.version}, worlds: {', '.join(self.console.worlds() or [])}"
+
+    async def join(self, name: str, world: str | None):
+        worlds = self.console.worlds() or []
+        world = world or (worlds[0] if worlds else None)
+        if world not in worlds:
+            return None, f"No world called {world}" if world else "No worlds to join"
+
+        while world in self.stopping:
+            await self.stopping[world]
+
+        worker = self.workers.get(world)
+        if worker is None:
+            worker = self.workers[world] = WorldWorker(self, world)
+            self.log(f"Loading {world}")
+
+        worker.joining += 1
+        try:
+            if not await worker.ready:
+                return None, f"World {world} failed to load"
+            joined, refusal = await worker.request("join", name)
+        except ConnectionError as e:
+            return None, str(e)
+        finally:
+            worker.joining -= 1
+
+        if not joined:
+            return None, refusal
+        session = worker.sessions[name] = RemoteSession(name, worker)
+        return session, None
+
+    async def execute(self, session: RemoteSession, command: str) -> list[str]:
+        return await session.worker.request("command", session.name, command)
+
+    async def leave(self, session: RemoteSession):
+        worker = session.worker
+        if worker.sessions.pop(session.name, None) is None:
+            return
+        if not worker.sessions:
+            worker.idle_since = worker.loop.time()
+        try:
+            await worker.request("leave", session.name)
+        except ConnectionError:
+            pass
+
+    def worker_exited(self, worker: WorldWorker):
+        if self.workers.get(worker.name) is worker:
+            del self.workers[worker.name]
+            self.log(f"World {worker.name} stopped unexpectedly")
+
+    def unload(self, worker: WorldWorker) -> asyncio.Task:
+        del self.workers[worker.name]
+        task = self.stopping[worker.name] = asyncio.create_task(self._unload(worker))
+        task.add_done_callback(lambda _: self.stopping.pop(worker.name, None))
+        return task
+
+    async def _unload(self, worker: WorldWorker):
+        try:
+            await worker.request("stop")
+        except ConnectionError:
+            pass
+        await asyncio.to_thread(worker.process.join)
+        self.log(f"Unloaded {worker.name}")
+
+    async def reap_idle(self):
+        """Unload worlds that have had no players for self.idle seconds."""
+        while True:
+            await asyncio.sleep(min(REAP_EVERY, self.idle / 4))
+            now = asyncio.get_running_loop().time()
+            for worker in list(self.workers.values()):
+                if not worker.sessions and not worker.joining and now - worker.idle_since >= self.idle:
+                    self.unload(worker)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.reap_idle()
+        finally:
+            self.stopped()
+            for worker in list(self.workers.values()):
+                self.unload(worker)
+            await asyncio.gather(*self.stopping.values(), return_exceptions=True)
+            self.console.exit_command(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--idle", type=float)
+    args = parser.parse_args()
+
+    console = AlbinaEngine(HeadlessUI(echo=True, max_lines=0))
+    console.print_to_console(console.version)
+    console.check_server()
+    if not console.worlds():
+        console.print_to_console("No worlds to host; create one with 'new <name>' first")
+        sys.exit(1)
+
+    host, port, output_limit = server_settings(console.config)
+    idle = idle_timeout(console.config) if args.idle is None else args.idle
+    router = WorldRouter(console, args.host or host, port if args.port is None else args.port, output_limit, idle)
+    try:
+        asyncio.run(router.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
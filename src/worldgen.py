@@ -0,0 +1,142 @@
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from regions import REGION_SIZE
+from sampling import AliasTable
+from wall_gen import MASK32, MASK64, cell_hash, seed_key, splitmix64, splitmix64_array
+
+ITEM_ATTEMPTS = (10000, 15000)
+MOB_ATTEMPTS = (5000, 10000)
+WORLD_RADIUS = 100
+
+PROCEDURAL = "procedural"
+# The spawn density worlds were first generated with, per region.
+_REGION_SHARE = REGION_SIZE ** 2 / (2 * WORLD_RADIUS + 1) ** 2
+REGION_ITEM_ATTEMPTS = tuple(round(attempts * _REGION_SHARE) for attempts in ITEM_ATTEMPTS)
+REGION_MOB_ATTEMPTS = tuple(round(attempts * _REGION_SHARE) for attempts in MOB_ATTEMPTS)
+# Keeps region streams apart from maze chunk streams, which are seeded from the same coordinates.
+_REGION_SALT = 0x5EED_1735_C0DE_0001
+_ITEM_SALT = 0x17E5_0000_0000_0001
+_MOB_SALT = 0x0B5_0000_0000_0002
+# The splitmix64 increment: stream value k of key is splitmix64(key + k * _STEP).
+_STEP = 0x9E3779B97F4A7C15
+_UNIT53 = 1 << 53
+
+
+class Scatter:
+    """The kept attempts of one scatter as columns: outcome index into the table, x and y.
+
+    NumPy arrays when NumPy is there and lists otherwise, holding the same
+    values; item_entries and mob_entries turn them into world entries.
+    """
+
+    __slots__ = ("outcomes", "picks", "xs", "ys")
+
+    def __init__(self, outcomes: list, picks, xs, ys):
+        self.outcomes = outcomes
+        self.picks = picks
+        self.xs = xs
+        self.ys = ys
+
+    def __len__(self) -> int:
+        return len(self.picks)
+
+    def columns(self, values: list) -> tuple[list, list[int], list[int]]:
+        """values[outcome] for every kept attempt, with its x and y, as lists."""
+        if np is not None and isinstance(self.picks, np.ndarray):
+            # One take from an object array instead of a lookup per entry. Filled one by
+            # one, since NumPy would read a list of tuples as a 2-d array.
+            table = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                table[i] = value
+            return table[self.picks].tolist(), self.xs.tolist(), self.ys.tolist()
+        return [values[i] for i in self.picks], self.xs, self.ys
+
+
+def item_entries(scatter: Scatter) -> list[dict]:
+    return [{"type": item_type, "subtype": subtype, "x": x, "y": y}
+            for (item_type, subtype), x, y in zip(*scatter.columns(scatter.outcomes))]
+
+
+def mob_entries(scatter: Scatter, mob_types: dict) -> list[dict]:
+    kinds = [(name, mob_types[name]["hp"]) for name in scatter.outcomes]
+    return [{"type": name, "x": x, "y": y, "hp": hp} for (name, hp), x, y in zip(*scatter.columns(kinds))]
+
+
+def scatter(key: int, attempts: tuple[int, int], table: AliasTable, x0: int, y0: int,
+            width: int, height: int) -> Scatter:
+    """Generation attempts over a width x height area, every draw taken from a splitmix64 stream keyed by key.
+
+    Attempt i uses stream values 3i (kept or not), 3i + 1 (the alias table
+    draw) and 3i + 2 (the cell), so the vectorized and the plain loop give
+    the same entities, and a batch costs a handful of array operations.
+    """
+    count = attempts[0] + splitmix64(key) % (attempts[1] - attempts[0] + 1)
+    if np is not None:
+        return _scatter_numpy(key, count, table, x0, y0, width, height)
+    return _scatter_python(key, count, table, x0, y0, width, height)
+
+
+def _scatter_numpy(key: int, count: int, table: AliasTable, x0: int, y0: int, width: int, height: int) -> Scatter:
+    prob, alias = table.arrays()
+    step = np.uint64(_STEP)
+    with np.errstate(over="ignore"):
+        attempts = np.arange(count, dtype=np.uint64) * np.uint64(3)
+        keep = splitmix64_array(np.uint64(key) + attempts * step) >> np.uint64(11)
+        attempts = attempts[keep < np.uint64(int(min(1.0, table.total) * _UNIT53))]
+
+        draw = splitmix64_array(np.uint64(key) + (attempts + np.uint64(1)) * step)
+        cell = splitmix64_array(np.uint64(key) + (attempts + np.uint64(2)) * step)
+
+    column = ((draw >> np.uint64(32)) % np.uint64(len(prob))).astype(np.int64)
+    picks = np.where((draw & np.uint64(MASK32)) < prob[column], column, alias[column])
+    xs = (cell >> np.uint64(32)) % np.uint64(width)
+    ys = (cell & np.uint64(MASK32)) % np.uint64(height)
+    return Scatter(table.outcomes, picks, xs.astype(np.int64) + x0, ys.astype(np.int64) + y0)
+
+
+def _scatter_python(key: int, count: int, table: AliasTable, x0: int, y0: int, width: int, height: int) -> Scatter:
+    prob, alias = table.thresholds, table.alias
+    size = len(prob)
+    threshold = int(min(1.0, table.total) * _UNIT53)
+    picks, xs, ys = [], [], []
+
+    for attempt in range(0, 3 * count, 3):
+        if splitmix64((key + attempt * _STEP) & MASK64) >> 11 >= threshold:
+            continue
+        draw = splitmix64((key + (attempt + 1) * _STEP) & MASK64)
+        cell = splitmix64((key + (attempt + 2) * _STEP) & MASK64)
+
+        column = (draw >> 32) % size
+        picks.append(column if (draw & MASK32) < prob[column] else alias[column])
+        xs.append(x0 + (cell >> 32) % width)
+        ys.append(y0 + (cell & MASK32) % height)
+
+    return Scatter(table.outcomes, picks, xs, ys)
+
+
+def region_entities(seed: str, key: tuple[int, int], item_table: AliasTable, mob_table: AliasTable,
+                    mob_types: dict, is_wall: Callable[[int, int], bool] | None = None
+                    ) -> tuple[list[dict], list[dict]]:
+    """Items and mobs of one region of a procedural world, the same every time for (seed, key).
+
+    Drawn with scatter() from a key made of the seed and the region
+    coordinates; entries that land on a wall are dropped.
+    """
+    rx, ry = key
+    region_key = cell_hash(seed_key(seed) ^ _REGION_SALT, rx, ry)
+    x0, y0 = rx * REGION_SIZE, ry * REGION_SIZE
+
+    items = item_entries(scatter(region_key ^ _ITEM_SALT, REGION_ITEM_ATTEMPTS, item_table,
+                                 x0, y0, REGION_SIZE, REGION_SIZE))
+    mobs = mob_entries(scatter(region_key ^ _MOB_SALT, REGION_MOB_ATTEMPTS, mob_table,
+                               x0, y0, REGION_SIZE, REGION_SIZE), mob_types)
+
+    if is_wall is not None:
+        items = [item for item in items if not is_wall(item["x"], item["y"])]
+        mobs = [mob for mob in mobs if not is_wall(mob["x"], mob["y"])]
+    return items, mobs